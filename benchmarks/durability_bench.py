@@ -0,0 +1,58 @@
+# benchmarks/durability_bench.py
+"""Write latency of each durability level.
+
+Run from the repository root:  python -m benchmarks.durability_bench
+"""
+import argparse
+import logging
+import statistics
+import tempfile
+import time
+from core.database import Database
+from core.durability import DURABILITY_LEVELS
+from utils.logger import logger
+
+def _measure(action, count: int) -> dict:
+    timings = []
+    for i in range(count):
+        start = time.perf_counter()
+        action(i)
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return {
+        "mean": statistics.mean(timings),
+        "p50": timings[len(timings) // 2],
+        "p99": timings[min(len(timings) - 1, int(len(timings) * 0.99))],
+    }
+
+def run(writes: int, base_docs: int):
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for level in DURABILITY_LEVELS:
+            db = Database(f"bench_{level}", db_path=tmp, durability=level)
+            seed = [{"n": i, "name": f"user{i}", "tags": ["a", "b"]} for i in range(base_docs)]
+            for mode in ("json", "journal", "segment"):
+                collection = db.create_collection(f"docs_{mode}", storage_mode=mode)
+                collection.insert_many([dict(doc) for doc in seed])
+                result = _measure(lambda i: collection.insert_one({"n": i, "name": "bench"}), writes)
+                rows.append((level, f"insert ({mode})", result))
+                collection.close()
+
+            db.begin_transaction()
+            collection = db.get_collection("docs_journal")
+            rows.append((level, "tx log append", _measure(lambda i: collection.insert_one({"n": i}), writes)))
+            db.rollback()
+    print(f"{'level':<8} {'workload':<18} {'mean ms':>9} {'p50 ms':>9} {'p99 ms':>9}")
+    for level, workload, result in rows:
+        print(f"{level:<8} {workload:<18} {result['mean']:>9.3f} {result['p50']:>9.3f} {result['p99']:>9.3f}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--writes", type=int, default=200, help="timed writes per workload")
+    parser.add_argument("--base-docs", type=int, default=1000, help="documents already in each collection")
+    args = parser.parse_args()
+    logger.logger.setLevel(logging.WARNING)
+    run(args.writes, args.base_docs)
+
+if __name__ == "__main__":
+    main()
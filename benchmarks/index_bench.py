@@ -0,0 +1,90 @@
+# benchmarks/index_bench.py
+"""Multi-predicate query latency: full scan vs one index vs intersected indexes.
+
+The collection follows the ``fiveriver`` enrollments schema (student_id,
+course_id, enrollment_date, status). "one index" answers the query from the
+first indexed predicate and filters the rest, as the planner did before it
+intersected postings.
+
+Run from the repository root:  python -m benchmarks.index_bench
+"""
+import argparse
+import contextlib
+import io
+import logging
+import random
+import statistics
+import tempfile
+import time
+from core.database import Database
+from utils.logger import logger
+
+STATUSES = ("active", "completed", "dropped")
+
+QUERIES = [
+    ("course + status", {"course_id": "CS120", "status": "dropped"}),
+    ("student + course", {"student_id": "ST2042", "course_id": "CS101"}),
+    ("course + date range", {"course_id": "CS150", "enrollment_date": {"$gte": "2024-06-01", "$lt": "2024-07-01"}}),
+    ("$or of students", {"$or": [{"student_id": "ST2001"}, {"student_id": "ST2002"}, {"course_id": "CS199"}]}),
+]
+
+def _enrollments(count: int, students: int, courses: int) -> list:
+    rng = random.Random(7)
+    return [{
+        "_id": f"EN{5001 + i}",
+        "student_id": f"ST{2001 + rng.randrange(students)}",
+        "course_id": f"CS{101 + rng.randrange(courses)}",
+        "enrollment_date": f"{rng.choice((2023, 2024))}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+        "status": rng.choices(STATUSES, weights=(6, 3, 1))[0],
+    } for i in range(count)]
+
+def _one_index(collection, query: dict) -> list:
+    for field, condition in query.items():
+        ids = collection._predicate_postings(field, condition)
+        if ids is not None:
+            ids = collection._doc_numbers.ids(ids) if not isinstance(ids, list) else ids
+            return [collection.doc_id_map[doc_id] for doc_id in ids
+                    if collection._matches_query(collection.doc_id_map[doc_id], query)]
+    return [doc for doc in collection.documents if collection._matches_query(doc, query)]
+
+def _measure(action, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        action()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+def run(count: int, repeat: int):
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database("bench_index", db_path=tmp)
+        collection = db.create_collection("enrollments", indexes=[
+            "student_id", "course_id", {"field": "status", "type": "bitmap"},
+            {"field": "enrollment_date", "type": "ordered"}])
+        collection.insert_many(_enrollments(count, students=max(1, count // 8), courses=100))
+        with contextlib.redirect_stdout(io.StringIO()):  # find() echoes every query
+            for label, query in QUERIES:
+                collection.enable_indexing(False)
+                expected = collection.find(query)
+                scan = _measure(lambda: collection.find(query), repeat)
+                collection.enable_indexing(True)
+                single = _measure(lambda: _one_index(collection, query), repeat)
+                intersected = _measure(lambda: collection.find(query), repeat)
+                assert len(collection.find(query)) == len(expected)
+                rows.append((label, len(expected), scan, single, intersected))
+        collection.close()
+    print(f"{'query':<20} {'docs':>6} {'scan ms':>9} {'one idx ms':>11} {'merged ms':>10}")
+    for label, found, scan, single, intersected in rows:
+        print(f"{label:<20} {found:>6} {scan:>9.3f} {single:>11.3f} {intersected:>10.3f}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--docs", type=int, default=50000, help="enrollments in the collection")
+    parser.add_argument("--repeat", type=int, default=20, help="timed runs per query (median reported)")
+    args = parser.parse_args()
+    logger.logger.setLevel(logging.WARNING)
+    run(args.docs, args.repeat)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+# benchmarks/query_bench.py
+"""Full-scan matching: compiled query predicates vs the interpreters they replaced.
+
+``interpreted`` is the per-document walk ``Collection._matches_query`` and
+``Query.evaluate`` used to do (``_interpret`` below, kept as it was apart
+from the same-type rule for ranges that compiled predicates follow), and
+``match_document`` the plain-equality walk updates, deletes and
+``find_one`` used. Each query scans the same in-memory enrollments
+(``fiveriver`` schema plus a ``tags`` array), so only matching is timed;
+the compiled time includes compiling the query.
+
+Run from the repository root:  python -m benchmarks.query_bench
+"""
+import argparse
+import random
+import statistics
+import time
+from core.indexes import order_key
+from core.predicates import compile_query
+from utils.helpers import field_candidates
+
+STATUSES = ("active", "completed", "dropped")
+
+QUERIES = [
+    ("equality", {"course_id": "CS120"}),
+    ("two fields", {"course_id": "CS150", "status": "dropped"}),
+    ("date range", {"enrollment_date": {"$gte": "2024-06-01", "$lt": "2024-07-01"}}),
+    ("$in + $ne", {"status": {"$in": ["active", "completed"]}, "course_id": {"$ne": "CS101"}}),
+    ("array element", {"tags": "evening"}),
+    ("$or", {"$or": [{"student_id": "ST2001"}, {"course_id": "CS199", "status": "active"}]}),
+]
+
+def _enrollments(count: int) -> list:
+    rng = random.Random(7)
+    return [{
+        "_id": f"EN{5001 + i}",
+        "student_id": f"ST{2001 + rng.randrange(max(1, count // 8))}",
+        "course_id": f"CS{101 + rng.randrange(100)}",
+        "enrollment_date": f"{rng.choice((2023, 2024))}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+        "status": rng.choices(STATUSES, weights=(6, 3, 1))[0],
+        "tags": rng.sample(("online", "evening", "audit", "credit"), 2),
+    } for i in range(count)]
+
+def _operators(value, condition: dict) -> bool:
+    for op, operand in condition.items():
+        if op in ("$gt", "$gte", "$lt", "$lte"):
+            if isinstance(value, (list, dict)) or order_key(value)[0] != order_key(operand)[0]:
+                return False
+        if op == "$gt":
+            if not value > operand:
+                return False
+        elif op == "$gte":
+            if not value >= operand:
+                return False
+        elif op == "$lt":
+            if not value < operand:
+                return False
+        elif op == "$lte":
+            if not value <= operand:
+                return False
+        elif op == "$eq":
+            if not value == operand:
+                return False
+        elif op == "$in":
+            if value not in operand:
+                return False
+        elif op != "$ne":
+            return False
+    return True
+
+def _interpret(doc: dict, query: dict) -> bool:
+    for field, condition in query.items():
+        if field == "$or":
+            if not any(_interpret(doc, branch) for branch in condition):
+                return False
+            continue
+        candidates = field_candidates(doc, field)
+        if not candidates:
+            return False
+        if isinstance(condition, dict):
+            if "$ne" in condition and condition["$ne"] in candidates:
+                return False
+            if not any(_operators(value, condition) for value in candidates):
+                return False
+        elif condition not in candidates:
+            return False
+    return True
+
+def _match_document(doc: dict, query: dict) -> bool:
+    for key, query_value in query.items():
+        if key not in doc:
+            return False
+        if isinstance(query_value, dict):
+            if not isinstance(doc[key], dict) or not _match_document(doc[key], query_value):
+                return False
+        elif doc[key] != query_value:
+            return False
+    return True
+
+def _measure(action, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        action()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+def run(count: int, repeat: int):
+    documents = _enrollments(count)
+    rows = []
+    for label, query in QUERIES:
+        expected = [doc for doc in documents if _interpret(doc, query)]
+        assert list(filter(compile_query(query), documents)) == expected
+        interpreted = _measure(lambda: [doc for doc in documents if _interpret(doc, query)], repeat)
+        compiled = _measure(lambda: list(filter(compile_query(query), documents)), repeat)
+        plain = None
+        if all(not isinstance(condition, dict) for condition in query.values()) and "$or" not in query:
+            plain = _measure(lambda: [doc for doc in documents if _match_document(doc, query)], repeat)
+        rows.append((label, len(expected), interpreted, plain, compiled))
+    print(f"{'query':<15} {'docs':>8} {'interpreted ms':>15} {'match_document ms':>18} {'compiled ms':>12} {'speedup':>8}")
+    for label, found, interpreted, plain, compiled in rows:
+        plain_ms = f"{plain:.1f}" if plain is not None else "-"
+        print(f"{label:<15} {found:>8} {interpreted:>15.1f} {plain_ms:>18} {compiled:>12.1f} {interpreted / compiled:>7.1f}x")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--docs", type=int, default=1000000, help="documents scanned per query")
+    parser.add_argument("--repeat", type=int, default=3, help="timed scans per query (median reported)")
+    args = parser.parse_args()
+    run(args.docs, args.repeat)
+
+if __name__ == "__main__":
+    main()
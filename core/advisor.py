@@ -0,0 +1,168 @@
+# core/advisor.py
+import threading
+from typing import Any, Callable, Dict, List, Set, Tuple
+from core.indexes import RANGE_OPERATORS
+
+MAX_SHAPES = 500  # distinct query shapes tracked per collection; the least used are dropped
+
+def _operator_class(condition: Any) -> str:
+    """Kind of predicate a condition is, without its values: ``eq``, ``in``,
+    ``range``, ``ne``, ``doc`` (a whole sub-document or array) or the names
+    of other operators"""
+    if not isinstance(condition, dict):
+        return "doc" if isinstance(condition, list) else "eq"
+    if not condition or not all(isinstance(op, str) and op.startswith("$") for op in condition):
+        return "doc"
+    kinds = set()
+    for op in condition:
+        if op == "$eq":
+            kinds.add("doc" if isinstance(condition[op], (dict, list)) else "eq")
+        elif op in RANGE_OPERATORS:
+            kinds.add("range")
+        else:
+            kinds.add(op[1:])
+    return "+".join(sorted(kinds))
+
+def query_shape(query: Dict) -> Tuple:
+    """Fingerprint of a query: its fields and operator kinds, not its values.
+
+    ``{"age": {"$gt": 30}, "city": "Pune"}`` and ``{"city": "Agra",
+    "age": {"$gte": 18, "$lt": 65}}`` share the shape
+    ``(("age", "range"), ("city", "eq"))``. ``$or`` keeps the shapes of its
+    branches.
+    """
+    parts = []
+    for field, condition in query.items():
+        if field == "$or" and isinstance(condition, list):
+            branches = tuple(sorted(query_shape(branch) for branch in condition if isinstance(branch, dict)))
+            parts.append(("$or", branches))
+        elif field == "$text":
+            parts.append(("$text", "search"))
+        else:
+            parts.append((field, _operator_class(condition)))
+    return tuple(sorted(parts, key=repr))
+
+def describe_shape(shape: Tuple) -> str:
+    """Readable form of a shape: ``age:range, city:eq``"""
+    parts = []
+    for field, kind in shape:
+        if field == "$or":
+            parts.append("$or[" + " | ".join(describe_shape(branch) for branch in kind) + "]")
+        else:
+            parts.append(f"{field}:{kind}")
+    return ", ".join(parts)
+
+def shape_index(shape: Tuple, cardinality: Callable[[str], int]) -> List[Tuple[List[str], str]]:
+    """Index definitions ``(fields, type)`` the planner could answer a shape with.
+
+    Equality fields come first, most distinct values first, followed by one
+    range field; several fields make a compound index (ordered when it ends
+    in a range). A field queried with ``$in`` only gets its own hash index.
+    Each ``$or`` branch needs an index of its own.
+    """
+    equal = [field for field, kind in shape if kind == "eq"]
+    ranged = sorted(field for field, kind in shape if kind in ("range", "eq+range"))
+    listed = [field for field, kind in shape if kind in ("in", "eq+in")]
+    if equal or ranged:
+        fields = sorted(equal, key=lambda field: (-cardinality(field), field)) + ranged[:1]
+        return [(fields, "ordered" if ranged else "hash")]
+    if listed:
+        return [([max(listed, key=lambda field: (cardinality(field), field))], "hash")]
+    branches = next((kind for field, kind in shape if field == "$or"), None)
+    if branches:
+        indexes = [shape_index(branch, cardinality) for branch in branches]
+        if all(indexes):
+            return [index[0] for index in indexes]
+    return []
+
+
+class WorkloadTracker:
+    """Per-shape counters of the queries a collection has answered.
+
+    For every shape it keeps how many queries ran, how many had to scan
+    every document, the documents examined and returned, and the time
+    spent. ``recommend`` turns the full scans into index suggestions,
+    ranked by the time an index would have saved: the scan time, less the
+    share spent on documents the query returned anyway.
+    """
+
+    def __init__(self, max_shapes: int = MAX_SHAPES):
+        self.max_shapes = max_shapes
+        self.shapes: Dict[Tuple, Dict] = {}
+        self.lock = threading.Lock()
+
+    def record(self, query: Dict, scan_type: str, examined: int, returned: int, elapsed_ms: float) -> Dict:
+        """Count one query; returns the stats of its shape"""
+        shape = query_shape(query)
+        with self.lock:
+            stats = self.shapes.get(shape)
+            if stats is None:
+                if len(self.shapes) >= self.max_shapes:
+                    del self.shapes[min(self.shapes, key=lambda key: self.shapes[key]["queries"])]
+                stats = self.shapes[shape] = {"shape": shape, "queries": 0, "scans": 0, "examined": 0,
+                                              "returned": 0, "total_ms": 0.0, "scan_examined": 0,
+                                              "scan_returned": 0, "scan_ms": 0.0, "last_plan": None}
+            stats["queries"] += 1
+            stats["examined"] += examined
+            stats["returned"] += returned
+            stats["total_ms"] += elapsed_ms
+            stats["last_plan"] = scan_type
+            if scan_type == "FULL_SCAN":
+                stats["scans"] += 1
+                stats["scan_examined"] += examined
+                stats["scan_returned"] += returned
+                stats["scan_ms"] += elapsed_ms
+            return stats
+
+    def index_added(self):
+        """Forget which plan each shape last got: a new index may serve it now,
+        so only shapes that still scan afterwards are recommended"""
+        with self.lock:
+            for stats in self.shapes.values():
+                stats["last_plan"] = None
+
+    def reset(self):
+        with self.lock:
+            self.shapes.clear()
+
+    @staticmethod
+    def savings(stats: Dict) -> float:
+        """Estimated milliseconds an index would have saved on the shape's scans"""
+        if not stats["scan_examined"]:
+            return 0.0
+        return stats["scan_ms"] * max(0.0, 1 - stats["scan_returned"] / stats["scan_examined"])
+
+    def stats(self) -> List[Dict]:
+        """Shape counters, most examined documents first"""
+        with self.lock:
+            shapes = [dict(stats, shape=describe_shape(stats["shape"]), savings_ms=self.savings(stats))
+                      for stats in self.shapes.values()]
+        return sorted(shapes, key=lambda stats: stats["examined"], reverse=True)
+
+    def recommend(self, existing: Set[str], cardinality: Callable[[str], int],
+                  min_scans: int = 1) -> List[Dict]:
+        """Indexes that would have served the full scans seen so far, best first.
+
+        Shapes whose latest query used an index, or that have not run since
+        an index was added, are skipped, as are indexes in ``existing``. A shape recommending several indexes (an
+        ``$or``) shares its savings among them.
+        """
+        with self.lock:
+            shapes = [dict(stats) for stats in self.shapes.values()
+                      if stats["scans"] >= min_scans and stats["last_plan"] == "FULL_SCAN"]
+        recommendations: Dict[str, Dict] = {}
+        for stats in shapes:
+            indexes = shape_index(stats["shape"], cardinality)
+            for fields, index_type in indexes:
+                name = ",".join(fields)
+                if name in existing:
+                    continue
+                entry = recommendations.setdefault(name, {"index": name, "fields": fields, "type": index_type,
+                                                          "shapes": [], "scans": 0, "examined": 0,
+                                                          "scan_ms": 0.0, "savings_ms": 0.0})
+                entry["shapes"].append(describe_shape(stats["shape"]))
+                entry["scans"] += stats["scans"]
+                entry["examined"] += stats["scan_examined"]
+                entry["scan_ms"] += stats["scan_ms"]
+                entry["savings_ms"] += self.savings(stats) / len(indexes)
+        return sorted(recommendations.values(), key=lambda entry: entry["savings_ms"], reverse=True)
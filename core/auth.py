@@ -3,6 +3,7 @@ import hashlib
 from pathlib import Path
 from typing import Dict, Optional
 from uuid import uuid4
+from core.durability import DEFAULT_DURABILITY, check_durability, write_file
 from utils.logger import logger
 
 class User:
@@ -13,8 +14,9 @@ class User:
         self.id = str(uuid4())
 
 class AuthManager:
-    def __init__(self, auth_db_path: Path = Path("db/auth.db")):
+    def __init__(self, auth_db_path: Path = Path("db/auth.db"), durability: str = DEFAULT_DURABILITY):
         self.auth_db_path = auth_db_path
+        self.durability = check_durability(durability)
         self.users: Dict[str, User] = {}
         self._load_users()
         
@@ -45,8 +47,7 @@ class AuthManager:
                 }
                 for user in self.users.values()
             }
-            with open(self.auth_db_path, 'w') as f:
-                json.dump(data, f, indent=2)
+            write_file(self.auth_db_path, json.dumps(data, indent=2).encode(), self.durability)
             logger.log_operation("AUTH", "SAVE", "SUCCESS", f"Saved {len(self.users)} users")
         except Exception as e:
             logger.log_operation("AUTH", "SAVE", "FAILED", str(e))
@@ -5,6 +5,8 @@ from pathlib import Path
 from datetime import datetime
 import zipfile
 from typing import Dict, List, Optional
+from core.partition import MANIFEST_NAME, PARTITION_SUFFIX
+from core.serializer import Serializer
 from utils.logger import logger
 
 class BackupManager:
@@ -12,26 +14,45 @@ class BackupManager:
         self.backup_dir = Path(backup_dir)
         self.backup_dir.mkdir(exist_ok=True)
         
-    def create_backup(self, db_name: str) -> Optional[str]:
-        """Create a backup of a database"""
+    def create_backup(self, db_name: str, codec: Optional[str] = None) -> Optional[str]:
+        """Create a backup of a database.
+
+        With a codec, collection files (including the partition files of
+        partitioned collections) are re-encoded with it inside the archive;
+        the codec header lets a restored collection open as-is.
+        """
         try:
             db_path = Path("db") / db_name
             if not db_path.exists():
                 raise FileNotFoundError(f"Database {db_name} not found")
+            if codec:
+                Serializer.get(codec)
             
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
             backup_path = self.backup_dir / f"{db_name}_{timestamp}.zip"
             
             with zipfile.ZipFile(backup_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
                 for file in db_path.glob("**/*"):
-                    if file.is_file():
-                        zipf.write(file, arcname=file.relative_to(db_path.parent))
+                    if not file.is_file():
+                        continue
+                    arcname = file.relative_to(db_path.parent)
+                    in_partition_dir = file.parent.parent == db_path and file.parent.suffix == PARTITION_SUFFIX
+                    if codec and in_partition_dir and file.name == MANIFEST_NAME:
+                        manifest, manifest_codec = Serializer.load_file(file)
+                        manifest["codec"] = codec
+                        zipf.writestr(str(arcname), Serializer.dumps(manifest, manifest_codec))
+                    elif codec and file.suffix == ".json" and (file.parent == db_path or in_partition_dir):
+                        documents, _ = Serializer.load_file(file)
+                        compress = zipfile.ZIP_STORED if codec.endswith("+zlib") else zipfile.ZIP_DEFLATED
+                        zipf.writestr(str(arcname), Serializer.dumps(documents, codec), compress_type=compress)
+                    else:
+                        zipf.write(file, arcname=arcname)
             
             logger.log_operation(
                 "BACKUP_CREATE",
                 f"db:{db_name}",
                 "SUCCESS",
-                f"path:{backup_path}"
+                f"path:{backup_path}, codec:{codec or 'unchanged'}"
             )
             return str(backup_path)
         except Exception as e:
@@ -62,8 +83,17 @@ class BackupManager:
                 shutil.rmtree(db_path)
             db_path.mkdir(parents=True, exist_ok=True)
 
+            # archive paths start with the original database name; strip it so
+            # partition directories and all files land under db/<db_name>
             with zipfile.ZipFile(backup_path, 'r') as zipf:
-                zipf.extractall(".")
+                for member in zipf.infolist():
+                    relative = Path(*Path(member.filename).parts[1:])
+                    if member.is_dir() or not relative.parts or ".." in relative.parts:
+                        continue
+                    target = db_path / relative
+                    target.parent.mkdir(parents=True, exist_ok=True)
+                    with zipf.open(member) as src, open(target, 'wb') as dst:
+                        shutil.copyfileobj(src, dst)
 
             logger.log_operation(
                 "BACKUP_RESTORE",
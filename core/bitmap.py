@@ -0,0 +1,150 @@
+# core/bitmap.py
+from bisect import bisect_left
+from typing import Dict, Iterable, Iterator, List, Union
+
+CHUNK_BITS = 16
+CHUNK_MASK = (1 << CHUNK_BITS) - 1
+CHUNK_BYTES = (1 << CHUNK_BITS) // 8
+ARRAY_MAX = 4096  # a chunk with more members is stored as a bitmap
+
+Chunk = Union[List[int], bytearray]
+
+def _chunk_int(chunk: Chunk) -> int:
+    if isinstance(chunk, bytearray):
+        return int.from_bytes(chunk, "little")
+    bits = 0
+    for low in chunk:
+        bits |= 1 << low
+    return bits
+
+def _int_chunk(bits: int) -> Chunk:
+    if bits.bit_count() > ARRAY_MAX:
+        return bytearray(bits.to_bytes(CHUNK_BYTES, "little"))
+    return list(_int_members(bits))
+
+def _int_members(bits: int) -> Iterator[int]:
+    while bits:
+        lowest = bits & -bits
+        yield lowest.bit_length() - 1
+        bits ^= lowest
+
+
+class Bitmap:
+    """Compressed set of non-negative integers (roaring-style).
+
+    Numbers are split into 65536-wide chunks by their high bits. A sparse
+    chunk is a sorted array of its low 16 bits; once it holds more than
+    ``ARRAY_MAX`` members it becomes an 8 KiB bitmap. Adding or removing a
+    number touches one chunk, and ``&``, ``|`` and ``-`` combine bitmaps
+    chunk by chunk.
+    """
+
+    __slots__ = ("_chunks", "_sizes")
+
+    def __init__(self, numbers: Iterable[int] = ()):
+        self._chunks: Dict[int, Chunk] = {}
+        self._sizes: Dict[int, int] = {}
+        for number in numbers:
+            self.add(number)
+
+    def add(self, number: int) -> bool:
+        """Set a bit; False if it was already set"""
+        high, low = number >> CHUNK_BITS, number & CHUNK_MASK
+        chunk = self._chunks.get(high)
+        if chunk is None:
+            self._chunks[high] = [low]
+            self._sizes[high] = 1
+            return True
+        if isinstance(chunk, bytearray):
+            byte, bit = low >> 3, 1 << (low & 7)
+            if chunk[byte] & bit:
+                return False
+            chunk[byte] |= bit
+        else:
+            position = bisect_left(chunk, low)
+            if position < len(chunk) and chunk[position] == low:
+                return False
+            chunk.insert(position, low)
+            if len(chunk) > ARRAY_MAX:
+                self._chunks[high] = _int_chunk(_chunk_int(chunk))
+        self._sizes[high] += 1
+        return True
+
+    def discard(self, number: int) -> bool:
+        """Clear a bit; False if it was not set"""
+        high, low = number >> CHUNK_BITS, number & CHUNK_MASK
+        chunk = self._chunks.get(high)
+        if chunk is None:
+            return False
+        if isinstance(chunk, bytearray):
+            byte, bit = low >> 3, 1 << (low & 7)
+            if not chunk[byte] & bit:
+                return False
+            chunk[byte] &= ~bit
+        else:
+            position = bisect_left(chunk, low)
+            if position == len(chunk) or chunk[position] != low:
+                return False
+            del chunk[position]
+        self._sizes[high] -= 1
+        if not self._sizes[high]:
+            del self._chunks[high]
+            del self._sizes[high]
+        elif isinstance(chunk, bytearray) and self._sizes[high] <= ARRAY_MAX // 2:
+            self._chunks[high] = list(_int_members(_chunk_int(chunk)))
+        return True
+
+    def __contains__(self, number: int) -> bool:
+        chunk = self._chunks.get(number >> CHUNK_BITS)
+        if chunk is None:
+            return False
+        low = number & CHUNK_MASK
+        if isinstance(chunk, bytearray):
+            return bool(chunk[low >> 3] & (1 << (low & 7)))
+        position = bisect_left(chunk, low)
+        return position < len(chunk) and chunk[position] == low
+
+    def __len__(self) -> int:
+        return sum(self._sizes.values())
+
+    def __bool__(self) -> bool:
+        return bool(self._chunks)
+
+    def __iter__(self) -> Iterator[int]:
+        for high in sorted(self._chunks):
+            base = high << CHUNK_BITS
+            chunk = self._chunks[high]
+            lows = _int_members(_chunk_int(chunk)) if isinstance(chunk, bytearray) else chunk
+            for low in lows:
+                yield base + low
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, Bitmap) and list(self) == list(other)
+
+    def __repr__(self) -> str:
+        return f"Bitmap({len(self)} members)"
+
+    def copy(self) -> "Bitmap":
+        result = Bitmap()
+        result._chunks = {high: chunk[:] if isinstance(chunk, list) else bytearray(chunk)
+                          for high, chunk in self._chunks.items()}
+        result._sizes = dict(self._sizes)
+        return result
+
+    def _combine(self, other: "Bitmap", highs: Iterable[int], op) -> "Bitmap":
+        result = Bitmap()
+        for high in highs:
+            bits = op(_chunk_int(self._chunks.get(high, [])), _chunk_int(other._chunks.get(high, [])))
+            if bits:
+                result._chunks[high] = _int_chunk(bits)
+                result._sizes[high] = bits.bit_count()
+        return result
+
+    def __and__(self, other: "Bitmap") -> "Bitmap":
+        return self._combine(other, self._chunks.keys() & other._chunks.keys(), lambda a, b: a & b)
+
+    def __or__(self, other: "Bitmap") -> "Bitmap":
+        return self._combine(other, self._chunks.keys() | other._chunks.keys(), lambda a, b: a | b)
+
+    def __sub__(self, other: "Bitmap") -> "Bitmap":
+        return self._combine(other, self._chunks.keys(), lambda a, b: a & ~b)
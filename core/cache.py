@@ -0,0 +1,172 @@
+# core/cache.py
+import threading
+from collections import OrderedDict
+from collections.abc import MutableMapping
+from pathlib import Path
+from typing import Dict, Iterator, Optional, Tuple
+from utils.logger import logger
+
+CACHE_BUDGET_BYTES = 256 * 1024 * 1024
+
+CacheKey = Tuple[str, str]  # (resolved database directory, collection name)
+
+class CollectionCache:
+    """Process-wide LRU of open collections bounded by an estimated memory budget.
+
+    Every ``Database`` object for the same directory shares the entries, so
+    opening a database twice does not load its collections twice. When the
+    estimated footprint goes over budget the least recently used collections
+    are flushed, closed and dropped; the next ``get_collection`` reopens them.
+    A collection is only measured again after it changed (its
+    ``modifications`` counter moved), and pinned collections, which a caller
+    is still using, are never evicted.
+    """
+
+    def __init__(self, budget_bytes: int = CACHE_BUDGET_BYTES):
+        self.budget_bytes = budget_bytes
+        self._entries: "OrderedDict[CacheKey, object]" = OrderedDict()
+        self._sizes: Dict[CacheKey, int] = {}
+        self._measured: Dict[CacheKey, int] = {}  # modifications count at the last estimate
+        self._pins: Dict[CacheKey, int] = {}
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def lookup(self, key: CacheKey):
+        """Return a cached collection (counting a hit or miss) and mark it recently used"""
+        with self._lock:
+            collection = self._entries.get(key)
+            if collection is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._entries.move_to_end(key)
+            self._evict(keep=key)
+            return collection
+
+    def peek(self, key: CacheKey):
+        with self._lock:
+            return self._entries.get(key)
+
+    def put(self, key: CacheKey, collection):
+        with self._lock:
+            self._entries[key] = collection
+            self._entries.move_to_end(key)
+            self._measured.pop(key, None)
+            self._evict(keep=key)
+
+    def discard(self, key: CacheKey):
+        """Forget a collection without closing it (the caller owns it now)"""
+        with self._lock:
+            self._sizes.pop(key, None)
+            self._measured.pop(key, None)
+            return self._entries.pop(key, None)
+
+    def pin(self, key: CacheKey):
+        """Keep the collection under ``key`` open until a matching ``unpin``;
+        pins are counted, so several users can hold one"""
+        with self._lock:
+            self._pins[key] = self._pins.get(key, 0) + 1
+
+    def unpin(self, key: CacheKey):
+        with self._lock:
+            count = self._pins.get(key, 0) - 1
+            if count > 0:
+                self._pins[key] = count
+                return
+            self._pins.pop(key, None)
+            self._evict()  # it may have been kept over budget
+
+    def keys(self, db_dir: Optional[str] = None):
+        with self._lock:
+            return [key for key in self._entries if db_dir is None or key[0] == db_dir]
+
+    def set_budget(self, budget_bytes: int):
+        if budget_bytes <= 0:
+            raise ValueError("Cache budget must be positive")
+        with self._lock:
+            self.budget_bytes = budget_bytes
+            self._evict()
+
+    def resident_bytes(self) -> int:
+        with self._lock:
+            return sum(self._sizes.values())
+
+    def _evict(self, keep: Optional[CacheKey] = None):
+        # only collections written to since their last estimate are measured again
+        for key, collection in self._entries.items():
+            if self._measured.get(key) != collection.modifications:
+                self._measured[key] = collection.modifications
+                self._sizes[key] = collection.estimate_memory()
+        total = sum(self._sizes.values())
+        for key in list(self._entries):
+            if total <= self.budget_bytes:
+                break
+            collection = self._entries[key]
+            if key == keep or key in self._pins or collection._transaction_id:
+                continue  # in use right now, or holding uncommitted changes
+            try:
+                collection.close()
+            except Exception as e:
+                logger.log_operation("CACHE_EVICT", f"collection:{key[1]}", "FAILED", str(e))
+                continue
+            total -= self._sizes.pop(key)
+            self._measured.pop(key, None)
+            del self._entries[key]
+            self.evictions += 1
+            logger.log_operation(
+                "CACHE_EVICT",
+                f"collection:{key[1]}",
+                "SUCCESS",
+                f"db:{key[0]}, resident:{total} bytes, budget:{self.budget_bytes} bytes"
+            )
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "collections": len(self._entries),
+                "resident_bytes": sum(self._sizes.values()),
+                "budget_bytes": self.budget_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": self.hits / lookups if lookups else None,
+            }
+
+
+class DatabaseCollections(MutableMapping):
+    """``name -> Collection`` view of one database's entries in the shared cache"""
+
+    def __init__(self, cache: CollectionCache, db_path: Path):
+        self._cache = cache
+        self._db_dir = str(Path(db_path).resolve())
+
+    def key(self, name: str) -> CacheKey:
+        return (self._db_dir, name)
+
+    def __getitem__(self, name: str):
+        collection = self._cache.peek(self.key(name))
+        if collection is None:
+            raise KeyError(name)
+        return collection
+
+    def __setitem__(self, name: str, collection):
+        self._cache.put(self.key(name), collection)
+
+    def __delitem__(self, name: str):
+        if self._cache.discard(self.key(name)) is None:
+            raise KeyError(name)
+
+    def __contains__(self, name) -> bool:
+        return self._cache.peek(self.key(name)) is not None
+
+    def __iter__(self) -> Iterator[str]:
+        return iter([key[1] for key in self._cache.keys(self._db_dir)])
+
+    def __len__(self) -> int:
+        return len(self._cache.keys(self._db_dir))
+
+
+collection_cache = CollectionCache()
@@ -0,0 +1,135 @@
+# core/catalog.py
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+from core.durability import DEFAULT_DURABILITY, write_file
+from core.partition import PARTITION_SUFFIX
+from core.serializer import DEFAULT_CODEC, Serializer
+from utils.logger import logger
+
+CATALOG_NAME = ".catalog"
+SNAPSHOT_DIR = ".indexes"
+SNAPSHOT_SUFFIX = ".snap"
+
+def data_stamp(file_path: Path) -> List[List[Any]]:
+    """Version stamp of a collection's data files: name, size and mtime of each.
+
+    Any write to the collection changes at least one entry, so a snapshot
+    taken with the same stamp describes exactly the data on disk.
+    """
+    file_path = Path(file_path)
+    if file_path.suffix == PARTITION_SUFFIX:
+        paths = sorted(file_path.iterdir()) if file_path.is_dir() else []
+    else:
+        paths = [file_path, file_path.with_suffix(".journal")]
+    stamp = []
+    for path in paths:
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            continue
+        stamp.append([path.name, stat.st_size, stat.st_mtime_ns])
+    return stamp
+
+
+class IndexCatalog:
+    """Per-database record of index definitions plus on-disk index snapshots.
+
+    The catalog (``.catalog``) maps collection names to their index
+    definitions, so indexes survive a restart. Snapshots in ``.indexes/``
+    hold the built index contents together with the data stamp they were
+    taken at; a snapshot whose stamp no longer matches is ignored.
+    """
+
+    def __init__(self, db_path: Path, codec: str = DEFAULT_CODEC,
+                 durability: str = DEFAULT_DURABILITY):
+        self.db_path = Path(db_path)
+        self.path = self.db_path / CATALOG_NAME
+        self.snapshot_dir = self.db_path / SNAPSHOT_DIR
+        self.codec = codec
+        self.durability = durability
+        self._lock = threading.RLock()
+        self._collections: Dict[str, Dict] = {}
+        self._load()
+
+    def _load(self):
+        try:
+            if self.path.exists():
+                data, _ = Serializer.load_file(self.path)
+                self._collections = data.get("collections", {})
+        except Exception as e:
+            # a damaged catalog only costs the index definitions, not data
+            logger.log_operation("INDEX_CATALOG", str(self.path), "LOAD_FAILED", str(e))
+            self._collections = {}
+
+    def _save(self):
+        Serializer.dump_file(self.path, {"collections": self._collections}, "json-pretty", self.durability)
+
+    # -- definitions ------------------------------------------------------
+
+    def indexes_for(self, collection: str) -> List[Dict]:
+        with self._lock:
+            self._load()
+            return [dict(index) for index in self._collections.get(collection, {}).get("indexes", [])]
+
+    def set_indexes(self, collection: str, indexes: List[Dict]):
+        """Record the index definitions of a collection"""
+        with self._lock:
+            self._load()  # another Database object may have changed the file
+            if indexes:
+                self._collections[collection] = {"indexes": [dict(index) for index in indexes]}
+            elif self._collections.pop(collection, None) is None:
+                return
+            self._save()
+        logger.log_operation("INDEX_CATALOG", f"collection:{collection}", "SAVED",
+                             f"indexes:{[index['field'] for index in indexes]}")
+
+    def drop(self, collection: str):
+        """Forget a dropped collection's indexes and snapshot"""
+        with self._lock:
+            self._load()
+            if self._collections.pop(collection, None) is not None:
+                self._save()
+        self.discard_snapshot(collection)
+
+    # -- snapshots --------------------------------------------------------
+
+    def snapshot_path(self, collection: str) -> Path:
+        return self.snapshot_dir / f"{collection}{SNAPSHOT_SUFFIX}"
+
+    def save_snapshot(self, collection: str, stamp: List, indexes: Dict[str, Dict[Any, List]],
+                      definitions: List[Dict]):
+        """Serialize built indexes, tagged with the data stamp and index
+        definitions they match"""
+        self.snapshot_dir.mkdir(exist_ok=True)
+        payload = {
+            "stamp": stamp,
+            "definitions": definitions,
+            "indexes": {field: [[value, ids] for value, ids in postings.items()]
+                        for field, postings in indexes.items()},
+        }
+        write_file(self.snapshot_path(collection), Serializer.dumps(payload, self.codec), self.durability)
+
+    def load_snapshot(self, collection: str, stamp: List, definitions: List[Dict]) -> Optional[Dict[str, Dict]]:
+        """Return snapshotted indexes if they match ``stamp`` and were built
+        for exactly these ``definitions`` (fields, types and options)"""
+        path = self.snapshot_path(collection)
+        if not definitions or not path.exists():
+            return None
+        try:
+            payload, _ = Serializer.load_file(path)
+        except Exception as e:
+            logger.log_operation("INDEX_SNAPSHOT", f"collection:{collection}", "UNREADABLE", str(e))
+            return None
+        if payload.get("stamp") != stamp or payload.get("definitions") != definitions:
+            logger.log_operation("INDEX_SNAPSHOT", f"collection:{collection}", "STALE",
+                                 "data or index definitions changed since the snapshot; rebuilding")
+            return None
+        # compound keys come back from the codec as lists
+        return {field: {tuple(value) if isinstance(value, list) else value: ids for value, ids in postings}
+                for field, postings in payload["indexes"].items()}
+
+    def discard_snapshot(self, collection: str):
+        path = self.snapshot_path(collection)
+        if path.exists():
+            path.unlink()
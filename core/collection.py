@@ -1,38 +1,154 @@
 #collection.py
+import copy
+import functools
+import itertools
 import json
-from typing import Any, Dict, List, Optional, Union
+from typing import Any, Callable, Dict, List, Optional, Sequence, Union
 from pathlib import Path
+import threading
 import time
 from uuid import uuid4
-from core.query import Query
-from utils.helpers import deep_update, match_document
+from core.advisor import WorkloadTracker
+from core.bitmap import Bitmap
+from core.catalog import IndexCatalog, data_stamp
+from core.durability import DEFAULT_DURABILITY, check_durability
+from core.index_build import IndexBuild
+from core.indexes import RANGE_OPERATORS, DocumentNumbers, index_definition, index_fields, new_index, query_implies
+from core.journal import CollectionJournal, JournalCheckpointer
+from core.partition import PARTITION_COUNT, PARTITION_SUFFIX, PartitionedStore
+from core.predicates import compile_query
+from core.segment import SEGMENT_CODEC, LazyDocumentList, SegmentStore
+from core.serializer import DEFAULT_CODEC, Serializer
+from core.slots import DocumentSlots
+from core.sorting import check_sort_spec, sort_documents
+from core.ttl import ExpirySweeper, iso_bound, timestamp_seconds
+from utils.helpers import deep_sizeof, deep_update, field_candidates, path_values
 from utils.logger import logger
 
+STORAGE_MODES = ("json", "journal", "segment", "partitioned")
+FLUSH_POLICIES = ("immediate", "interval", "ops", "close")
+FLUSH_INTERVAL_MS = 200
+FLUSH_MAX_OPS = 100
+FOOTPRINT_SAMPLE = 64
+ENTRY_OVERHEAD_BYTES = 100  # per doc_id_map / index entry
+INTERSECT_RATIO = 16  # stop intersecting once a posting is this much larger than the candidates
+ADVISOR_SAMPLE = 1000  # documents sampled to estimate how many distinct values a field has
+
+_MISSING = object()  # absent value: a query field not given, or no owner for a unique key
+
+def _scalar(value: Any) -> bool:
+    """A value indexes file under itself (None also stands for unindexable values)"""
+    return isinstance(value, (str, int, float))
+
+def _serialized(method):
+    """Run a collection method holding its write lock, so a TTL sweep batch
+    never interleaves with it. A closed collection refuses: nothing would
+    persist the change."""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._write_lock:
+            if self.closed:
+                raise ValueError(f"Collection '{self.name}' is closed")
+            return method(self, *args, **kwargs)
+    return wrapper
+
 class Collection:
-    def __init__(self, name: str, file_path: Path, indexes: List[str] = None):
+    def __init__(self, name: str, file_path: Path, indexes: List[Union[str, Dict]] = None,
+                 storage_mode: Optional[str] = None, codec: Optional[str] = None,
+                 progress: Optional[Callable[[int, int], None]] = None,
+                 flush_policy: str = "immediate", flush_every: Optional[int] = None,
+                 durability: str = DEFAULT_DURABILITY, partitions: int = PARTITION_COUNT,
+                 catalog: Optional[IndexCatalog] = None):
         self.name = name
         self.file_path = file_path
-        self.indexes = indexes if indexes else []
+        self.codec = codec
+        self.durability = check_durability(durability)
+        self._journal = CollectionJournal(file_path, codec or DEFAULT_CODEC, durability)
+        if storage_mode is None:
+            if Path(file_path).suffix == ".seg":
+                storage_mode = "segment"
+            elif Path(file_path).suffix == PARTITION_SUFFIX:
+                storage_mode = "partitioned"
+            else:
+                storage_mode = "journal" if self._journal.exists() else "json"
+        if storage_mode not in STORAGE_MODES:
+            raise ValueError(f"Unsupported storage mode: {storage_mode}")
+        self.storage_mode = storage_mode
+        self._checkpointer = JournalCheckpointer(self._journal, file_path)
+        self._segment = SegmentStore(file_path, codec or SEGMENT_CODEC, durability) if storage_mode == "segment" else None
+        self._partitions = PartitionedStore(file_path, partitions, codec or DEFAULT_CODEC,
+                                            durability) if storage_mode == "partitioned" else None
+        self._catalog = catalog
+        definitions = [index_definition(index) for index in indexes or []]
+        if indexes is None and catalog is not None:
+            definitions = [index_definition(index) for index in catalog.indexes_for(name)]
+        elif definitions and catalog is not None:
+            catalog.set_indexes(name, definitions)
+        self.indexes = [definition["field"] for definition in definitions]
+        self.index_types = {definition["field"]: definition["type"] for definition in definitions}
+        self.index_fields = {index: index_fields(index) for index in self.indexes}
+        self.unique_indexes = {definition["field"] for definition in definitions if definition.get("unique")}
+        self.stemmed_indexes = {definition["field"] for definition in definitions if definition.get("stem")}
+        self.sparse_indexes = {definition["field"] for definition in definitions if definition.get("sparse")}
+        self.index_filters = {definition["field"]: definition["filter"] for definition in definitions if "filter" in definition}
+        self._filter_matches: Dict[str, Callable[[Dict], bool]] = {}  # compiled index filters, by index
+        self.ttl_indexes = {definition["field"]: definition["expire_after"] for definition in definitions
+                            if "expire_after" in definition}
         self.indexing_enabled = False
-        self.documents = []
-        self.doc_id_map = {}  # Map _id to document for fast lookup
-        self.indexes_dict = {index: {} for index in self.indexes}
+        self.documents = DocumentSlots()
+        self.doc_id_map = self.documents.by_id  # Map _id to document for fast lookup
+        self._index_builds: Dict[str, IndexBuild] = {}  # indexes added since opening, by field
+        self.workload = WorkloadTracker()
+        self._uncoverable = set()  # indexes whose keys do not give the stored values back (see _check_coverable)
+        self._unchecked = set()  # indexes loaded from a snapshot, not yet checked for that
+        self._number_types: Dict[tuple, type] = {}  # (index, field) -> type of the integral numbers seen
+        self.auto_index_threshold: Optional[int] = None
+        self.last_plan: Optional[str] = None  # COVERED, INDEX_USED or FULL_SCAN: how the latest query ran
+        self.indexes_dict = self._empty_indexes()
         self._transaction_id: Optional[str] = None
         self._transaction_buffer: List[Dict] = []
+        self._transaction_keys: Dict[tuple, Any] = {}  # unique keys claimed inside the transaction
         self._log_operation = None
-        self._load_data()
-        self._build_indexes()
+        self._write_lock = threading.RLock()  # held by writes and by each TTL sweep batch
+        self.closed = False
+        self.modifications = 0  # saves and new indexes; the collection cache re-measures on change
+        self._flush_lock = threading.RLock()
+        self._flush_timer: Optional[threading.Timer] = None
+        self._dirty = False
+        self._pending_changes: List[Dict] = []
+        self._pending_saves = 0
+        self.flush_count = 0
+        self.coalesced_saves = 0
+        self.set_flush_policy(flush_policy, flush_every)
+        self._snapshot_stamp = None
+        snapshot = None
+        if catalog is not None and self.indexes:
+            stamp = data_stamp(self._data_path())
+            snapshot = catalog.load_snapshot(name, stamp, self.index_definitions())
+            if snapshot is not None:
+                self._snapshot_stamp = stamp
+        if snapshot is not None:
+            self._load_data(progress, build_indexes=False)
+            self.indexes_dict = self._empty_indexes(snapshot)
+            self._unchecked = set(self.indexes)  # a snapshot does not say which held arrays
+        elif not self._load_data(progress):
+            self._build_indexes()
+        self._sweeper = ExpirySweeper(name, self._active_ttl_indexes, self._expire_batch)
+        if self.ttl_indexes:
+            self._sweeper.start()
         logger.log_operation(
             "COLLECTION_INIT",
             f"collection:{name}",
             "COMPLETED",
-            f"path:{file_path}, indexes:{self.indexes}, documents:{len(self.documents)}"
+            f"path:{file_path}, storage:{self.storage_mode}, codec:{self.codec}, indexes:{self.indexes}, documents:{len(self.documents)}"
         )
 
+    @_serialized
     def set_transaction_context(self, transaction_id: str, log_operation=None):
         """Set the transaction context for this collection"""
         self._transaction_id = transaction_id
         self._transaction_buffer = []
+        self._transaction_keys = {}
         self._log_operation = log_operation
         logger.log_operation(
             "TRANSACTION_CONTEXT",
@@ -41,33 +157,54 @@ class Collection:
             f"transaction_id:{transaction_id}"
         )
 
+    @_serialized
+    def clear_transaction_context(self):
+        """Leave the transaction; later changes are saved directly again"""
+        transaction_id = self._transaction_id
+        self._transaction_id = None
+        self._transaction_buffer = []
+        self._transaction_keys = {}
+        self._log_operation = None
+        logger.log_operation(
+            "TRANSACTION_CONTEXT",
+            f"collection:{self.name}",
+            "CLEARED",
+            f"transaction_id:{transaction_id}"
+        )
+
+    @_serialized
     def apply_operation(self, operation: Dict):
         """Apply a transaction operation during commit"""
         op_type = operation.get('type')
         try:
-            if op_type == 'dakhil karo':
+            changes = []
+            if op_type in ('insert', 'dakhil karo'):
                 self.documents.append(operation['document'])
-                self.doc_id_map[operation['document']['_id']] = operation['document']
                 self._update_indexes(operation['document'])
+                changes.append({"op": "insert", "doc": operation['document']})
             elif op_type == 'update':
-                for i, doc in enumerate(self.documents):
-                    if doc['_id'] == operation['doc_id']:
-                        if operation.get('set'):
-                            deep_update(doc, operation['set'])
-                        elif operation.get('unset'):
-                            for field in operation['unset']:
-                                if field in doc:
-                                    del doc[field]
-                        self.doc_id_map[doc['_id']] = doc
-                        self._update_indexes(doc)
-                        break
+                doc = self.documents.get(operation['doc_id'])
+                if doc is not None:
+                    # the transaction already changed doc in place and
+                    # re-indexed it; drop any postings of the version it
+                    # started from
+                    self._update_indexes(operation['original_doc'], is_delete=True)
+                    if operation.get('set'):
+                        deep_update(doc, operation['set'])
+                    elif operation.get('unset'):
+                        for field in operation['unset']:
+                            if field in doc:
+                                del doc[field]
+                    self.documents.replace(doc)
+                    self._update_indexes(doc)
+                    changes.append({"op": "update", "doc": doc})
             elif op_type == 'delete':
-                self.documents = [doc for doc in self.documents if doc['_id'] != operation['doc_id']]
-                self.doc_id_map.pop(operation['doc_id'], None)
+                self.documents.remove_id(operation['doc_id'])
                 self._update_indexes(operation['document'], is_delete=True)
+                changes.append({"op": "delete", "_id": operation['doc_id']})
             else:
                 raise ValueError(f"Unsupported operation type: {op_type}")
-            self._save_data()
+            self._save_data(changes)
             logger.log_operation(
                 "TRANSACTION_APPLY",
                 f"collection:{self.name}",
@@ -83,29 +220,31 @@ class Collection:
             )
             raise
 
+    @_serialized
     def undo_operation(self, operation: Dict):
         """Properly undo a transaction operation during rollback"""
         op_type = operation.get('type')
         try:
-            if op_type == 'dakhil karo':
-                self.documents = [doc for doc in self.documents 
-                                if doc['_id'] != operation['document']['_id']]
-                self.doc_id_map.pop(operation['document']['_id'], None)
+            changes = []
+            if op_type in ('insert', 'dakhil karo'):
+                self.documents.remove_id(operation['document']['_id'])
                 self._update_indexes(operation['document'], is_delete=True)
+                changes.append({"op": "delete", "_id": operation['document']['_id']})
             elif op_type == 'update':
-                for i, doc in enumerate(self.documents):
-                    if doc['_id'] == operation['doc_id']:
-                        self.documents[i] = operation['original_doc'].copy()
-                        self.doc_id_map[doc['_id']] = self.documents[i]
-                        self._update_indexes(self.documents[i])
-                        break
+                original = operation['original_doc'].copy()
+                current = self.documents.get(original['_id'])
+                if current is not None:
+                    self._update_indexes(current, is_delete=True)
+                if self.documents.replace(original):
+                    self._update_indexes(original)
+                    changes.append({"op": "update", "doc": original})
             elif op_type == 'delete':
                 self.documents.append(operation['document'])
-                self.doc_id_map[operation['document']['_id']] = operation['document']
                 self._update_indexes(operation['document'])
+                changes.append({"op": "insert", "doc": operation['document']})
             else:
                 raise ValueError(f"Unsupported operation type: {op_type}")
-            self._save_data()
+            self._save_data(changes)
             logger.log_operation(
                 "TRANSACTION_UNDO",
                 f"collection:{self.name}",
@@ -121,40 +260,187 @@ class Collection:
             )
             raise
 
-    def _load_data(self):
-        """Load data from the collection file"""
+    def _data_path(self) -> Path:
+        if self.storage_mode == "partitioned":
+            return self._partitions.dir_path
+        if self.storage_mode == "segment":
+            return self._segment.seg_path
+        return Path(self.file_path)
+
+    def _load_data(self, progress: Optional[Callable[[int, int], None]] = None,
+                   build_indexes: bool = True) -> bool:
+        """Load data from the collection file, replaying the journal if present.
+
+        Plain collections are streamed document by document and indexed as
+        they arrive (unless ``build_indexes`` is False because a snapshot
+        supplies them); returns True when the indexes were built that way.
+        Segment collections only load the offset index; documents are decoded
+        when a query first touches them. Partitioned collections load their
+        partition files one by one.
+        """
+        indexed = False
         try:
-            with open(self.file_path, 'r') as f:
-                self.documents = json.load(f)
-            self.doc_id_map = {doc['_id']: doc for doc in self.documents}
+            if self.storage_mode == "segment":
+                self._segment.open()
+                self.codec = self._segment.codec
+                self.documents = LazyDocumentList(self._segment)
+            elif self.storage_mode == "partitioned":
+                self.documents = DocumentSlots(self._partitions.load(progress))
+                self.codec = self._partitions.codec
+            else:
+                file_codec, stream = Serializer.iter_file(self.file_path, progress)
+                self.codec = self.codec or file_codec
+                self._checkpointer.codec = self.codec
+                if self.storage_mode == "journal":
+                    self.documents = DocumentSlots(self._journal.replay(stream))
+                else:
+                    self.documents = DocumentSlots()
+                    self.indexes_dict = self._empty_indexes()
+                    streamed_indexes = self.indexes if build_indexes else []
+                    for doc in stream:
+                        self.documents.append(doc)
+                        for index in streamed_indexes:
+                            for key in self._index_keys(index, doc):
+                                self.indexes_dict[index].append(key, doc['_id'])
+                    indexed = build_indexes
+            self.doc_id_map = self.documents.by_id
             logger.log_operation(
                 "DATA_LOAD",
                 f"collection:{self.name}",
                 "SUCCESS",
-                f"loaded {len(self.documents)} documents"
+                f"loaded {len(self.documents)} documents, journal records:{self._journal.record_count}"
             )
         except (FileNotFoundError, json.JSONDecodeError) as e:
-            self.documents = []
-            self.doc_id_map = {}
+            self.codec = self.codec or DEFAULT_CODEC
+            self._checkpointer.codec = self.codec
+            self.documents = DocumentSlots()
+            self.doc_id_map = self.documents.by_id
+            indexed = False
             logger.log_operation(
                 "DATA_LOAD",
                 f"collection:{self.name}",
                 "INITIALIZED",
                 f"new collection created - {str(e)}"
             )
+        return indexed
+
+    def _save_data(self, changes: List[Dict]):
+        """Save change records to the collection file (only outside transactions).
 
-    def _save_data(self):
-        """Save data to the collection file (only outside transactions)"""
+        In journal mode the records are appended to the journal. Unless
+        the flush policy is ``immediate`` the save is only recorded and the
+        collection marked dirty; ``flush()`` writes everything in one go.
+        """
+        self.modifications += 1
         if self._transaction_id:
             return
+        if self.flush_policy == "immediate":
+            self._write_changes(changes)
+            return
+        with self._flush_lock:
+            self._pending_changes.extend(changes)
+            self._pending_saves += 1
+            self._dirty = True
+            if self.flush_policy == "ops" and self._pending_saves >= self.flush_every:
+                self.flush()
+            elif self.flush_policy == "interval" and self._flush_timer is None:
+                self._flush_timer = threading.Timer(self.flush_every / 1000, self._flush_background)
+                self._flush_timer.daemon = True
+                self._flush_timer.start()
+
+    def set_flush_policy(self, policy: str = "immediate", every: Optional[int] = None):
+        """Choose when saves reach disk: ``immediate``, every N ms (``interval``),
+        every N saves (``ops``) or only on ``flush()``/``close()`` (``close``)"""
+        if policy not in FLUSH_POLICIES:
+            raise ValueError(f"Unsupported flush policy: {policy}")
+        if every is None:
+            every = FLUSH_INTERVAL_MS if policy == "interval" else FLUSH_MAX_OPS
+        if every <= 0:
+            raise ValueError("Flush interval must be positive")
+        if getattr(self, "flush_policy", None) is not None:
+            self.flush()
+        self.flush_policy = policy
+        self.flush_every = every
+
+    def flush(self) -> bool:
+        """Write all pending saves to disk; returns False if nothing was dirty"""
+        with self._flush_lock:
+            if self._flush_timer is not None:
+                self._flush_timer.cancel()
+                self._flush_timer = None
+            if not self._dirty:
+                return False
+            self._write_changes(self._pending_changes)
+            self.coalesced_saves += self._pending_saves - 1
+            self.flush_count += 1
+            self._pending_changes = []
+            self._pending_saves = 0
+            self._dirty = False
+            return True
+
+    def _flush_background(self):
+        with self._flush_lock:
+            self._flush_timer = None
+            try:
+                self.flush()
+            except Exception:
+                # already logged; stay dirty and retry on the next tick
+                if self._flush_timer is None:
+                    self._flush_timer = threading.Timer(self.flush_every / 1000, self._flush_background)
+                    self._flush_timer.daemon = True
+                    self._flush_timer.start()
+
+    def is_dirty(self) -> bool:
+        return self._dirty
+
+    def flush_stats(self) -> Dict:
+        """Flush policy and how many saves were folded into fewer writes"""
+        return {
+            "flush_policy": self.flush_policy,
+            "flush_every": self.flush_every,
+            "dirty": self._dirty,
+            "pending_saves": self._pending_saves,
+            "flushes": self.flush_count,
+            "coalesced_saves": self.coalesced_saves,
+        }
+
+    def _write_changes(self, changes: List[Dict]):
+        """Persist change records right away (JSON collections rewrite the whole file)"""
         try:
-            with open(self.file_path, 'w') as f:
-                json.dump(self.documents, f, indent=2)
+            if self.storage_mode == "segment":
+                self._segment.append(changes)
+                logger.log_operation(
+                    "DATA_SAVE",
+                    f"collection:{self.name}",
+                    "SEGMENT",
+                    f"appended {len(changes)} records"
+                )
+                return
+            if self.storage_mode == "partitioned":
+                touched = sorted(self._partitions.append(changes, self.doc_id_map))
+                logger.log_operation(
+                    "DATA_SAVE",
+                    f"collection:{self.name}",
+                    "PARTITIONED",
+                    f"rewrote partitions {touched}"
+                )
+                return
+            if self.storage_mode == "journal":
+                self._journal.append(changes)
+                self._checkpointer.maybe_start()
+                logger.log_operation(
+                    "DATA_SAVE",
+                    f"collection:{self.name}",
+                    "JOURNALED",
+                    f"appended {len(changes)} records"
+                )
+                return
+            Serializer.dump_file(self.file_path, list(self.documents), self.codec, self.durability)
             logger.log_operation(
                 "DATA_SAVE",
                 f"collection:{self.name}",
                 "SUCCESS",
-                f"saved {len(self.documents)} documents"
+                f"saved {len(self.documents)} documents, codec:{self.codec}, durability:{self.durability}"
             )
         except Exception as e:
             logger.log_operation(
@@ -165,6 +451,115 @@ class Collection:
             )
             raise
 
+    def checkpoint(self, wait: bool = True):
+        """Fold the journal into a fresh base snapshot.
+
+        With ``wait=False`` the checkpoint runs on a background thread.
+        """
+        if self.storage_mode != "journal":
+            return
+        self.flush()
+        if wait:
+            self._checkpointer.wait()
+            self._checkpointer.checkpoint()
+        else:
+            self._checkpointer.start()
+
+    def close(self):
+        """Flush pending saves, finish background work and release file handles"""
+        self._sweeper.stop()
+        with self._write_lock:
+            self.closed = True
+        for build in self._index_builds.values():
+            build.cancel()
+            build.wait()
+        self.flush()
+        self._checkpointer.wait()
+        if self._segment is not None:
+            self._segment.close()
+        self.save_index_snapshot()
+
+    def save_index_snapshot(self) -> bool:
+        """Write the built indexes next to the catalog so the next open skips
+        the rebuild; a no-op if nothing changed since the last snapshot"""
+        if self._catalog is None or not self.indexes or self._transaction_id or self._dirty:
+            return False
+        if any(getattr(postings, "aliased", False) for postings in self.indexes_dict.values()):
+            return False  # a snapshot cannot record a slot filed under two sort keys; rebuild on open
+        self._checkpointer.wait()
+        stamp = data_stamp(self._data_path())
+        if stamp == self._snapshot_stamp:
+            return False
+        try:
+            self._catalog.save_snapshot(self.name, stamp, self.indexes_dict, self.index_definitions())
+            self._snapshot_stamp = stamp
+            logger.log_operation(
+                "INDEX_SNAPSHOT",
+                f"collection:{self.name}",
+                "SAVED",
+                f"indexes:{self.indexes}"
+            )
+            return True
+        except Exception as e:
+            logger.log_operation(
+                "INDEX_SNAPSHOT",
+                f"collection:{self.name}",
+                "FAILED",
+                str(e)
+            )
+            return False
+
+    def set_checkpoint_thresholds(self, max_bytes: Optional[int] = None, max_records: Optional[int] = None):
+        """Tune when a background checkpoint is triggered"""
+        if max_bytes is not None:
+            self._checkpointer.max_bytes = max_bytes
+        if max_records is not None:
+            self._checkpointer.max_records = max_records
+
+    def checkpoint_stats(self) -> Dict:
+        """Journal size and checkpoint timings, for tuning the thresholds"""
+        stats = self._checkpointer.stats()
+        stats["storage_mode"] = self.storage_mode
+        return stats
+
+    def partition_stats(self) -> Dict:
+        """Partition sizes and how many partition files were rewritten"""
+        if self._partitions is None:
+            return {"storage_mode": self.storage_mode}
+        stats = self._partitions.stats()
+        stats["storage_mode"] = self.storage_mode
+        return stats
+
+    def vacuum(self) -> int:
+        """Compact tombstoned document slots now instead of waiting for the background pass"""
+        return self.documents.vacuum()
+
+    def slot_stats(self) -> Dict:
+        """Live documents, tombstones and vacuum runs of the in-memory slots"""
+        return self.documents.stats()
+
+    def estimate_memory(self, sample_size: int = FOOTPRINT_SAMPLE) -> int:
+        """Approximate bytes held by the resident documents and their lookups.
+
+        Sizes an evenly spaced sample of documents and extrapolates, so the
+        cost does not grow with the collection.
+        """
+        if self.storage_mode == "segment":
+            documents = self._segment.decoded_documents()
+            entries = len(self.doc_id_map)
+        else:
+            documents = self.documents
+            entries = len(documents)
+        count = len(documents)
+        overhead = entries * ENTRY_OVERHEAD_BYTES * (1 + len(self.indexes))
+        if count == 0:
+            return overhead
+        step = max(1, count // sample_size)
+        sample = list(itertools.islice(documents, 0, step * sample_size, step))
+        per_document = sum(deep_sizeof(doc) for doc in sample) / len(sample)
+        return int(per_document * count) + overhead
+
+    @_serialized
     def insert_one(self, document: Dict) -> str:
         """Insert a single document into the collection"""
         try:
@@ -173,6 +568,7 @@ class Collection:
             
             if "_id" not in document:
                 document["_id"] = str(uuid4())
+            self._check_unique([document])
             
             if self._transaction_id:
                 operation = {
@@ -187,9 +583,8 @@ class Collection:
                 return document["_id"]
             
             self.documents.append(document)
-            self.doc_id_map[document['_id']] = document
             self._update_indexes(document)
-            self._save_data()
+            self._save_data([{"op": "insert", "doc": document}])
             logger.log_operation(
                 "DOCUMENT_INSERT",
                 f"collection:{self.name}",
@@ -206,6 +601,7 @@ class Collection:
             )
             raise
 
+    @_serialized
     def insert_many(self, documents: List[Dict]) -> List[str]:
         """Insert multiple documents into the collection"""
         if not isinstance(documents, list):
@@ -219,6 +615,7 @@ class Collection:
                 if "_id" not in doc:
                     doc["_id"] = str(uuid4())
                 ids.append(doc["_id"])
+            self._check_unique(documents)
             
             if self._transaction_id:
                 for doc in documents:
@@ -235,9 +632,8 @@ class Collection:
             
             self.documents.extend(documents)
             for doc in documents:
-                self.doc_id_map[doc['_id']] = doc
                 self._update_indexes(doc)
-            self._save_data()
+            self._save_data([{"op": "insert", "doc": doc} for doc in documents])
             logger.log_operation(
                 "DOCUMENT_INSERT_MANY",
                 f"collection:{self.name}",
@@ -254,62 +650,131 @@ class Collection:
             )
             raise
 
+    def _check_unique(self, documents: List[Dict], replacing: bool = False):
+        """Reject documents whose ``_id`` or unique index keys are already taken.
+
+        Each key is a hash probe into the index postings (plus the keys
+        claimed earlier in the current transaction), and keys repeated within
+        ``documents`` are caught too. With ``replacing`` the documents are new
+        versions of stored ones, so their own ``_id`` is not a conflict.
+        Raises ValueError; inside a transaction the checked keys are claimed.
+        """
+        claimed = {}
+        for doc in documents:
+            doc_id = doc["_id"]
+            if not replacing:
+                if (doc_id in self.doc_id_map or ("_id", doc_id) in claimed
+                        or ("_id", doc_id) in self._transaction_keys):
+                    raise ValueError(f"Duplicate _id: {doc_id}")
+                claimed[("_id", doc_id)] = doc_id
+            for index in self.unique_indexes:
+                for key in self._index_keys(index, doc):
+                    owner = claimed.get((index, key), _MISSING)
+                    if owner is _MISSING:
+                        owner = self._unique_owner(index, key, doc_id)
+                    if owner is not _MISSING and owner != doc_id:
+                        raise ValueError(f"Duplicate key for unique index {index}: {key!r} (already used by _id {owner})")
+                    claimed[(index, key)] = doc_id
+        if self._transaction_id:
+            self._transaction_keys.update(claimed)
+
+    def _unique_owner(self, index: str, key: Any, doc_id: Any) -> Any:
+        """_id of another live document indexed under ``key``, or _MISSING.
+
+        Postings may still list a document whose value has since changed, so
+        each candidate is confirmed against its current value.
+        """
+        candidates = list(self.indexes_dict[index].get(key, ()))
+        candidates.append(self._transaction_keys.get((index, key), _MISSING))
+        for owner in candidates:
+            if owner is _MISSING or owner == doc_id:
+                continue
+            doc = self.doc_id_map.get(owner)
+            if doc is None:
+                # a document inserted earlier in the transaction is not stored yet
+                if self._transaction_keys.get(("_id", owner)) == owner:
+                    return owner
+            elif key in self._index_keys(index, doc):
+                return owner
+        return _MISSING
+
+    @staticmethod
+    def _apply_update(doc: Dict, update: Dict):
+        """Apply a ``$set``/``$unset``/``$push`` (or plain field) update to a document in place"""
+        if "$set" in update:
+            deep_update(doc, update["$set"])
+        elif "$unset" in update:
+            for field in update["$unset"]:
+                if field in doc:
+                    del doc[field]
+        elif "$push" in update:
+            for field, value in update["$push"].items():
+                if field not in doc:
+                    doc[field] = []
+                if not isinstance(doc[field], list):
+                    raise ValueError(f"Cannot push to non-array field: {field}")
+                doc[field].append(value)
+        else:
+            deep_update(doc, update)
+
+    def _update_operation(self, doc: Dict, update: Dict) -> Dict:
+        """Transaction log record for an update of ``doc``"""
+        operation = {
+            'type': 'update',
+            'collection': self.name,
+            'doc_id': doc['_id'],
+            'original_doc': copy.deepcopy(doc),  # nested values are updated in place,
+            'timestamp': time.time()
+        }
+        if "$set" in update:
+            operation['set'] = update["$set"]
+        elif "$unset" in update:
+            operation['unset'] = update["$unset"]
+        elif "$push" in update:
+            operation['push'] = update["$push"]
+        else:
+            operation['set'] = update
+        return operation
+
+    def _updated_copy(self, doc: Dict, update: Dict) -> Dict:
+        """What ``doc`` would look like after ``update``, for constraint checks"""
+        candidate = copy.deepcopy(doc)
+        self._apply_update(candidate, update)
+        return candidate
+
+    def _swap_updated(self, doc: Dict, updated: Dict):
+        """Move ``doc`` to its already updated contents, re-indexing it.
+
+        The update is applied to a copy first, so one that raises halfway
+        (e.g. ``$push`` onto a non-array) leaves the document and its index
+        postings untouched.
+        """
+        self._update_indexes(doc, is_delete=True)
+        doc.clear()
+        doc.update(updated)
+        self.doc_id_map[doc['_id']] = doc
+        self._update_indexes(doc)
+
+    @_serialized
     def update_one(self, query: Dict, update: Dict) -> bool:
         """Update a single document matching the query"""
         try:
-            for i, doc in enumerate(self.documents):
-                if match_document(doc, query):
+            matches = compile_query(query)
+            for doc in self.documents:
+                if matches(doc):
+                    updated = self._updated_copy(doc, update)
+                    if self.unique_indexes:
+                        self._check_unique([updated], replacing=True)
                     if self._transaction_id:
-                        original_doc = doc.copy()
-                        operation = {
-                            'type': 'update',
-                            'collection': self.name,
-                            'doc_id': doc['_id'],
-                            'original_doc': original_doc,
-                            'timestamp': time.time()
-                        }
-                        if "$set" in update:
-                            operation['set'] = update["$set"]
-                            deep_update(doc, update["$set"])
-                        elif "$unset" in update:
-                            operation['unset'] = update["$unset"]
-                            for field in update["$unset"]:
-                                if field in doc:
-                                    del doc[field]
-                        elif "$push" in update:
-                            operation['push'] = update["$push"]
-                            for field, value in update["$push"].items():
-                                if field not in doc:
-                                    doc[field] = []
-                                if not isinstance(doc[field], list):
-                                    raise ValueError(f"Cannot push to non-array field: {field}")
-                                doc[field].append(value)
-                        else:
-                            operation['set'] = update
-                            deep_update(doc, update)
+                        operation = self._update_operation(doc, update)
+                        self._swap_updated(doc, updated)  # held in memory until the commit saves it
                         self._transaction_buffer.append(operation)
                         if self._log_operation:
                             self._log_operation(operation)
                         return True
                     
-                    if "$set" in update:
-                        deep_update(doc, update["$set"])
-                    elif "$unset" in update:
-                        for field in update["$unset"]:
-                            if field in doc:
-                                del doc[field]
-                    elif "$push" in update:
-                        for field, value in update["$push"].items():
-                            if field not in doc:
-                                doc[field] = []
-                            if not isinstance(doc[field], list):
-                                raise ValueError(f"Cannot push to non-array field: {field}")
-                            doc[field].append(value)
-                    else:
-                        deep_update(doc, update)
-                    self.doc_id_map[doc['_id']] = doc
-                    self._update_indexes(doc)
-                    self._save_data()
+                    self._swap_updated(doc, updated)
+                    self._save_data([{"op": "update", "doc": doc}])
                     logger.log_operation(
                         "DOCUMENT_UPDATE",
                         f"collection:{self.name}",
@@ -334,65 +799,32 @@ class Collection:
             )
             raise
 
+    @_serialized
     def update_many(self, query: Dict, update: Dict) -> int:
         """Update all documents matching the query"""
         count = 0
+        changes = []
         try:
-            for doc in self.documents:
-                if match_document(doc, query):
-                    if self._transaction_id:
-                        original_doc = doc.copy()
-                        operation = {
-                            'type': 'update',
-                            'collection': self.name,
-                            'doc_id': doc['_id'],
-                            'original_doc': original_doc,
-                            'timestamp': time.time()
-                        }
-                        if "$set" in update:
-                            operation['set'] = update["$set"]
-                            deep_update(doc, update["$set"])
-                        elif "$unset" in update:
-                            operation['unset'] = update["$unset"]
-                            for field in update["$unset"]:
-                                if field in doc:
-                                    del doc[field]
-                        elif "$push" in update:
-                            operation['push'] = update["$push"]
-                            for field, value in update["$push"].items():
-                                if field not in doc:
-                                    doc[field] = []
-                                if not isinstance(doc[field], list):
-                                    raise ValueError(f"Cannot push to non-array field: {field}")
-                                doc[field].append(value)
-                        else:
-                            operation['set'] = update
-                            deep_update(doc, update)
-                        self._transaction_buffer.append(operation)
-                        if self._log_operation:
-                            self._log_operation(operation)
-                    else:
-                        if "$set" in update:
-                            deep_update(doc, update["$set"])
-                        elif "$unset" in update:
-                            for field in update["$unset"]:
-                                if field in doc:
-                                    del doc[field]
-                        elif "$push" in update:
-                            for field, value in update["$push"].items():
-                                if field not in doc:
-                                    doc[field] = []
-                                if not isinstance(doc[field], list):
-                                    raise ValueError(f"Cannot push to non-array field: {field}")
-                                doc[field].append(value)
-                        else:
-                            deep_update(doc, update)
-                        self.doc_id_map[doc['_id']] = doc
-                        self._update_indexes(doc)
-                    count += 1
+            matched = list(filter(compile_query(query), self.documents))
+            # update copies of the whole batch first so a failing update or
+            # a unique violation changes nothing
+            updates = [self._updated_copy(doc, update) for doc in matched]
+            if updates and self.unique_indexes:
+                self._check_unique(updates, replacing=True)
+            for doc, updated in zip(matched, updates):
+                if self._transaction_id:
+                    operation = self._update_operation(doc, update)
+                    self._swap_updated(doc, updated)  # held in memory until the commit saves it
+                    self._transaction_buffer.append(operation)
+                    if self._log_operation:
+                        self._log_operation(operation)
+                else:
+                    self._swap_updated(doc, updated)
+                    changes.append({"op": "update", "doc": doc})
+                count += 1
             
             if count > 0 and not self._transaction_id:
-                self._save_data()
+                self._save_data(changes)
             logger.log_operation(
                 "DOCUMENT_UPDATE_MANY",
                 f"collection:{self.name}",
@@ -409,11 +841,13 @@ class Collection:
             )
             raise
         
+    @_serialized
     def delete_one(self, query: Dict) -> bool:
         """Delete a single document matching the query"""
         try:
-            for i, doc in enumerate(self.documents):
-                if match_document(doc, query):
+            matches = compile_query(query)
+            for doc in self.documents:
+                if matches(doc):
                     if self._transaction_id:
                         operation = {
                             'type': 'delete',
@@ -425,14 +859,12 @@ class Collection:
                         self._transaction_buffer.append(operation)
                         if self._log_operation:
                             self._log_operation(operation)
-                        self.documents.pop(i)
-                        self.doc_id_map.pop(doc['_id'], None)
+                        self.documents.remove_id(doc['_id'])
                         return True
                     
-                    del self.documents[i]
-                    self.doc_id_map.pop(doc['_id'], None)
+                    self.documents.remove_id(doc['_id'])
                     self._update_indexes(doc, is_delete=True)
-                    self._save_data()
+                    self._save_data([{"op": "delete", "_id": doc['_id']}])
                     logger.log_operation(
                         "DOCUMENT_DELETE",
                         f"collection:{self.name}",
@@ -457,13 +889,16 @@ class Collection:
             )
             raise
 
+    @_serialized
     def delete_many(self, query: Dict) -> int:
         """Delete all documents matching the query"""
         try:
             deleted_count = 0
-            new_documents = []
+            matched = []
+            changes = []
+            matches = compile_query(query)
             for doc in self.documents:
-                if match_document(doc, query):
+                if matches(doc):
                     if self._transaction_id:
                         operation = {
                             'type': 'delete',
@@ -478,14 +913,14 @@ class Collection:
                         deleted_count += 1
                     else:
                         self._update_indexes(doc, is_delete=True)
+                        changes.append({"op": "delete", "_id": doc['_id']})
                         deleted_count += 1
-                else:
-                    new_documents.append(doc)
+                    matched.append(doc['_id'])
             
-            self.documents = new_documents
-            self.doc_id_map = {doc['_id']: doc for doc in new_documents}
+            for doc_id in matched:
+                self.documents.remove_id(doc_id)
             if deleted_count > 0 and not self._transaction_id:
-                self._save_data()
+                self._save_data(changes)
             logger.log_operation(
                 "DOCUMENT_DELETE_MANY",
                 f"collection:{self.name}",
@@ -502,9 +937,24 @@ class Collection:
             )
             raise
 
-    def find(self, query: Optional[Dict] = None) -> List[Dict]:
-        """Find documents matching query with proper index usage"""
+    def find(self, query: Optional[Dict] = None, projection: Optional[Dict] = None) -> List[Dict]:
+        """Find documents matching query with proper index usage.
+
+        ``projection`` (``{"field": 1, ...}``) keeps only the listed fields,
+        as the aggregation ``$project`` stage does. When the query and the
+        listed fields are all on one index, the rows are read from the index
+        alone (a covered query) without touching the documents. The plan the
+        query took is left in ``last_plan``.
+        """
         start_time = time.perf_counter()
+        if projection:
+            covered = self._covered_rows(query, projection) if query and self.indexing_enabled else None
+            if covered is not None:
+                rows, index = covered
+                self._log_query_performance("COVERED", start_time, len(rows), field=index,
+                                            reason="Projection answered from the index alone", query=query, examined=0)
+                return rows
+            return self._project_documents(self.find(query), projection)
         
         if not query:
             results = self.documents.copy()
@@ -512,43 +962,358 @@ class Collection:
             self._log_query_performance("FULL_SCAN", start_time, len(results), reason="No query provided")
             return results
         
+        if "$text" in query:
+            return self._text_search(query, start_time)
+        
         if self.indexing_enabled:
-            for field, value in query.items():
-                if field in self.indexes:
-                    if not isinstance(value, dict):
-                        if value in self.indexes_dict[field]:
-                            doc_ids = self.indexes_dict[field][value]
-                            results = [self.doc_id_map[doc_id] for doc_id in doc_ids 
-                                     if doc_id in self.doc_id_map and self._matches_query(self.doc_id_map[doc_id], query)]
-                            self._log_query_performance("INDEX_USED", start_time, len(results), field=field, reason="Direct equality match")
-                            print(f"Query (direct equality): {query}, Indexing Enabled: {self.indexing_enabled}, Indexes: {self.indexes}")
-                            return results
-                    elif "$eq" in value and value["$eq"] in self.indexes_dict[field]:
-                        doc_ids = self.indexes_dict[field][value["$eq"]]
-                        results = [self.doc_id_map[doc_id] for doc_id in doc_ids 
-                                 if doc_id in self.doc_id_map and self._matches_query(self.doc_id_map[doc_id], query)]
-                        self._log_query_performance("INDEX_USED", start_time, len(results), field=field, reason="Operator-based equality match")
-                        print(f"Query ($eq): {query}, Indexing Enabled: {self.indexing_enabled}, Indexes: {self.indexes}")
-                        return results
-                    elif "$in" in value:
-                        doc_ids = []
-                        for val in value["$in"]:
-                            if val in self.indexes_dict[field]:
-                                doc_ids.extend(self.indexes_dict[field][val])
-                        doc_ids = list(set(doc_ids))  # Remove duplicates
-                        results = [self.doc_id_map[doc_id] for doc_id in doc_ids 
-                                 if doc_id in self.doc_id_map and self._matches_query(self.doc_id_map[doc_id], query)]
-                        self._log_query_performance("INDEX_USED", start_time, len(results), field=field, reason="In operator match")
-                        print(f"Query ($in): {query}, Indexing Enabled: {self.indexing_enabled}, Indexes: {self.indexes}")
-                        return results
+            plan = self._plan_query(query)
+            if plan is not None:
+                doc_ids, used = plan
+                matches = compile_query(query)
+                results = [self.doc_id_map[doc_id] for doc_id in doc_ids
+                         if doc_id in self.doc_id_map and matches(self.doc_id_map[doc_id])]
+                reason = "Index lookup" if len(used) == 1 else f"Intersected {len(used)} index postings"
+                self._log_query_performance("INDEX_USED", start_time, len(results), field=", ".join(used), reason=reason,
+                                            query=query, examined=len(doc_ids))
+                print(f"Query (indexes {used}): {query}, Indexing Enabled: {self.indexing_enabled}, Indexes: {self.indexes}")
+                return results
         
-        results = [doc for doc in self.documents if self._matches_query(doc, query)]
-        self._log_query_performance("FULL_SCAN", start_time, len(results), reason="No suitable index found")
+        results = list(filter(compile_query(query), self.documents))
+        self._log_query_performance("FULL_SCAN", start_time, len(results), reason="No suitable index found",
+                                    query=query, examined=len(self.documents))
+        return results
+
+    def _text_search(self, query: Dict, start_time: float) -> List[Dict]:
+        """Answer ``{"$text": {"$search": "..."}, ...}`` from the text index.
+
+        Documents containing any of the search terms are returned best BM25
+        score first; the other fields of the query filter them as usual.
+        """
+        search = query["$text"]
+        if not isinstance(search, dict) or not isinstance(search.get("$search"), str):
+            raise ValueError('$text needs a search string: {"$text": {"$search": "words"}}')
+        index = next((index for index in self.indexes if self.index_types[index] == "text"), None)
+        if index is None:
+            raise ValueError(f"$text query requires a text index on collection {self.name}")
+        rest = {field: condition for field, condition in query.items() if field != "$text"}
+        if not self._usable(index, rest):
+            raise ValueError(f"$text query must also match the filter of the partial text index: {self.index_filters[index]}")
+        results = []
+        matches = compile_query(rest)
+        hits = self.indexes_dict[index].search(search["$search"])
+        for doc_id, _ in hits:
+            doc = self.doc_id_map.get(doc_id)
+            if doc is not None and matches(doc):
+                results.append(doc)
+        self._log_query_performance("INDEX_USED", start_time, len(results), field=index, reason="Text search ranked by BM25",
+                                    query=query, examined=len(hits))
         return results
 
-    def _log_query_performance(self, scan_type, start_time, result_count, field=None, reason=None):
-        """Log query performance with additional context"""
+    def _usable(self, index: str, query: Dict, context: Sequence[Dict] = ()) -> bool:
+        """Whether ``index`` holds every document ``query`` can match: always,
+        unless it is a partial index whose filter the query (or an enclosing
+        conjunction in ``context``) does not imply"""
+        condition = self.index_filters.get(index)
+        return condition is None or any(query_implies(conjunct, condition) for conjunct in (query, *context))
+
+    def _plan_query(self, query: Dict, context: Sequence[Dict] = ()) -> Optional[tuple]:
+        """Candidate ids for ``query`` from its indexes, or None if it needs a full scan.
+
+        Every predicate an index can answer contributes its postings: bitmap
+        predicates are ANDed as bitmaps first, a compound index contributes
+        the span for the fields it covers, and ``$or`` contributes the union
+        of its branches (only when every branch can use an index). The
+        postings are then intersected smallest first. Returns
+        ``(ids, indexes used)``; callers still check each candidate against
+        the whole query. Partial indexes are only used when the query implies
+        their filter; ``context`` holds the conjunctions around an ``$or``
+        branch.
+        """
+        sources, used, bitmap = [], [], None
+        compound = self._compound_plan(query, context)
+        postings = None if compound is None else self._compound_postings(*compound)
+        if postings is not None:
+            sources.append(postings)
+            used.append(compound[0])
+        for field, condition in query.items():
+            if field == "$or":
+                conjunct = {field: condition for field, condition in query.items() if field != "$or"}
+                branches = [self._plan_query(branch, (*context, conjunct)) for branch in condition
+                            if isinstance(branch, dict) and branch] if isinstance(condition, list) else []
+                if branches and len(branches) == len(condition) and None not in branches:
+                    sources.append(list(dict.fromkeys(itertools.chain.from_iterable(ids for ids, _ in branches))))
+                    used.append("$or")
+                continue
+            if field in self.index_filters and not self._usable(field, query, context):
+                continue
+            postings = self._predicate_postings(field, condition)
+            if postings is None:
+                continue
+            if isinstance(postings, Bitmap):
+                bitmap = postings if bitmap is None else bitmap & postings
+            else:
+                sources.append(postings)
+            used.append(field)
+        if bitmap is not None:
+            sources.append(bitmap)
+        if not sources:
+            return None
+        return self._intersect(sources), used
+
+    def _compound_postings(self, index: str, prefix: List[Any], conditions: Optional[Dict]) -> Optional[List]:
+        """Ids in the span of compound ``index`` that ``_compound_plan`` chose,
+        or None if the index cannot answer it"""
+        try:
+            if len(prefix) == len(self.index_fields[index]):
+                return self.indexes_dict[index].get(tuple(prefix), [])
+            return self.indexes_dict[index].range_ids(conditions, prefix)
+        except TypeError:
+            return None  # unhashable or incomparable value; leave it to the scan
+
+    def _predicate_postings(self, field: str, condition: Any) -> Optional[Union[List, Bitmap]]:
+        """Ids the index on ``field`` gives for one predicate (a Bitmap for bitmap
+        indexes), or None if there is no index that can answer it"""
+        postings = self.indexes_dict.get(field)
+        index_type = self.index_types.get(field)
+        if postings is None or index_type == "text" or len(self.index_fields[field]) > 1:
+            return None
+        try:
+            if not isinstance(condition, dict):
+                values = [condition]
+            elif "$eq" in condition:
+                values = [condition["$eq"]]
+            elif "$in" in condition:
+                values = list(condition["$in"])
+            elif index_type == "bitmap" and "$ne" in condition:
+                return postings.complement(condition["$ne"])
+            elif index_type == "ordered" and any(op in condition for op in RANGE_OPERATORS):
+                return postings.range_ids(condition)
+            else:
+                return None
+            if index_type == "bitmap":
+                return postings.union(values)
+            if len(values) == 1:
+                return postings.get(values[0], [])
+            return list(dict.fromkeys(itertools.chain.from_iterable(postings.get(value, ()) for value in values)))
+        except TypeError:
+            return None  # unhashable value; leave it to the scan
+
+    def _intersect(self, sources: List[Union[List, Bitmap]], complete: bool = False) -> List[Any]:
+        """Intersect posting sets, smallest first.
+
+        Once the next posting is more than ``INTERSECT_RATIO`` times the
+        surviving candidates, checking the remaining predicates on the
+        candidates themselves is cheaper than reading the posting, so the
+        intersection stops there, unless ``complete`` asks for the exact
+        intersection (covered plans never read the candidates).
+        """
+        sources = sorted(sources, key=len)
+        first = sources[0]
+        candidates = self._doc_numbers.ids(first) if isinstance(first, Bitmap) else list(first)
+        for source in sources[1:]:
+            if not candidates or (not complete and len(source) > len(candidates) * INTERSECT_RATIO):
+                break
+            if isinstance(source, Bitmap):
+                # a candidate without a number was never filed in any bitmap index
+                numbers = map(self._doc_numbers.lookup, candidates)
+                candidates = [doc_id for doc_id, number in zip(candidates, numbers)
+                              if number is not None and number in source]
+            else:
+                members = set(source)
+                candidates = [doc_id for doc_id in candidates if doc_id in members]
+        return candidates
+
+    def _compound_plan(self, query: Dict, context: Sequence[Dict] = ()) -> Optional[tuple]:
+        """Pick the compound index covering the most query fields.
+
+        Returns ``(index, prefix, conditions)``: equality values for a leftmost
+        prefix of the index fields and, for ordered indexes, the range
+        conditions on the next field (or None). Hash compound indexes only
+        answer the full key. A plan covering a single field is skipped when
+        that field has its own index. A sparse index lacks the documents
+        missing any of its fields, so it needs a condition on every field.
+        """
+        best, best_covered = None, 0
+        for index in self.indexes:
+            fields = self.index_fields[index]
+            if len(fields) == 1 or self.index_types[index] == "text":
+                continue
+            if index in self.sparse_indexes and not all(field in query for field in fields):
+                continue
+            if not self._usable(index, query, context):
+                continue
+            prefix = []
+            for field in fields:
+                value = query.get(field, _MISSING)
+                if value is _MISSING or isinstance(value, list) or (isinstance(value, dict) and "$eq" not in value):
+                    break
+                prefix.append(value["$eq"] if isinstance(value, dict) else value)
+            conditions = None
+            if self.index_types[index] == "ordered":
+                if len(prefix) < len(fields):
+                    value = query.get(fields[len(prefix)])
+                    if isinstance(value, dict) and any(op in value for op in RANGE_OPERATORS):
+                        conditions = value
+            elif len(prefix) < len(fields):
+                continue
+            covered = len(prefix) + (conditions is not None)
+            if covered == 1 and fields[0] in self.indexes:
+                continue
+            if covered > best_covered:
+                best, best_covered = (index, prefix, conditions), covered
+        return best
+
+    def _covered_plan(self, query: Dict, context: Sequence[Dict] = ()) -> Optional[tuple]:
+        """Postings that answer ``query`` exactly, or None.
+
+        ``_plan_query`` only narrows the candidates down; here every
+        predicate has to be answered by an index, so each id matches without
+        its document being read: equality and ``$in`` on scalar values,
+        ranges on an ordered index, ``$or`` branches that are covered
+        themselves, and predicates implied by the filter of a partial index
+        in use. Only indexes whose keys give the stored values back answer
+        (see ``_check_coverable``): a range over a slot shared by True and 1
+        holds documents the range does not match. Returns ``(sources,
+        indexes used)``; ``_covered_ids`` intersects the sources.
+        """
+        sources, used, bitmap, answered, unanswered = [], [], None, set(), {}
+        compound = self._compound_plan(query, context)
+        postings = None
+        if compound is not None and self._coverable(compound[0]):
+            postings = self._compound_postings(*compound)
+        if postings is not None:
+            index, prefix, conditions = compound
+            sources.append(postings)
+            used.append(index)
+            covered = self.index_fields[index][:len(prefix) + (conditions is not None)]
+            answered.update(field for field in covered if self._exact_condition(query[field], self.index_types[index]))
+        for field, condition in query.items():
+            if field == "$or":
+                conjunct = {field: condition for field, condition in query.items() if field != "$or"}
+                if not isinstance(condition, list) or not condition:
+                    return None
+                branches = []
+                for branch in condition:
+                    plan = self._covered_plan(branch, (*context, conjunct)) if isinstance(branch, dict) and branch else None
+                    if plan is None:
+                        return None
+                    ids = self._covered_ids(plan[0])
+                    branches.append(self._doc_numbers.ids(ids) if isinstance(ids, Bitmap) else ids)
+                sources.append(list(dict.fromkeys(itertools.chain.from_iterable(branches))))
+                used.append("$or")
+                continue
+            if field in answered:
+                continue
+            postings = None
+            if (self._exact_condition(condition, self.index_types.get(field))
+                    and (field not in self.index_filters or self._usable(field, query, context))
+                    and self._coverable(field)):
+                postings = self._predicate_postings(field, condition)
+            if postings is None:
+                unanswered[field] = condition
+                continue
+            if isinstance(postings, Bitmap):
+                bitmap = postings if bitmap is None else bitmap & postings
+            else:
+                sources.append(postings)
+            used.append(field)
+        filters = [self.index_filters[index] for index in used if index in self.index_filters]
+        for field, condition in unanswered.items():
+            if not any(query_implies(condition_filter, {field: condition}) for condition_filter in filters):
+                return None
+        if bitmap is not None:
+            sources.append(bitmap)
+        if not sources:
+            return None
+        return sources, used
+
+    @staticmethod
+    def _exact_condition(condition: Any, index_type: Optional[str]) -> bool:
+        """Whether an index of ``index_type`` matches exactly the documents
+        ``condition`` does (bitmap ``$ne`` does not: it keeps arrays holding
+        the value among others)"""
+        if not isinstance(condition, dict):
+            return _scalar(condition)
+        if len(condition) == 1 and "$eq" in condition:
+            return _scalar(condition["$eq"])
+        if len(condition) == 1 and "$in" in condition:
+            return isinstance(condition["$in"], list) and all(_scalar(value) for value in condition["$in"])
+        return (index_type == "ordered" and bool(condition)
+                and all(op in RANGE_OPERATORS and _scalar(value) for op, value in condition.items()))
+
+    def _covered_ids(self, sources: List[Union[List, Bitmap]]) -> Union[List, Bitmap]:
+        """Exact ids of a covered plan: its only source, or the full intersection"""
+        if len(sources) == 1:
+            return sources[0]
+        return self._intersect(sources, complete=True)
+
+    def _covered_rows(self, query: Dict, projection: Dict) -> Optional[tuple]:
+        """``(rows, index)`` projecting ``query``'s matches from one index, or None.
+
+        The query must be covered by a single index holding every projected
+        field (``_id`` is the posting itself), and the index must give the
+        stored values back (see ``_check_coverable``). Rows are built from
+        the keys of the index span the query reads. A key holding None (a
+        missing trailing field) is read from the document instead.
+        """
+        if any(value not in (1, True) for value in projection.values()):
+            return None
+        plan = self._covered_plan(query)
+        if plan is None or len(plan[1]) != 1:
+            return None
+        index = plan[1][0]
+        fields = self.index_fields.get(index)
+        if (fields is None or self.index_types[index] == "text"
+                or not all(field == "_id" or (field in fields and "." not in field) for field in projection)
+                or not self._coverable(index)):
+            return None
+        postings = self.indexes_dict[index]
+        if len(fields) > 1:
+            _, prefix, conditions = self._compound_plan(query)
+            prefix = [self._stored_number(index, field, value) for field, value in zip(fields, prefix)]
+            keys = [tuple(prefix)] if len(prefix) == len(fields) else postings.range_keys(conditions, prefix)
+        else:
+            condition = query[index]
+            if not isinstance(condition, dict):
+                keys = [condition]
+            elif "$eq" in condition:
+                keys = [condition["$eq"]]
+            elif "$in" in condition:
+                keys = list(dict.fromkeys(condition["$in"]))
+            else:
+                keys = postings.range_keys(condition)
+            if not isinstance(condition, dict) or "$eq" in condition or "$in" in condition:
+                keys = [self._stored_number(index, index, key) for key in keys]
+        positions = {field: position for position, field in enumerate(fields)}
+        rows = []
+        for key in keys:
+            values = key if len(fields) > 1 else (key,)
+            for doc_id in postings.get(key) or ():
+                if None in values:
+                    rows.extend(self._project_documents([self.doc_id_map[doc_id]], projection))
+                else:
+                    rows.append({field: doc_id if field == "_id" else values[positions[field]] for field in projection})
+        return rows, index
+
+    def _stored_number(self, index: str, field: str, value: Any) -> Any:
+        """A queried number as the type the documents hold it in (3.0 -> 3),
+        so covered rows show the stored value rather than the queried one"""
+        number_type = self._number_types.get((index, field))
+        if (number_type is not None and isinstance(value, (int, float)) and type(value) is not number_type
+                and float(value).is_integer()):
+            return number_type(value)
+        return value
+
+    def _log_query_performance(self, scan_type, start_time, result_count, field=None, reason=None,
+                               query=None, examined=None):
+        """Log query performance with additional context, and count the query's
+        shape in ``workload`` (``examined``: documents checked against it)"""
+        self.last_plan = scan_type
         elapsed_ms = (time.perf_counter() - start_time) * 1000
+        if query:
+            stats = self.workload.record(query, scan_type, examined or 0, result_count, elapsed_ms)
+            if scan_type == "FULL_SCAN" and self.auto_index_threshold and stats["scans"] >= self.auto_index_threshold:
+                self._auto_index()
         log_msg = f"{scan_type} query returned {result_count} docs in {elapsed_ms:.2f}ms"
         if field:
             log_msg += f" (used index on {field})"
@@ -562,59 +1327,92 @@ class Collection:
         )
 
     def _matches_query(self, doc: Dict, query: Dict) -> bool:
-        """Check if a document matches the query criteria"""
-        for field, condition in query.items():
-            if field not in doc:
-                return False
-            if isinstance(condition, dict):
-                for op, value in condition.items():
-                    if op == "$gt":
-                        if not doc[field] > value:
-                            return False
-                    elif op == "$lt":
-                        if not doc[field] < value:
-                            return False
-                    elif op == "$eq":
-                        if not doc[field] == value:
-                            return False
-                    elif op == "$ne":
-                        if not doc[field] != value:
-                            return False
-                    elif op == "$in":
-                        if doc[field] not in value:
-                            return False
-                    else:
-                        return False
-            else:
-                if doc[field] != condition:
-                    return False
-        return True
+        """Check if a document matches the query criteria (see ``compile_query``;
+        loops over many documents compile the query once instead)"""
+        return compile_query(query)(doc)
 
     def aggregate(self, pipeline: List[Dict]) -> List[Dict]:
-        """Perform aggregation operations"""
-        results = self.documents.copy()
-        for stage in pipeline:
+        """Perform aggregation operations.
+
+        ``$sort`` sorts only as many documents as the ``$skip``/``$limit``
+        stages right after it keep, and walks an ordered index instead when
+        one matches the sort fields.
+        """
+        results = self.documents  # copied only if no stage replaces it
+        whole = True  # results are still self.documents
+        stored = True  # results are stored documents (not grouped or projected)
+        for position, stage in enumerate(pipeline):
             if "$match" in stage:
-                results = [doc for doc in results if Query.evaluate(doc, stage["$match"])]
+                results = list(filter(compile_query(stage["$match"]), results))
+                whole = False
             elif "$group" in stage:
                 results = self._group_documents(results, stage["$group"])
+                whole = stored = False
             elif "$sort" in stage:
-                results = sorted(results, key=lambda x: self._get_sort_key(x, stage["$sort"]))
+                spec = check_sort_spec(stage["$sort"])
+                limit = self._sort_limit(pipeline[position + 1:])
+                ordered = self._index_sort(spec, results, limit, whole) if stored else None
+                results = ordered if ordered is not None else sort_documents(results, spec, self._get_field_value, limit)
+                whole = False
             elif "$limit" in stage:
-                results = results[:stage["$limit"]]
+                results = list(itertools.islice(results, stage["$limit"]))
+                whole = False
             elif "$skip" in stage:
-                results = results[stage["$skip"]:]
+                results = list(itertools.islice(results, stage["$skip"], None))
+                whole = False
             elif "$project" in stage:
                 results = self._project_documents(results, stage["$project"])
-        return results
+                whole = stored = False
+        return self.documents.copy() if whole else results
 
-    def _get_sort_key(self, doc: Dict, sort_spec: Dict) -> tuple:
-        """Generate sort key for a document"""
-        keys = []
-        for field, order in sort_spec.items():
-            value = self._get_field_value(doc, field)
-            keys.append((value, order))
-        return tuple(keys)
+    @staticmethod
+    def _sort_limit(stages: List[Dict]) -> Optional[int]:
+        """How many sorted documents the ``$skip``/``$limit`` stages following
+        a ``$sort`` can keep, or None if they do not bound it"""
+        skipped = 0
+        for stage in stages:
+            if "$skip" in stage:
+                skipped += stage["$skip"]
+            elif "$limit" in stage:
+                return skipped + stage["$limit"]
+            else:
+                return None
+        return None
+
+    def _index_sort(self, spec: Dict, documents: List[Dict], limit: Optional[int],
+                    whole: bool) -> Optional[List[Dict]]:
+        """``documents`` in ``spec`` order read off an ordered index, or None.
+
+        The sort fields (one direction) must lead an ordered index that
+        files every document under its own values (see ``_check_coverable``);
+        its keys are then already in the total sort order, so the walk stops
+        after ``limit`` documents. ``whole`` says ``documents`` are all of
+        them; otherwise the walk keeps those in it.
+        """
+        fields = list(spec)
+        if not self.indexing_enabled or len(set(spec.values())) != 1 or any("." in field for field in fields):
+            return None
+        index = next((index for index in self.indexes
+                      if self.index_types[index] == "ordered" and self.index_fields[index][:len(fields)] == fields
+                      and index not in self.index_filters and index not in self.sparse_indexes
+                      and self._coverable(index)), None)
+        if index is None:
+            return None
+        postings = self.indexes_dict[index]
+        reverse = spec[fields[0]] == -1
+        # documents missing the leading field are not indexed; they sort first
+        if not reverse and sum(map(len, dict.values(postings))) != len(self.documents):
+            return None
+        members = None if whole else {doc["_id"] for doc in documents}
+        results = []
+        for key in postings.ordered_keys(reverse):
+            for doc_id in dict.__getitem__(postings, key):
+                if members is None or doc_id in members:
+                    results.append(self.doc_id_map[doc_id])
+                    if limit is not None and len(results) >= limit:
+                        return results
+        # descending, they sort last: only a walk that ran out can miss them
+        return results if len(results) == len(documents) else None
 
     def _get_field_value(self, doc: Dict, field_path: str) -> Any:
         """Get a nested field value from a document using dot notation"""
@@ -733,49 +1531,210 @@ class Collection:
         else:
             raise ValueError(f"Unsupported aggregation operator: {operator}")
 
+    def _empty_indexes(self, postings: Optional[Dict[str, Dict[Any, List]]] = None) -> Dict[str, Dict[Any, List]]:
+        """Fresh postings for every index (or ones filled from a snapshot's
+        ``postings``), typed per its definition"""
+        self._doc_numbers = DocumentNumbers()  # shared by the bitmap indexes
+        postings = postings or {}
+        return {index: new_index(self.index_types[index], postings.get(index),
+                                 len(self.index_fields[index]), self._doc_numbers,
+                                 index in self.stemmed_indexes)
+                for index in self.indexes}
+
+    def _index_keys(self, index: str, doc: Dict) -> List[Any]:
+        """Keys a document is indexed under: the field value, or for a compound
+        index the tuple of field values (None for missing trailing fields).
+
+        Fields may be dotted paths. An array is indexed under each of its
+        elements (multikey), so a compound index gets one key per combination.
+        Documents without the (leading) field are not indexed, nor are those
+        outside a partial index's filter or, for a sparse index, those
+        lacking any of its fields. A text index has a single key: the
+        strings of all its fields, joined.
+        """
+        fields = self.index_fields[index]
+        condition = self.index_filters.get(index)
+        if condition is not None:
+            matches = self._filter_matches.get(index)
+            if matches is None:
+                matches = self._filter_matches[index] = compile_query(condition)
+            if not matches(doc):
+                return []
+        if self.index_types[index] == "text":
+            return [" ".join(value for field in fields for value in field_candidates(doc, field)
+                             if isinstance(value, str))]
+        if index not in self._uncoverable:
+            self._check_coverable(index, doc)
+        keys = self._field_keys(doc, fields[0])
+        if keys is None:
+            return []
+        if len(fields) == 1:
+            return keys
+        rest = [self._field_keys(doc, field) for field in fields[1:]]
+        if None in rest:
+            if index in self.sparse_indexes:
+                return []
+            rest = [field_keys or [None] for field_keys in rest]
+        return list(itertools.product(keys, *rest))
+
+    def _check_coverable(self, index: str, doc: Dict):
+        """Mark ``index`` uncoverable once its keys stop giving back the stored
+        values in their order: a document holds an array (filed per element)
+        or an object (filed under None), or integral numbers of different
+        types (1, 1.0 and True are one key). Dotted fields are resolved like
+        the index resolves them; several values (from an array of
+        sub-documents on the path) count as an array."""
+        for field in self.index_fields[index]:
+            values = path_values(doc, field)
+            if len(values) > 1:
+                self._uncoverable.add(index)
+            for value in values:
+                if isinstance(value, (list, dict)):
+                    self._uncoverable.add(index)
+                elif isinstance(value, (int, float)) and (not isinstance(value, float) or value.is_integer()):
+                    if self._number_types.setdefault((index, field), type(value)) is not type(value):
+                        self._uncoverable.add(index)
+
+    def _coverable(self, index: str) -> bool:
+        """Whether the keys of ``index`` give the stored values back. An index
+        loaded from a snapshot is checked against the documents the first
+        time this is asked."""
+        if index in self._unchecked:
+            self._unchecked.discard(index)
+            for doc in self.documents:
+                if index in self._uncoverable:
+                    break
+                self._check_coverable(index, doc)
+        return index not in self._uncoverable
+
+    @staticmethod
+    def _field_keys(doc: Dict, field: str) -> Optional[List[Any]]:
+        """Index keys for one field of a document, or None if it lacks the field.
+
+        Arrays contribute their elements. Objects and nested arrays cannot be
+        hashed; a field holding only those (or an empty array) is indexed
+        under None, alongside real nulls, so the document stays in the index.
+        The None key therefore only narrows lookups of None down.
+        """
+        if field in doc and not isinstance(doc[field], (list, dict)):
+            return [doc[field]]
+        values = path_values(doc, field)
+        if not values:
+            return None
+        keys = [item for value in values for item in (value if isinstance(value, list) else (value,))
+                if not isinstance(item, (list, dict))]
+        return list(dict.fromkeys(keys)) or [None]
+
     def _build_indexes(self):
         """Build indexes for specified fields"""
-        self.indexes_dict = {index: {} for index in self.indexes}
+        self.indexes_dict = self._empty_indexes()
+        self._uncoverable = set()
+        self._unchecked = set()
+        self._number_types = {}
+        if not self.indexes:
+            return
         for doc in self.documents:
             for index in self.indexes:
-                if index in doc:
-                    value = doc[index]
-                    if value not in self.indexes_dict[index]:
-                        self.indexes_dict[index][value] = []
-                    self.indexes_dict[index][value].append(doc["_id"])
+                for key in self._index_keys(index, doc):
+                    self.indexes_dict[index].append(key, doc["_id"])
 
     def _update_indexes(self, document: Dict, is_delete=False):
-        """Update indexes, now works during transactions for rollback"""
+        """Update indexes, now works during transactions for rollback.
+
+        Indexes still being built get the change too; they go first so a
+        build switching on meanwhile is already in ``self.indexes`` below.
+        """
+        for build in list(self._index_builds.values()):
+            if build.state == "building":
+                build.apply(document, is_delete)
         for index in self.indexes:
-            if index in document:
-                value = document[index]
+            for key in self._index_keys(index, document):
                 if is_delete:
-                    if value in self.indexes_dict[index]:
-                        if document["_id"] in self.indexes_dict[index][value]:
-                            self.indexes_dict[index][value].remove(document["_id"])
-                            if not self.indexes_dict[index][value]:
-                                del self.indexes_dict[index][value]
+                    self.indexes_dict[index].remove(key, document["_id"])
                 else:
-                    if value not in self.indexes_dict[index]:
-                        self.indexes_dict[index][value] = []
-                    if document["_id"] not in self.indexes_dict[index][value]:
-                        self.indexes_dict[index][value].append(document["_id"])
+                    self.indexes_dict[index].add(key, document["_id"])
+
+    @_serialized
+    def create_index(self, field: Union[str, List[str]], index_type: str = "hash", unique: bool = False,
+                     stem: bool = False, sparse: bool = False, filter: Optional[Dict] = None,
+                     expire_after: Optional[float] = None, background: bool = False) -> IndexBuild:
+        """Create an index on the specified field, or a compound index on a list
+        of fields (also accepted as ``"a,b"``).
+
+        ``hash`` indexes answer equality and ``$in``; ``ordered`` indexes also
+        answer ``$gt``/``$gte``/``$lt``/``$lte`` ranges, and as compound
+        indexes serve leftmost-prefix equality followed by a range. A
+        ``unique`` index rejects inserts and updates that would repeat a key;
+        creating one fails if the stored documents already do. Fields may be
+        dotted paths into sub-documents; array values are indexed per element.
+        A ``text`` index (one per collection, over one or more string fields)
+        answers ``$text`` searches; ``stem`` makes it match word variants.
+        A ``sparse`` compound index skips documents lacking any of its
+        fields. A partial index (``filter``, a query) only holds the matching
+        documents, and is only used for queries that imply the filter. A TTL
+        index (``expire_after`` seconds, an ordered index on one timestamp
+        field) has documents deleted once their timestamp is that old; see
+        ``expire_documents``.
 
-    def create_index(self, field: str):
-        """Create an index on the specified field"""
+        Only the new index is built. With ``background`` the build runs on a
+        worker thread while reads and writes go on, and the index is switched
+        on when it has caught up; ``list_indexes`` reports its progress.
+        Unique indexes are always built in the foreground. Returns the build.
+        """
         try:
-            if field not in self.indexes:
-                self.indexes.append(field)
-                self._build_indexes()
-                self._save_data()
+            definition = index_definition({"fields": [field] if isinstance(field, str) else field,
+                                           "type": index_type, "unique": unique, "stem": stem,
+                                           "sparse": sparse, "filter": filter, "expire_after": expire_after})
+            field = definition["field"]
+            if field in self.indexes:
+                raise ValueError(f"Index already exists on field: {field}")
+            previous = self._index_builds.get(field)
+            if previous is not None and previous.state == "building":
+                raise ValueError(f"Index on field {field} is already being built")
+            if previous is not None:
+                self._forget_index(field)  # an earlier build failed or was cancelled
+            if definition["type"] == "text" and "text" in self.index_types.values():
+                raise ValueError(f"Collection {self.name} already has a text index")
+            if unique and background:
+                raise ValueError("Unique indexes are built in the foreground")
+            self.index_fields[field] = index_fields(field)
+            self.index_types[field] = definition["type"]
+            if sparse:
+                self.sparse_indexes.add(field)
+            if filter:
+                self.index_filters[field] = definition["filter"]
+            if definition.get("stem"):
+                self.stemmed_indexes.add(field)
+            if expire_after is not None:
+                self.ttl_indexes[field] = expire_after
+            if unique:
+                try:
+                    self._check_existing_unique(field)
+                except ValueError:
+                    self._forget_index(field)
+                    raise
+                self.unique_indexes.add(field)
+            postings = new_index(definition["type"], None, len(self.index_fields[field]),
+                                 self._doc_numbers, field in self.stemmed_indexes)
+            build = IndexBuild(field, postings, list(self.documents),
+                               lambda doc: self._index_keys(field, doc), self._activate_index)
+            self._index_builds[field] = build
+            if background:
+                build.start()
                 logger.log_operation(
                     "INDEX_CREATE",
                     f"collection:{self.name}",
-                    "SUCCESS",
-                    f"field:{field}"
+                    "STARTED",
+                    f"field:{field}, type:{definition['type']}, documents:{build.total}"
                 )
             else:
-                raise ValueError(f"Index already exists on field: {field}")
+                try:
+                    build.run()
+                except Exception:
+                    self._forget_index(field)
+                    raise
+                self._save_data([])
+            return build
         except Exception as e:
             logger.log_operation(
                 "INDEX_CREATE",
@@ -785,6 +1744,50 @@ class Collection:
             )
             raise
 
+    def _activate_index(self, build: IndexBuild):
+        """Switch a finished build on: from here on queries use it and writes
+        maintain it directly. Called with the build's lock held."""
+        field = build.name
+        self.indexes_dict[field] = build.postings
+        self.indexes.append(field)
+        self.modifications += 1
+        self.workload.index_added()
+        if field in self.ttl_indexes:
+            self._sweeper.start()
+        if self._catalog is not None:
+            self._catalog.set_indexes(self.name, self.index_definitions())
+        logger.log_operation(
+            "INDEX_CREATE",
+            f"collection:{self.name}",
+            "SUCCESS",
+            f"field:{field}, type:{self.index_types[field]}, unique:{field in self.unique_indexes}, "
+            f"stem:{field in self.stemmed_indexes}, sparse:{field in self.sparse_indexes}, "
+            f"filter:{self.index_filters.get(field)}, expire_after:{self.ttl_indexes.get(field)}, "
+            f"documents:{build.total}, build_ms:{build.duration_ms:.2f}"
+        )
+
+    def _forget_index(self, field: str):
+        """Drop the registration of an index that never switched on"""
+        for registry in (self.index_fields, self.index_types, self.index_filters, self._filter_matches,
+                         self.ttl_indexes, self._index_builds):
+            registry.pop(field, None)
+        self.sparse_indexes.discard(field)
+        self.stemmed_indexes.discard(field)
+        self.unique_indexes.discard(field)
+        self._uncoverable.discard(field)
+        self._unchecked.discard(field)
+        for key in [key for key in self._number_types if key[0] == field]:
+            del self._number_types[key]
+
+    def _check_existing_unique(self, index: str):
+        """Raise ValueError if stored documents already repeat a key of ``index``"""
+        seen = {}
+        for doc in self.documents:
+            for key in self._index_keys(index, doc):
+                if key in seen:
+                    raise ValueError(f"Cannot create unique index {index}: {key!r} is used by _id {seen[key]} and {doc['_id']}")
+                seen[key] = doc["_id"]
+
     def enable_indexing(self, enabled: bool):
         """Enable or disable using indexes for queries"""
         self.indexing_enabled = enabled
@@ -796,27 +1799,180 @@ class Collection:
         )
 
     def list_indexes(self) -> List[Dict]:
-        """Return information about all indexes"""
-        return [{"name": f"{field}_index", "key": field} for field in self.indexes]
+        """Return information about all indexes, including ones still being
+        built (``state`` ``building`` with a ``progress`` percentage) or whose
+        build failed. TTL indexes give their ``expire_after`` seconds and the
+        documents ``expired`` by sweeps so far."""
+        pending = [index for index, build in self._index_builds.items()
+                   if build.state in ("building", "failed")]
+        indexes = []
+        for index in self.indexes + pending:
+            build = self._index_builds.get(index)
+            info = {"name": f"{'_'.join(self.index_fields[index])}_index", "key": index,
+                    "fields": self.index_fields[index], "type": self.index_types[index],
+                    "unique": index in self.unique_indexes, "stem": index in self.stemmed_indexes,
+                    "sparse": index in self.sparse_indexes, "filter": self.index_filters.get(index),
+                    "expire_after": self.ttl_indexes.get(index),
+                    "expired": self._sweeper.expired.get(index, 0) if index in self.ttl_indexes else None,
+                    "state": "ready", "progress": 100.0}
+            if build is not None:
+                info.update(build.stats())
+            indexes.append(info)
+        return indexes
+
+    def recommend_indexes(self, min_scans: int = 1) -> List[Dict]:
+        """Indexes suggested by the queries seen so far, largest estimated
+        savings first.
+
+        Each suggestion covers the query shapes (fields and operators) that
+        had to scan the whole collection at least ``min_scans`` times:
+        ``index``/``fields``/``type`` to pass to ``create_index``, the
+        ``shapes``, their ``scans``, documents ``examined`` and ``scan_ms``,
+        and ``savings_ms``, the scan time not spent on matching documents.
+        """
+        existing = set(self.indexes) | {index for index, build in self._index_builds.items()
+                                         if build.state == "building"}
+        return self.workload.recommend(existing, self._distinct_values, min_scans)
+
+    def _distinct_values(self, field: str) -> int:
+        """Distinct values of ``field`` in a sample of the documents"""
+        values = set()
+        for doc in itertools.islice(self.documents, ADVISOR_SAMPLE):
+            for value in field_candidates(doc, field):
+                if not isinstance(value, (list, dict)):
+                    values.add(value)
+        return len(values)
+
+    def set_auto_index(self, threshold: Optional[int]):
+        """Build the top recommended index in the background whenever a query
+        shape has scanned the whole collection ``threshold`` times; None turns
+        it off"""
+        if threshold is not None and threshold < 1:
+            raise ValueError("Auto index threshold must be at least 1")
+        self.auto_index_threshold = threshold
+        logger.log_operation(
+            "INDEX_ADVISOR",
+            f"collection:{self.name}",
+            "SUCCESS",
+            f"auto_index_threshold:{threshold}"
+        )
+
+    def _auto_index(self):
+        """Start building the best recommendation past the auto threshold.
+
+        Nothing is built inside a transaction, with indexing disabled (every
+        query scans then), or while another build is running.
+        """
+        if self._transaction_id or not self.indexing_enabled:
+            return
+        if any(build.state == "building" for build in self._index_builds.values()):
+            return
+        for recommendation in self.recommend_indexes(self.auto_index_threshold):
+            previous = self._index_builds.get(recommendation["index"])
+            if previous is not None and previous.state == "failed":
+                continue
+            try:
+                self.create_index(recommendation["fields"], recommendation["type"], background=True)
+            except ValueError:
+                continue  # create_index has logged why
+            logger.log_operation(
+                "INDEX_ADVISOR",
+                f"collection:{self.name}",
+                "AUTO_INDEX",
+                f"index:{recommendation['index']}, type:{recommendation['type']}, "
+                f"scans:{recommendation['scans']}, savings_ms:{recommendation['savings_ms']:.2f}"
+            )
+            return
+
+    def expire_documents(self, now: Optional[float] = None) -> Dict[str, int]:
+        """Sweep the TTL indexes now instead of waiting for the background
+        sweeper; returns the documents expired per index.
+
+        A document expires once the value of a TTL index's field is more than
+        ``expire_after`` seconds before ``now`` (default: the current time).
+        Epoch seconds and ISO 8601 strings (local time unless they carry an
+        offset or ``Z``) count as timestamps; other values never expire, nor
+        do documents lacking the field.
+        """
+        return self._sweeper.run(now)
+
+    def ttl_stats(self) -> Dict:
+        """Counters of the expiry sweeps: passes, documents ``expired`` per
+        index, the latest sweep's count and duration"""
+        return self._sweeper.stats()
+
+    def _active_ttl_indexes(self) -> Dict[str, float]:
+        return {index: self.ttl_indexes[index] for index in self.indexes if index in self.ttl_indexes}
+
+    @_serialized
+    def _expire_batch(self, index: str, cutoff: float, limit: int) -> int:
+        """Delete up to ``limit`` documents whose timestamp in ``index`` is
+        before ``cutoff`` (epoch seconds); returns how many.
+
+        Numbers are read from the index span below the cutoff. ISO strings
+        sort by their text, not their instant, so the string keys up to
+        ``iso_bound`` are parsed and compared as epoch seconds. Each
+        document's own value is checked before it goes: True shares the
+        slot of 1, and an array expires by its earliest timestamp. Nothing
+        expires inside a transaction: its rollback could not bring the
+        documents back.
+        """
+        if self._transaction_id or index not in self.indexes:
+            return 0
+        postings = self.indexes_dict[index]
+        stamps = ((key, timestamp_seconds(key)) for key in postings.range_keys({"$lt": iso_bound(cutoff)}))
+        keys = itertools.chain(postings.range_keys({"$lt": cutoff}),
+                               (key for key, stamp in stamps if stamp is not None and stamp < cutoff))
+        expired = {}
+        for key in keys:
+            for doc_id in postings.get(key, ()):
+                doc = self.doc_id_map.get(doc_id)
+                if doc is None or doc_id in expired:
+                    continue
+                stamps = [stamp for stamp in map(timestamp_seconds, field_candidates(doc, index)) if stamp is not None]
+                if stamps and min(stamps) < cutoff:
+                    expired[doc_id] = doc
+            if len(expired) >= limit:
+                break
+        changes = []
+        for doc_id, doc in list(expired.items())[:limit]:
+            self._update_indexes(doc, is_delete=True)
+            self.documents.remove_id(doc_id)
+            changes.append({"op": "delete", "_id": doc_id})
+        if changes:
+            self._save_data(changes)
+        return len(changes)
+
+    def index_definitions(self) -> List[Dict]:
+        """Index definitions as recorded in the catalog"""
+        return [index_definition({"field": field, "type": self.index_types[field],
+                                  "unique": field in self.unique_indexes,
+                                  "stem": field in self.stemmed_indexes,
+                                  "sparse": field in self.sparse_indexes,
+                                  "filter": self.index_filters.get(field),
+                                  "expire_after": self.ttl_indexes.get(field)})
+                for field in self.indexes]
 
     def find_one(self, query: Dict) -> Optional[Dict]:
         """Find a single document matching the query using indexes if available"""
         try:
+            matches = compile_query(query)
             if query and self.indexing_enabled:
                 for field, value in query.items():
-                    if field in self.indexes:
-                        if not isinstance(value, dict):
+                    if (field in self.indexes and self.index_types[field] != "text"
+                            and self._usable(field, query)):
+                        if not isinstance(value, (dict, list)):
                             if value in self.indexes_dict[field]:
                                 doc_id = self.indexes_dict[field][value][0]
                                 doc = self.doc_id_map.get(doc_id)
-                                if doc and match_document(doc, query):
+                                if doc and matches(doc):
                                     return doc
                         elif "$eq" in value and value["$eq"] in self.indexes_dict[field]:
                             doc_id = self.indexes_dict[field][value["$eq"]][0]
                             doc = self.doc_id_map.get(doc_id)
-                            if doc and match_document(doc, query):
+                            if doc and matches(doc):
                                 return doc
-            return next((doc for doc in self.documents if match_document(doc, query)), None)
+            return next(filter(matches, self.documents), None)
         except Exception as e:
             logger.log_operation(
                 "FIND_ONE",
@@ -827,9 +1983,22 @@ class Collection:
             raise
 
     def count_documents(self, query: Optional[Dict] = None) -> int:
-        """Count documents matching the query"""
+        """Count documents matching the query.
+
+        A query the indexes answer exactly (see ``_covered_plan``) is counted
+        from the postings alone, without reading any document; ``last_plan``
+        is then ``COVERED``.
+        """
         try:
-            count = len(self.find(query)) if query else len(self.documents)
+            start_time = time.perf_counter()
+            self.last_plan = None
+            plan = self._covered_plan(query) if query and self.indexing_enabled else None
+            if plan is not None:
+                count = len(self._covered_ids(plan[0]))
+                self._log_query_performance("COVERED", start_time, count, field=", ".join(plan[1]),
+                                            reason="Counted from index postings", query=query, examined=0)
+            else:
+                count = len(self.find(query)) if query else len(self.documents)
             logger.log_operation(
                 "COUNT_DOCUMENTS",
                 f"collection:{self.name}",
@@ -846,6 +2015,89 @@ class Collection:
             )
             raise
 
+    def distinct(self, field: str, query: Optional[Dict] = None) -> List[Any]:
+        """Distinct values of ``field`` among the documents matching ``query``.
+
+        Array elements count as values of their own; sub-documents and
+        arrays themselves are left out. With an index on ``field`` whose keys
+        give the stored values back (see ``_check_coverable``) and no query
+        (or a covered one) the values are the index keys, read without
+        touching the documents, in index order.
+        """
+        start_time = time.perf_counter()
+        if (self.indexing_enabled and field in self.indexes and self.index_types[field] != "text"
+                and len(self.index_fields[field]) == 1 and self._usable(field, query or {})
+                and self._coverable(field)):
+            plan = self._covered_plan(query) if query else None
+            if not query or plan is not None:
+                values = self._index_values(field, self._covered_ids(plan[0]) if plan else None)
+                self._log_query_performance("COVERED", start_time, len(values), field=field,
+                                            reason="Distinct values read from the index", query=query, examined=0)
+                return values
+        documents = self.find(query) if query else self.documents
+        return list(dict.fromkeys(value for doc in documents for value in field_candidates(doc, field)
+                                  if not isinstance(value, (list, dict))))
+
+    def _index_values(self, index: str, ids: Optional[Union[List, Bitmap]] = None) -> List[Any]:
+        """Keys of a single-field index, limited to those holding one of ``ids``.
+
+        None also files values the index cannot hold, so it is only listed
+        if one of its documents really holds None.
+        """
+        postings = self.indexes_dict[index]
+        keys = postings.range_keys() if self.index_types[index] == "ordered" else list(postings.keys())
+        if ids is not None:
+            if self.index_types[index] == "bitmap":
+                lookup = self._doc_numbers.lookup
+                wanted = ids if isinstance(ids, Bitmap) else Bitmap(
+                    number for number in map(lookup, ids) if number is not None)
+                keys = [key for key in keys if postings.bitmap(key) & wanted]
+            else:
+                wanted = set(self._doc_numbers.ids(ids) if isinstance(ids, Bitmap) else ids)
+                keys = [key for key in keys if any(doc_id in wanted for doc_id in postings[key])]
+        values = []
+        for key in keys:
+            if key is None:
+                holders = postings[None]
+                if ids is not None:
+                    holders = (self._doc_numbers.ids(postings.bitmap(None) & wanted) if isinstance(wanted, Bitmap)
+                               else [doc_id for doc_id in holders if doc_id in wanted])
+                if not any(None in field_candidates(self.doc_id_map[doc_id], index) for doc_id in holders):
+                    continue
+            values.append(key)
+        return values
+
+    def explain(self, query: Optional[Dict] = None, projection: Optional[Dict] = None) -> Dict:
+        """How ``find(query, projection)`` and ``count_documents(query)`` would run.
+
+        ``plan`` is ``COVERED`` when the rows come from the index alone,
+        ``INDEX_USED`` when indexes narrow the documents to read, and
+        ``FULL_SCAN`` otherwise; ``count_covered`` tells whether the count
+        needs no document either. ``candidates`` is the number of documents
+        the plan reads (0 when covered).
+        """
+        explanation = {"query": query or {}, "projection": projection, "plan": "FULL_SCAN", "indexes": [],
+                       "covered": False, "count_covered": False, "candidates": len(self.documents),
+                       "documents": len(self.documents)}
+        if not query or not self.indexing_enabled:
+            return explanation
+        if "$text" in query:
+            index = next((index for index in self.indexes if self.index_types[index] == "text"), None)
+            explanation.update(plan="INDEX_USED" if index else "FULL_SCAN", indexes=[index] if index else [])
+            return explanation
+        covered = self._covered_plan(query)
+        if covered is not None:
+            explanation["count_covered"] = True
+        if projection and covered is not None:
+            rows = self._covered_rows(query, projection)
+            if rows is not None:
+                explanation.update(plan="COVERED", indexes=[rows[1]], covered=True, candidates=0)
+                return explanation
+        plan = self._plan_query(query)
+        if plan is not None:
+            explanation.update(plan="INDEX_USED", indexes=plan[1], candidates=len(plan[0]))
+        return explanation
+
     def _project_documents(self, docs: List[Dict], project: Dict) -> List[Dict]:
         """Handle $project stage in aggregation"""
         results = []
@@ -1,25 +1,60 @@
 # database.py
+import atexit
 import os
-import json
-from typing import Dict, List, Optional, Any
+import weakref
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Any
 from pathlib import Path
 from datetime import datetime
 import uuid
-from core.collection import Collection
+from core.cache import DatabaseCollections, collection_cache
+from core.catalog import IndexCatalog
+from core.collection import Collection, FLUSH_POLICIES, STORAGE_MODES
+from core.durability import DEFAULT_DURABILITY, append_file, at_least_atomic, check_durability, write_file
+from core.journal import CollectionJournal
+from core.partition import PARTITION_COUNT, PARTITION_SUFFIX, PartitionedStore
+from core.segment import SEGMENT_CODEC, SegmentStore
+from core.serializer import DEFAULT_CODEC, Serializer
 from utils.helpers import validate_db_name
 from utils.logger import logger
 
+_open_databases: "weakref.WeakSet[Database]" = weakref.WeakSet()
+
+def _flush_open_databases():
+    """Flush write-behind collections of every live database at interpreter exit"""
+    for database in list(_open_databases):
+        try:
+            database.flush()
+        except Exception:
+            pass  # already logged; keep flushing the others
+
+atexit.register(_flush_open_databases)
+
 class Database:
-    def __init__(self, name: str, db_path: str = "db"):
+    def __init__(self, name: str, db_path: str = "db", codec: str = DEFAULT_CODEC,
+                 flush_policy: str = "immediate", flush_every: Optional[int] = None,
+                 durability: str = DEFAULT_DURABILITY):
         validate_db_name(name)
+        check_durability(durability)
+        Serializer.get(codec)
+        if flush_policy not in FLUSH_POLICIES:
+            raise ValueError(f"Unsupported flush policy: {flush_policy}")
         self.name = name
+        self.codec = codec
+        self.flush_policy = flush_policy
+        self.flush_every = flush_every
+        self.durability = durability
         self.db_path = Path(db_path) / name
-        self.collections: Dict[str, Collection] = {}
+        # open collections live in the process-wide LRU cache, shared by every
+        # Database object for this directory
+        self.collections = DatabaseCollections(collection_cache, self.db_path)
         self._transaction_log_path = self.db_path / ".transactions"
         self._active_transaction: Optional[str] = None
         self._transaction_operations: List[Dict] = []
         self._ensure_db_directory()
         self._ensure_transaction_log()
+        self.catalog = IndexCatalog(self.db_path, codec, durability)
+        _open_databases.add(self)
 
     def _ensure_db_directory(self):
         """Create database directory if it doesn't exist"""
@@ -49,7 +84,7 @@ class Database:
         # Create transaction log file
         try:
             log_file = self._transaction_log_path / f"{transaction_id}.log"
-            log_file.touch()
+            write_file(log_file, Serializer.header(self.codec), self.durability)
         except OSError as e:
             logger.log_operation("ERROR", "TX_LOG_CREATION", self.name, f"Failed to create transaction log: {e}")
             raise
@@ -62,8 +97,12 @@ class Database:
         if not self._active_transaction:
             raise RuntimeError("No active transaction to commit")
         
+        transaction_id = self._active_transaction
         try:
-            # Apply all operations permanently
+            self._release_transaction_context()
+            # Apply all operations permanently; with the transaction detached
+            # the collections save each change as it is applied
+            self._active_transaction = None
             for op in self._transaction_operations:
                 collection = self.get_collection(op['collection'])
                 if collection:
@@ -72,7 +111,7 @@ class Database:
                     raise ValueError(f"Collection {op['collection']} not found during commit")
             
             # Clean up transaction log
-            log_file = self._transaction_log_path / f"{self._active_transaction}.log"
+            log_file = self._transaction_log_path / f"{transaction_id}.log"
             if log_file.exists():
                 try:
                     log_file.unlink()
@@ -81,7 +120,7 @@ class Database:
                     raise
             
             logger.log_operation("TRANSACTION", "COMMIT", self.name, 
-                               f"Transaction {self._active_transaction} committed")
+                               f"Transaction {transaction_id} committed")
             return True
         except Exception as e:
             logger.log_operation("TRANSACTION", "COMMIT_FAILED", self.name, str(e))
@@ -95,7 +134,10 @@ class Database:
         if not self._active_transaction:
             raise RuntimeError("No active transaction to rollback")
         
+        transaction_id = self._active_transaction
         try:
+            self._release_transaction_context()
+            self._active_transaction = None
             # Undo all operations in reverse order
             for op in reversed(self._transaction_operations):
                 collection = self.get_collection(op['collection'])
@@ -106,7 +148,7 @@ class Database:
                                        f"Collection {op['collection']} not found during rollback")
             
             # Clean up transaction log
-            log_file = self._transaction_log_path / f"{self._active_transaction}.log"
+            log_file = self._transaction_log_path / f"{transaction_id}.log"
             if log_file.exists():
                 try:
                     log_file.unlink()
@@ -115,7 +157,7 @@ class Database:
                     raise
             
             logger.log_operation("TRANSACTION", "ROLLBACK", self.name, 
-                               f"Transaction {self._active_transaction} rolled back")
+                               f"Transaction {transaction_id} rolled back")
             return True
         except Exception as e:
             logger.log_operation("TRANSACTION", "ROLLBACK_FAILED", self.name, str(e))
@@ -124,6 +166,13 @@ class Database:
             self._active_transaction = None
             self._transaction_operations = []
 
+    def _release_transaction_context(self):
+        """Detach open collections from the transaction so their saves reach disk
+        again (and the cache may evict them)"""
+        for collection in self.collections.values():
+            if collection._transaction_id == self._active_transaction:
+                collection.clear_transaction_context()
+
     def _log_operation(self, operation: Dict):
         """Record an operation in the transaction log"""
         if not self._active_transaction:
@@ -142,19 +191,31 @@ class Database:
         # Append to physical log file
         log_file = self._transaction_log_path / f"{self._active_transaction}.log"
         try:
-            with open(log_file, 'a') as f:
-                f.write(json.dumps(operation) + '\n')
+            append_file(log_file, Serializer.frame(operation, self.codec), self.durability)
         except OSError as e:
             logger.log_operation("ERROR", "TX_LOG_WRITE", self.name, f"Failed to write to transaction log: {e}")
             raise
 
-    def create_collection(self, name: str, indexes: Optional[List[str]] = None) -> Collection:
-        """Create a new collection in the database with optional indexes"""
+    def create_collection(self, name: str, indexes: Optional[List[Any]] = None,
+                          storage_mode: str = "json", codec: Optional[str] = None,
+                          partitions: int = PARTITION_COUNT) -> Collection:
+        """Create a new collection in the database with optional indexes, storage mode and codec.
+
+        Indexes are field names (hash indexes) or ``{"field": ..., "type": "hash"|"ordered"}``.
+
+        ``partitions`` is the number of partition files of a ``partitioned`` collection.
+        """
+        if storage_mode not in STORAGE_MODES:
+            raise ValueError(f"Unsupported storage mode: {storage_mode}")
+        if codec is None:
+            codec = SEGMENT_CODEC if storage_mode == "segment" else self.codec
+        Serializer.get(codec)
         if self._active_transaction:
             operation = {
                 'type': 'create_collection',
                 'collection': name,
                 'indexes': indexes,
+                'storage_mode': storage_mode,
                 'timestamp': datetime.now().isoformat()
             }
             self._log_operation(operation)
@@ -162,19 +223,30 @@ class Database:
         if name in self.collections:
             raise ValueError(f"Collection '{name}' already exists")
         
-        collection_path = self.db_path / f"{name}.json"
+        collection_path = self._collection_path(name)
         if collection_path.exists():
-            raise FileExistsError(f"Collection file '{name}.json' already exists")
+            raise FileExistsError(f"Collection file '{collection_path.name}' already exists")
         
         # Create empty collection file
         try:
-            with open(collection_path, 'w') as f:
-                json.dump([], f)
+            if storage_mode == "segment":
+                collection_path = collection_path.with_suffix(".seg")
+                SegmentStore(collection_path, codec, self.durability).write([])
+            elif storage_mode == "partitioned":
+                collection_path = collection_path.with_suffix(PARTITION_SUFFIX)
+                PartitionedStore(collection_path, partitions, codec, self.durability).write([])
+            else:
+                Serializer.dump_file(collection_path, [], codec, self.durability)
+            if storage_mode == "journal":
+                CollectionJournal(collection_path, codec, self.durability).create()
         except OSError as e:
             logger.log_operation("ERROR", "COLLECTION_CREATION", self.name, f"Failed to create collection file: {e}")
             raise
         
-        collection = Collection(name, collection_path, indexes)
+        collection = Collection(name, collection_path, indexes, storage_mode, codec,
+                                flush_policy=self.flush_policy, flush_every=self.flush_every,
+                                durability=self.durability, partitions=partitions,
+                                catalog=self.catalog)
         self.collections[name] = collection
         return collection
 
@@ -193,16 +265,14 @@ class Database:
                 }
                 self._log_operation(operation)
         
-        if name not in self.collections:
-            collection_path = self.db_path / f"{name}.json"
-            if not collection_path.exists():
-                return False
-        
-        collection_path = self.db_path / f"{name}.json"
+        collection_path = self._collection_path(name)
         if collection_path.exists():
             try:
-                collection_path.unlink()
-                self.collections.pop(name, None)
+                collection = self.collections.pop(name, None)
+                if collection:
+                    collection.close()
+                self._remove_collection_files(name)
+                self.catalog.drop(name)
                 return True
             except OSError as e:
                 logger.log_operation("ERROR", "COLLECTION_DROP", self.name, f"Failed to delete collection file: {e}")
@@ -210,17 +280,24 @@ class Database:
         return False
 
         # database.py (partial update)
-    def get_collection(self, name: str) -> Optional[Collection]:
-        """Get a collection by name with transaction awareness"""
-        if name in self.collections:
-            collection = self.collections[name]
+    def get_collection(self, name: str,
+                       progress: Optional[Callable[[int, int], None]] = None) -> Optional[Collection]:
+        """Get a collection by name with transaction awareness.
+
+        ``progress(bytes_read, total_bytes)`` is reported while a collection
+        that is not open yet streams in from disk.
+        """
+        collection = collection_cache.lookup(self.collections.key(name))
+        if collection is not None:
             if self._active_transaction:
                 collection.set_transaction_context(self._active_transaction, self._log_operation)
             return collection
         
-        collection_path = self.db_path / f"{name}.json"
+        collection_path = self._collection_path(name)
         if collection_path.exists():
-            collection = Collection(name, collection_path)
+            collection = Collection(name, collection_path, progress=progress,
+                                    flush_policy=self.flush_policy, flush_every=self.flush_every,
+                                    durability=self.durability, catalog=self.catalog)
             if self._active_transaction:
                 collection.set_transaction_context(self._active_transaction, self._log_operation)
             self.collections[name] = collection
@@ -228,10 +305,139 @@ class Database:
         
         return None
 
+    def pin_collection(self, name: str):
+        """Keep a collection open in the shared cache (it is not evicted and
+        closed under a caller still holding it) until ``unpin_collection``"""
+        collection_cache.pin(self.collections.key(name))
+
+    def unpin_collection(self, name: str):
+        collection_cache.unpin(self.collections.key(name))
+
+    @contextmanager
+    def using_collection(self, name: str) -> Iterator[Optional[Collection]]:
+        """``get_collection`` pinned for the duration of a ``with`` block"""
+        self.pin_collection(name)
+        try:
+            yield self.get_collection(name)
+        finally:
+            self.unpin_collection(name)
+
+    def _collection_path(self, name: str) -> Path:
+        """Path of the collection's primary file (``.seg`` for segment collections,
+        the ``.parts`` directory for partitioned ones)"""
+        for suffix in (".seg", PARTITION_SUFFIX):
+            path = self.db_path / f"{name}{suffix}"
+            if path.exists():
+                return path
+        return self.db_path / f"{name}.json"
+
+    def _remove_collection_files(self, name: str, keep: tuple = ()):
+        """Delete every on-disk artifact of a collection except the ``keep`` suffixes"""
+        for suffix in (".json", ".journal", ".seg", ".idx"):
+            path = self.db_path / f"{name}{suffix}"
+            if suffix not in keep and path.exists():
+                path.unlink()
+        if PARTITION_SUFFIX not in keep:
+            PartitionedStore(self.db_path / name).remove()
+
+    def convert_collection(self, name: str, storage_mode: str, codec: Optional[str] = None,
+                           partitions: Optional[int] = None) -> Collection:
+        """Rewrite a collection in another storage mode (json, journal, segment or
+        partitioned) and/or codec"""
+        if storage_mode not in STORAGE_MODES:
+            raise ValueError(f"Unsupported storage mode: {storage_mode}")
+        if self._active_transaction:
+            raise RuntimeError("Cannot convert a collection during an active transaction")
+        collection = self.get_collection(name)
+        if not collection:
+            raise ValueError(f"Collection '{name}' not found")
+        if codec is None:
+            codec = collection.codec if collection.storage_mode == storage_mode else (
+                SEGMENT_CODEC if storage_mode == "segment" else self.codec)
+        Serializer.get(codec)
+        current_partitions = collection.partition_stats().get("partitions")
+        if partitions is None:
+            partitions = current_partitions or PARTITION_COUNT
+        if (collection.storage_mode == storage_mode and collection.codec == codec
+                and (storage_mode != "partitioned" or partitions == current_partitions)):
+            return collection
+        
+        documents = collection.find({})
+        indexes = collection.index_definitions()
+        collection.close()
+        self.collections.pop(name, None)
+        json_path = self.db_path / f"{name}.json"
+        try:
+            if storage_mode == "segment":
+                SegmentStore(json_path, codec, self.durability).write(documents)
+                keep = (".seg", ".idx")
+            elif storage_mode == "partitioned":
+                PartitionedStore(json_path, partitions, codec, self.durability).write(documents)
+                keep = (PARTITION_SUFFIX,)
+            else:
+                Serializer.dump_file(json_path, documents, codec, at_least_atomic(self.durability))
+                keep = (".json",)
+                if storage_mode == "journal":
+                    CollectionJournal(json_path, codec, self.durability).create()
+                    keep = (".json", ".journal")
+            self._remove_collection_files(name, keep)
+        except OSError as e:
+            logger.log_operation("ERROR", "COLLECTION_CONVERT", self.name, f"Failed to convert collection {name}: {e}")
+            raise
+        
+        collection = Collection(name, self._collection_path(name), indexes,
+                                flush_policy=self.flush_policy, flush_every=self.flush_every,
+                                durability=self.durability, partitions=partitions,
+                                catalog=self.catalog)
+        self.collections[name] = collection
+        logger.log_operation("COLLECTION_CONVERT", f"collection:{name}", "SUCCESS",
+                             f"storage:{storage_mode}, codec:{codec}")
+        return collection
+
+    def set_flush_policy(self, policy: str = "immediate", every: Optional[int] = None):
+        """Apply a flush policy to open collections and ones opened later"""
+        if policy not in FLUSH_POLICIES:
+            raise ValueError(f"Unsupported flush policy: {policy}")
+        for collection in self.collections.values():
+            collection.set_flush_policy(policy, every)
+        self.flush_policy = policy
+        self.flush_every = every
+
+    def flush(self) -> int:
+        """Write pending saves and index snapshots of all open collections;
+        returns how many collections were dirty"""
+        flushed = 0
+        for name, collection in list(self.collections.items()):
+            try:
+                if collection.flush():
+                    flushed += 1
+                collection.save_index_snapshot()
+            except Exception as e:
+                logger.log_operation("ERROR", "DB_FLUSH", self.name, f"Failed to flush collection {name}: {e}")
+                raise
+        return flushed
+
+    def flush_stats(self) -> Dict[str, Dict]:
+        """Per-collection flush policy and coalesced save counters"""
+        return {name: collection.flush_stats() for name, collection in self.collections.items()}
+
+    def set_cache_budget(self, budget_bytes: int):
+        """Set the memory budget of the process-wide collection cache"""
+        collection_cache.set_budget(budget_bytes)
+
+    def cache_stats(self) -> Dict:
+        """Hit/miss/eviction counters of the collection cache, plus this database's share"""
+        stats = collection_cache.stats()
+        stats["database_collections"] = len(self.collections)
+        return stats
+
     def list_collections(self) -> List[str]:
         """List all collections in the database"""
         try:
             collections = [file.stem for file in self.db_path.glob("*.json")]
+            collections += [file.stem for file in self.db_path.glob("*.seg") if file.stem not in collections]
+            collections += [folder.stem for folder in self.db_path.glob(f"*{PARTITION_SUFFIX}")
+                            if folder.is_dir() and folder.stem not in collections]
             return collections
         except OSError as e:
             logger.log_operation("ERROR", "LIST_COLLECTIONS", self.name, f"Failed to list collections: {e}")
@@ -244,8 +450,9 @@ class Database:
         
         import shutil
         try:
+            for name in list(self.collections):
+                self.collections.pop(name).close()
             shutil.rmtree(self.db_path)
-            self.collections.clear()
         except OSError as e:
             logger.log_operation("ERROR", "DROP_DATABASE", self.name, f"Failed to drop database: {e}")
             raise
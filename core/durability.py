@@ -0,0 +1,65 @@
+# core/durability.py
+import os
+from pathlib import Path
+from typing import BinaryIO
+
+# none   - write the file in place; a crash mid-write can truncate it
+# atomic - write a temp file and os.replace() it over the old one
+# fsync  - atomic, plus fsync of the file and its directory before returning
+DURABILITY_LEVELS = ("none", "atomic", "fsync")
+DEFAULT_DURABILITY = "atomic"
+
+def check_durability(level: str) -> str:
+    """Validate a durability level name"""
+    if level not in DURABILITY_LEVELS:
+        raise ValueError(f"Unsupported durability level: {level}")
+    return level
+
+def at_least_atomic(level: str) -> str:
+    """Level to use for rewrites that must never leave a half-written file"""
+    return "atomic" if level == "none" else level
+
+def fsync_dir(path: Path):
+    """Flush a directory entry so a rename or new file survives a crash"""
+    if not hasattr(os, "O_DIRECTORY"):
+        return  # directories cannot be opened for fsync on this platform
+    fd = os.open(path, os.O_RDONLY | os.O_DIRECTORY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+def sync_file(f: BinaryIO, durability: str):
+    """fsync an open file when the level asks for it"""
+    if durability == "fsync":
+        f.flush()
+        os.fsync(f.fileno())
+
+def replace_file(tmp_path: Path, path: Path, durability: str):
+    """Move a fully written temp file over ``path``"""
+    os.replace(tmp_path, path)
+    if durability == "fsync":
+        fsync_dir(Path(path).parent)
+
+def write_file(path: Path, data: bytes, durability: str = DEFAULT_DURABILITY):
+    """Replace the contents of ``path`` honouring the durability level"""
+    path = Path(path)
+    if durability == "none":
+        with open(path, 'wb') as f:
+            f.write(data)
+        return
+    tmp_path = path.with_name(path.name + ".tmp")
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+        sync_file(f, durability)
+    replace_file(tmp_path, path, durability)
+
+def append_file(path: Path, data: bytes, durability: str = DEFAULT_DURABILITY):
+    """Append to ``path``; with ``fsync`` the bytes are on disk when this returns"""
+    path = Path(path)
+    created = durability == "fsync" and not path.exists()
+    with open(path, 'ab') as f:
+        f.write(data)
+        sync_file(f, durability)
+    if created:
+        fsync_dir(path.parent)
@@ -0,0 +1,124 @@
+# core/index_build.py
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+from utils.logger import logger
+
+BUILD_CHUNK = 1000  # documents indexed per hold of the build lock
+
+class IndexBuild:
+    """Builds the postings of one new index, on a background thread if started.
+
+    The worker indexes a snapshot of the documents in chunks. Writes that
+    land meanwhile are applied to the new postings as well (``apply``) and
+    mark their document as touched; the worker skips touched documents, so
+    it never indexes a version a write is about to replace. Both sides hold
+    ``lock`` while they change the postings, so a write waits for at most
+    one chunk. Once every chunk is done ``on_ready`` is called, still under
+    the lock, to switch the index on.
+    """
+
+    def __init__(self, name: str, postings: Dict, documents: List[Dict],
+                 index_keys: Callable[[Dict], List[Any]], on_ready: Callable[["IndexBuild"], None],
+                 chunk_size: int = BUILD_CHUNK):
+        self.name = name
+        self.postings = postings
+        self.state = "building"
+        self.total = len(documents)
+        self.done = 0
+        self.error: Optional[str] = None
+        self.duration_ms: Optional[float] = None
+        self.lock = threading.Lock()
+        self._documents = documents
+        self._index_keys = index_keys
+        self._on_ready = on_ready
+        self._chunk_size = chunk_size
+        self._touched = set()
+        self._cancelled = False
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def progress(self) -> float:
+        """Percentage of the snapshot indexed so far"""
+        if self.state == "ready" or not self.total:
+            return 100.0
+        return self.done * 100.0 / self.total
+
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        """Run the build on a background thread"""
+        self._thread = threading.Thread(target=self._run_background, name=f"index-build-{self.name}", daemon=True)
+        self._thread.start()
+
+    def wait(self, timeout: Optional[float] = None):
+        """Block until a background build finishes"""
+        thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+
+    def cancel(self):
+        """Stop a running build after its current chunk"""
+        self._cancelled = True
+
+    def apply(self, document: Dict, is_delete: bool = False):
+        """Mirror a write into the postings under construction"""
+        with self.lock:
+            if self.state != "building":
+                return
+            doc_id = document["_id"]
+            self._touched.add(doc_id)
+            for key in self._index_keys(document):
+                if is_delete:
+                    self.postings.remove(key, doc_id)
+                else:
+                    self.postings.add(key, doc_id)
+
+    def _run_background(self):
+        try:
+            self.run()
+        except Exception:
+            pass  # already logged; the build is marked failed
+
+    def run(self):
+        """Index the snapshot chunk by chunk, then switch the index on"""
+        start = time.perf_counter()
+        try:
+            for offset in range(0, self.total, self._chunk_size):
+                if self._cancelled:
+                    self.state = "cancelled"
+                    self._documents = []
+                    return
+                with self.lock:
+                    for doc in self._documents[offset:offset + self._chunk_size]:
+                        doc_id = doc["_id"]
+                        if doc_id in self._touched:
+                            continue
+                        for key in self._index_keys(doc):
+                            self.postings.append(key, doc_id)
+                    self.done = min(self.total, offset + self._chunk_size)
+                time.sleep(0)  # let a waiting write take the lock before the next chunk
+            with self.lock:
+                self.duration_ms = (time.perf_counter() - start) * 1000
+                self._on_ready(self)
+                self.state = "ready"
+                self._documents = []
+                self._touched = set()
+        except Exception as e:
+            self.state = "failed"
+            self.error = str(e)
+            self._documents = []
+            logger.log_operation("INDEX_BUILD", f"index:{self.name}", "FAILED", str(e))
+            raise
+
+    def stats(self) -> Dict:
+        """Build state and progress, for index listings"""
+        return {
+            "state": self.state,
+            "progress": round(self.progress, 1),
+            "indexed": self.done,
+            "total": self.total,
+            "duration_ms": self.duration_ms,
+            "error": self.error,
+        }
@@ -0,0 +1,502 @@
+# core/indexes.py
+import heapq
+import itertools
+import threading
+from bisect import bisect_left, insort
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+from core.bitmap import Bitmap
+from core.text import TextIndex
+
+INDEX_TYPES = ("hash", "ordered", "bitmap", "text")
+RANGE_OPERATORS = ("$gt", "$gte", "$lt", "$lte")
+FIELD_SEPARATOR = ","
+_AFTER = (9,)  # sorts after every order key, closing a prefix span
+_TWIN_TYPES = frozenset((bool, int, float))  # True == 1 == 1.0 and False == 0 == 0.0 share a dict key
+
+def order_key(value: Any) -> Optional[Tuple]:
+    """Sort key that keeps values of different types apart (None < numbers < strings < booleans).
+
+    Range predicates only match values of the bound's own type, so keys of
+    other types never have to be compared with each other. Returns None for
+    values an ordered index cannot place.
+    """
+    if value is None:
+        return (0, 0)
+    if isinstance(value, bool):
+        return (3, value)
+    if isinstance(value, (int, float)):
+        return (1, value)
+    if isinstance(value, str):
+        return (2, value)
+    return None
+
+def _equal_keys(value: Any) -> Tuple:
+    """Sort keys of the values equal to ``value``: a boolean and the number
+    it equals (``True``, ``1``, ``1.0``) sort apart but compare equal"""
+    if type(value) in _TWIN_TYPES and value in (0, 1):
+        return ((1, int(value)), (3, bool(value)))
+    return (order_key(value),)
+
+def index_fields(name: str) -> List[str]:
+    """Fields of an index, in key order; compound index names join them with commas"""
+    return name.split(FIELD_SEPARATOR)
+
+def index_definition(index: Union[str, Sequence[str], Dict]) -> Dict:
+    """Normalize an index given as a field name, a list of fields or a definition dict.
+
+    A compound index over several fields is named by the fields joined with
+    commas, e.g. ``"course_id,status"``. ``"unique": True`` is only kept
+    when set, as are ``"sparse": True`` (skip documents lacking any of the
+    fields), ``"stem": True`` (stemming, for text indexes), a partial
+    index's ``"filter"`` query and a TTL index's ``"expire_after"`` seconds.
+    """
+    if isinstance(index, str):
+        definition = {"field": index, "type": "hash"}
+    elif isinstance(index, (list, tuple)):
+        definition = {"field": FIELD_SEPARATOR.join(index), "type": "hash"}
+    else:
+        definition = dict(index)
+        if "fields" in definition:
+            definition["field"] = FIELD_SEPARATOR.join(definition.pop("fields"))
+        definition.setdefault("type", "hash")
+    if definition.get("unique"):
+        definition["unique"] = True
+    else:
+        definition.pop("unique", None)
+    if definition.get("sparse"):
+        definition["sparse"] = True
+    else:
+        definition.pop("sparse", None)
+    if definition.get("stem") and definition.get("type") == "text":
+        definition["stem"] = True
+    else:
+        definition.pop("stem", None)
+    if not definition.get("filter"):
+        definition.pop("filter", None)
+    elif not isinstance(definition["filter"], dict):
+        raise ValueError(f"Index filter must be a query object: {definition['filter']!r}")
+    if definition.get("expire_after") is None:
+        definition.pop("expire_after", None)
+    elif (isinstance(definition["expire_after"], bool) or not isinstance(definition["expire_after"], (int, float))
+          or not definition["expire_after"] > 0):
+        raise ValueError(f"TTL must be a positive number of seconds: {definition['expire_after']!r}")
+    if definition["type"] not in INDEX_TYPES:
+        raise ValueError(f"Unsupported index type: {definition['type']}")
+    if "expire_after" in definition and (definition["type"] != "ordered"
+                                         or len(index_fields(definition["field"])) > 1):
+        raise ValueError("TTL indexes must be ordered indexes on a single field")
+    if definition["type"] == "text" and definition.get("unique"):
+        raise ValueError("Text indexes cannot be unique")
+    if not all(index_fields(definition["field"])):
+        raise ValueError(f"Invalid index fields: {definition['field']!r}")
+    return definition
+
+def query_implies(query: Dict, condition: Dict) -> bool:
+    """Whether every document matching ``query`` also matches ``condition``
+    (a partial index filter), judged field by field.
+
+    Conservative: False unless the query pins each filtered field to values
+    that satisfy the filter, or bounds it within the filter's range.
+    """
+    for field, wanted in condition.items():
+        if field == "$or":
+            if not any(query_implies(query, branch) for branch in wanted):
+                return False
+        elif field not in query or not _condition_implies(query[field], wanted):
+            return False
+    return True
+
+def _condition_implies(given: Any, wanted: Any) -> bool:
+    wanted = wanted if isinstance(wanted, dict) else {"$eq": wanted}
+    if not isinstance(given, dict):
+        values = [given]
+    elif "$eq" in given:
+        values = [given["$eq"]]
+    elif "$in" in given and given["$in"]:
+        values = list(given["$in"])
+    else:
+        values = None
+    for op, operand in wanted.items():
+        if op == "$ne":
+            # an array can hold other values too; only the same $ne is proof
+            if not (isinstance(given, dict) and given.get("$ne") == operand):
+                return False
+        elif values is not None:
+            if not all(_satisfies(value, op, operand) for value in values):
+                return False
+        elif op not in RANGE_OPERATORS or not _within(given, op, operand):
+            return False
+    return True
+
+def _satisfies(value: Any, op: str, operand: Any) -> bool:
+    try:
+        if op == "$eq":
+            return value == operand
+        if op == "$in":
+            return value in operand
+        if op == "$gt":
+            return value > operand
+        if op == "$gte":
+            return value >= operand
+        if op == "$lt":
+            return value < operand
+        if op == "$lte":
+            return value <= operand
+    except TypeError:
+        pass
+    return False
+
+def _within(given: Dict, op: str, operand: Any) -> bool:
+    """Whether the range ``given`` lies inside the bound ``{op: operand}``"""
+    try:
+        if op in ("$gt", "$gte"):
+            if "$gt" in given and given["$gt"] >= operand:
+                return True
+            return "$gte" in given and (given["$gte"] > operand or (op == "$gte" and given["$gte"] == operand))
+        if "$lt" in given and given["$lt"] <= operand:
+            return True
+        return "$lte" in given and (given["$lte"] < operand or (op == "$lte" and given["$lte"] == operand))
+    except TypeError:
+        return False
+
+def new_index(index_type: str, postings: Optional[Dict[Any, List]] = None,
+              width: int = 1, numbers: Optional["DocumentNumbers"] = None,
+              stemming: bool = False) -> Dict[Any, List]:
+    """Empty (or pre-filled) ``value -> [ids]`` postings for an index type.
+
+    ``width`` is the number of fields; compound indexes key their postings
+    by tuples of the field values. Bitmap indexes of one collection share
+    its ``numbers`` so their postings can be combined. Text indexes hold
+    term postings instead (see ``TextIndex``).
+    """
+    if index_type == "text":
+        return TextIndex(postings or {}, stemming)
+    if index_type == "ordered":
+        return OrderedIndex(postings or {}, width)
+    if index_type == "bitmap":
+        return BitmapIndex(postings or {}, numbers)
+    return HashIndex(postings or {})
+
+
+class HashIndex(dict):
+    """``value -> [ids]`` postings answering equality and ``$in`` lookups"""
+
+    def append(self, value: Any, doc_id: Any):
+        """Add a posting known not to be there yet (bulk builds)"""
+        ids = self.get(value)
+        if ids is None:
+            self[value] = [doc_id]
+        else:
+            ids.append(doc_id)
+
+    def add(self, value: Any, doc_id: Any):
+        ids = self.get(value)
+        if ids is None:
+            self[value] = [doc_id]
+        elif doc_id not in ids:
+            ids.append(doc_id)
+
+    def remove(self, value: Any, doc_id: Any):
+        ids = self.get(value)
+        if ids is not None and doc_id in ids:
+            ids.remove(doc_id)
+            if not ids:
+                del self[value]
+
+
+class OrderedIndex(HashIndex):
+    """``value -> [ids]`` postings plus a sorted array of keys for range scans.
+
+    Equality lookups use the dict as a hash index does; ``$gt``/``$gte``/
+    ``$lt``/``$lte`` bisect the sorted key array and walk only the span
+    between the bounds. New keys are placed with ``insort``.
+
+    Compound indexes (``width`` > 1) are keyed by tuples and sorted field by
+    field, so equality on a leftmost prefix of the fields, optionally followed
+    by a range on the next field, is also a single contiguous span.
+
+    Booleans sort apart from numbers, but ``True``, ``1`` and ``1.0`` are one
+    dict key. A slot holding both kinds is filed under each one's sort key
+    (``aliased``), so ranges over either type find it; callers check the
+    candidates against the query anyway.
+    """
+
+    def __init__(self, postings: Optional[Dict[Any, List]] = None, width: int = 1):
+        super().__init__()
+        self.width = width
+        self.aliased = False  # some slot is filed under a boolean and a number sort key
+        self._keys: List[Tuple] = []
+        if postings:
+            for value, ids in postings.items():
+                dict.__setitem__(self, value, ids)
+            self._keys = sorted(key for key in map(self._sort_key, self) if key is not None)
+
+    def _sort_key(self, value: Any) -> Optional[Tuple]:
+        parts = value if self.width > 1 else (value,)
+        key = tuple(order_key(part) for part in parts)
+        return None if None in key else key
+
+    def _value(self, key: Tuple) -> Any:
+        """The index value a sort key stands for (None sorts as ``(0, 0)``)"""
+        if self.width > 1:
+            return tuple(part[1] if part[0] else None for part in key)
+        return key[0][1] if key[0][0] else None
+
+    def _may_alias(self, value: Any) -> bool:
+        """Whether ``value`` equals values of another sort type (booleans, 0 and 1)"""
+        parts = value if self.width > 1 else (value,)
+        return any(len(_equal_keys(part)) > 1 for part in parts)
+
+    def _slot_keys(self, value: Any) -> List[Tuple]:
+        """Every sort key the slot of ``value`` may be filed under"""
+        if not self._may_alias(value):
+            key = self._sort_key(value)
+            return [] if key is None else [key]
+        parts = value if self.width > 1 else (value,)
+        return [key for key in itertools.product(*map(_equal_keys, parts)) if None not in key]
+
+    def _file_alias(self, value: Any):
+        """File an existing slot under ``value``'s sort key too, if it is not yet"""
+        key = self._sort_key(value)
+        if key is None:
+            return
+        position = bisect_left(self._keys, key)
+        if position == len(self._keys) or self._keys[position] != key:
+            self._keys.insert(position, key)
+            self.aliased = True
+
+    def append(self, value: Any, doc_id: Any):
+        ids = dict.get(self, value)
+        if ids is None:
+            self[value] = [doc_id]
+            return
+        ids.append(doc_id)
+        if self._may_alias(value):
+            self._file_alias(value)
+
+    def add(self, value: Any, doc_id: Any):
+        ids = dict.get(self, value)
+        if ids is None:
+            self[value] = [doc_id]
+            return
+        if doc_id not in ids:
+            ids.append(doc_id)
+        if self._may_alias(value):
+            self._file_alias(value)
+
+    def __setitem__(self, value, ids: List):
+        if not dict.__contains__(self, value):
+            key = self._sort_key(value)
+            if key is not None:
+                insort(self._keys, key)
+        dict.__setitem__(self, value, ids)
+
+    def __delitem__(self, value):
+        dict.__delitem__(self, value)
+        for key in self._slot_keys(value):
+            position = bisect_left(self._keys, key)
+            if position < len(self._keys) and self._keys[position] == key:
+                del self._keys[position]
+
+    def setdefault(self, value, default=None):
+        if not dict.__contains__(self, value):
+            self[value] = default
+        return dict.__getitem__(self, value)
+
+    def pop(self, value, *default):
+        if dict.__contains__(self, value):
+            ids = dict.__getitem__(self, value)
+            del self[value]
+            return ids
+        if default:
+            return default[0]
+        raise KeyError(value)
+
+    def clear(self):
+        dict.clear(self)
+        self._keys = []
+
+    def update(self, *args, **kwargs):
+        for value, ids in dict(*args, **kwargs).items():
+            self[value] = ids
+
+    def copy(self) -> "OrderedIndex":
+        index = OrderedIndex(self, self.width)
+        index._keys = list(self._keys)
+        index.aliased = self.aliased
+        return index
+
+    def ordered_keys(self, reverse: bool = False) -> Iterator[Any]:
+        """Yield every index value in order, or in reverse"""
+        for key in reversed(self._keys) if reverse else self._keys:
+            yield self._value(key)
+
+    def _span(self, prefix_key: Tuple, conditions: Optional[Dict[str, Any]]) -> Tuple[int, int]:
+        """Positions in ``_keys`` of the keys starting with ``prefix_key`` whose
+        next field satisfies the range operators in ``conditions``"""
+        start = bisect_left(self._keys, prefix_key)
+        end = bisect_left(self._keys, prefix_key + (_AFTER,))
+        if conditions and len(prefix_key) < self.width:
+            # a None bound keys as (0, 0) like the nulls it is compared with:
+            # $gte/$lte null match only nulls, $gt/$lt null match nothing
+            bounds = {op: order_key(conditions[op]) for op in RANGE_OPERATORS if op in conditions}
+            if None in bounds.values() or len({bound[0] for bound in bounds.values()}) > 1:
+                return 0, 0  # bounds of different types match nothing
+            if bounds:
+                rank = next(iter(bounds.values()))[0]
+                start = max(start, bisect_left(self._keys, prefix_key + ((rank,),)))
+                end = min(end, bisect_left(self._keys, prefix_key + ((rank + 1,),)))
+            for op in ("$gt", "$gte"):
+                if op in bounds:
+                    key = prefix_key + (bounds[op],)
+                    position = bisect_left(self._keys, key + (_AFTER,) if op == "$gt" else key)
+                    start = max(start, position)
+            for op in ("$lt", "$lte"):
+                if op in bounds:
+                    key = prefix_key + (bounds[op],)
+                    position = bisect_left(self._keys, key if op == "$lt" else key + (_AFTER,))
+                    end = min(end, position)
+        return start, end
+
+    def range_keys(self, conditions: Optional[Dict[str, Any]] = None,
+                   prefix: Sequence[Any] = ()) -> Iterator[Any]:
+        """Yield index values in order whose leading fields equal ``prefix`` and
+        whose next field satisfies the range operators in ``conditions``.
+
+        A prefix part equal to values of another sort type (``True`` and
+        ``1``) matches both, as equality does, so their spans are merged.
+        """
+        prefix_key = tuple(order_key(value) for value in prefix)
+        if None in prefix_key:
+            return
+        if not any(len(_equal_keys(part)) > 1 for part in prefix):
+            start, end = self._span(prefix_key, conditions)
+            for position in range(start, end):
+                yield self._value(self._keys[position])
+            return
+        spans = [self._keys[slice(*self._span(key, conditions))]
+                 for key in itertools.product(*map(_equal_keys, prefix))]
+        seen = set()
+        for key in heapq.merge(*spans):
+            value = self._value(key)
+            if value not in seen:
+                seen.add(value)
+                yield value
+
+    def range_ids(self, conditions: Optional[Dict[str, Any]] = None,
+                  prefix: Sequence[Any] = ()) -> List[Any]:
+        """Document ids whose indexed value matches ``prefix`` and the range operators.
+
+        A multikey document can sit under several keys in the span; it is
+        listed once.
+        """
+        ids: List[Any] = []
+        for value in self.range_keys(conditions, prefix):
+            ids.extend(dict.__getitem__(self, value))
+        return list(dict.fromkeys(ids))
+
+
+class DocumentNumbers:
+    """Stable small integers for document ids: the bit positions of bitmap postings.
+
+    Slot positions move when the slots are vacuumed, so bitmaps use their
+    own numbering instead. A number is kept for the life of the indexes,
+    so a deleted and re-inserted document gets its old bit back. New numbers
+    are handed out under a lock, as background index builds draw on them too.
+    """
+
+    def __init__(self):
+        self._numbers: Dict[Any, int] = {}
+        self._ids: List[Any] = []
+        self._lock = threading.Lock()
+
+    def number(self, doc_id: Any) -> int:
+        number = self._numbers.get(doc_id)
+        if number is None:
+            with self._lock:
+                number = self._numbers.get(doc_id)
+                if number is None:
+                    number = self._numbers[doc_id] = len(self._ids)
+                    self._ids.append(doc_id)
+        return number
+
+    def lookup(self, doc_id: Any) -> Optional[int]:
+        return self._numbers.get(doc_id)
+
+    def ids(self, numbers: Iterable[int]) -> List[Any]:
+        ids = self._ids
+        return [ids[number] for number in numbers]
+
+
+class BitmapIndex(dict):
+    """``value -> Bitmap`` postings over document numbers, for low-cardinality fields.
+
+    Adding or removing a posting sets or clears one bit, however many
+    documents share the value. Lookups still hand out ``_id`` lists like the
+    other index types; ``bitmap``/``union``/``complement`` expose the
+    bitmaps themselves so predicates can be combined with ``&``/``|``/``-``
+    before any ids are decoded.
+    """
+
+    def __init__(self, postings: Optional[Dict[Any, List]] = None,
+                 numbers: Optional[DocumentNumbers] = None):
+        super().__init__()
+        self.numbers = numbers if numbers is not None else DocumentNumbers()
+        for value, ids in (postings or {}).items():
+            for doc_id in ids:
+                self.add(value, doc_id)
+
+    def add(self, value: Any, doc_id: Any):
+        bitmap = dict.get(self, value)
+        if bitmap is None:
+            bitmap = Bitmap()
+            dict.__setitem__(self, value, bitmap)
+        bitmap.add(self.numbers.number(doc_id))
+
+    append = add
+
+    def remove(self, value: Any, doc_id: Any):
+        bitmap = dict.get(self, value)
+        number = self.numbers.lookup(doc_id)
+        if bitmap is not None and number is not None and bitmap.discard(number) and not bitmap:
+            dict.__delitem__(self, value)
+
+    def __getitem__(self, value) -> List[Any]:
+        return self.numbers.ids(dict.__getitem__(self, value))
+
+    def get(self, value, default=None):
+        bitmap = dict.get(self, value)
+        return default if bitmap is None else self.numbers.ids(bitmap)
+
+    def items(self) -> Iterator[Tuple[Any, List[Any]]]:
+        for value, bitmap in dict.items(self):
+            yield value, self.numbers.ids(bitmap)
+
+    def values(self) -> Iterator[List[Any]]:
+        for _, ids in self.items():
+            yield ids
+
+    def bitmap(self, value: Any) -> Bitmap:
+        """Postings of one value (empty if none)"""
+        return dict.get(self, value) or Bitmap()
+
+    def union(self, values: Iterable[Any]) -> Bitmap:
+        """Documents indexed under any of ``values`` (may be a stored bitmap; do not modify)"""
+        result = None
+        for value in values:
+            bitmap = dict.get(self, value)
+            if bitmap is not None:
+                result = bitmap if result is None else result | bitmap
+        return Bitmap() if result is None else result
+
+    def complement(self, value: Any) -> Bitmap:
+        """Documents indexed under any value other than ``value``.
+
+        The None key also files objects and empty arrays, which are not None,
+        so it is kept even when ``value`` is None: the result is a superset
+        that callers check against the query.
+        """
+        return self.union(key for key in dict.keys(self) if key is None or key != value)
+
+    def copy(self) -> "BitmapIndex":
+        return BitmapIndex(dict(self.items()), self.numbers)
@@ -0,0 +1,227 @@
+# core/journal.py
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+from core.durability import DEFAULT_DURABILITY, append_file, at_least_atomic, write_file
+from core.serializer import DEFAULT_CODEC, Serializer
+from utils.logger import logger
+
+JOURNAL_MAX_BYTES = 4 * 1024 * 1024
+JOURNAL_MAX_RECORDS = 10000
+
+class CollectionJournal:
+    """Append-only change log kept next to a collection's base file.
+
+    The file starts with a codec header followed by length-prefixed records.
+    """
+
+    def __init__(self, file_path: Path, codec: str = DEFAULT_CODEC,
+                 durability: str = DEFAULT_DURABILITY):
+        self.file_path = Path(file_path).with_suffix(".journal")
+        self.codec = codec
+        self.durability = durability
+        self.record_count = 0
+        self.lock = threading.Lock()
+
+    def exists(self) -> bool:
+        """Check whether the journal file is present on disk"""
+        return self.file_path.exists()
+
+    def create(self):
+        """Create an empty journal file"""
+        write_file(self.file_path, Serializer.header(self.codec), self.durability)
+        self.record_count = 0
+
+    def size_bytes(self) -> int:
+        """Current size of the journal file in bytes"""
+        try:
+            return self.file_path.stat().st_size
+        except FileNotFoundError:
+            return 0
+
+    def append(self, records: List[Dict]):
+        """Append change records in a single write"""
+        if not records:
+            return
+        payload = b"".join(Serializer.frame(record, self.codec) for record in records)
+        try:
+            with self.lock:
+                if self.size_bytes() == 0:
+                    payload = Serializer.header(self.codec) + payload
+                append_file(self.file_path, payload, self.durability)
+                self.record_count += len(records)
+        except OSError as e:
+            logger.log_operation("ERROR", "JOURNAL_APPEND", str(self.file_path), str(e))
+            raise
+
+    def read(self, end_offset: Optional[int] = None) -> Iterator[Dict]:
+        """Yield journal records in write order.
+
+        A torn trailing record left by an interrupted append is cut off when
+        the whole journal is read, so later appends stay readable.
+        """
+        if not self.file_path.exists():
+            return
+        with open(self.file_path, 'rb') as f:
+            data = f.read() if end_offset is None else f.read(end_offset)
+        if not data:
+            return
+        self.codec, position = Serializer.read_header(data)
+        for record, position in Serializer.iter_frames(data, self.codec, position):
+            yield record
+        if end_offset is None and position < len(data):
+            logger.log_operation(
+                "JOURNAL_READ",
+                str(self.file_path),
+                "TRUNCATED",
+                f"dropping {len(data) - position} bytes of an incomplete record"
+            )
+            with self.lock:
+                os.truncate(self.file_path, position)
+
+    def replay(self, documents: List[Dict], end_offset: Optional[int] = None) -> List[Dict]:
+        """Apply journal records on top of the base documents.
+
+        Records carry whole documents or ids, so replaying them over a base
+        that already contains some of them yields the same final state.
+        """
+        by_id = {doc['_id']: doc for doc in documents}
+        count = 0
+        for record in self.read(end_offset):
+            op = record.get('op')
+            if op in ('insert', 'update'):
+                by_id[record['doc']['_id']] = record['doc']
+            elif op == 'delete':
+                by_id.pop(record['_id'], None)
+            else:
+                raise ValueError(f"Unknown journal record: {op}")
+            count += 1
+        if end_offset is None:
+            self.record_count = count
+        return list(by_id.values())
+
+    def discard_prefix(self, offset: int):
+        """Drop the records in the first ``offset`` bytes, keeping later ones.
+
+        Must be called with ``self.lock`` held.
+        """
+        with open(self.file_path, 'rb') as f:
+            f.seek(offset)
+            tail = f.read()
+        # an in-place rewrite interrupted here would lose the tail records
+        write_file(self.file_path, Serializer.header(self.codec) + tail, at_least_atomic(self.durability))
+        self.record_count = sum(1 for _ in Serializer.iter_frames(tail, self.codec))
+
+
+class JournalCheckpointer:
+    """Folds a collection journal into a fresh base snapshot on a background thread"""
+
+    def __init__(self, journal: CollectionJournal, base_path: Path,
+                 max_bytes: int = JOURNAL_MAX_BYTES, max_records: int = JOURNAL_MAX_RECORDS,
+                 codec: str = DEFAULT_CODEC):
+        self.journal = journal
+        self.base_path = Path(base_path)
+        self.codec = codec
+        self.max_bytes = max_bytes
+        self.max_records = max_records
+        self.checkpoint_count = 0
+        self.last_duration_ms: Optional[float] = None
+        self.last_checkpoint_at: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self._thread: Optional[threading.Thread] = None
+        self._run_lock = threading.Lock()
+
+    def needs_checkpoint(self) -> bool:
+        """Check whether the journal crossed its size or record-count threshold"""
+        return (self.journal.record_count >= self.max_records
+                or self.journal.size_bytes() >= self.max_bytes)
+
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def maybe_start(self) -> bool:
+        """Start a background checkpoint if a threshold is exceeded"""
+        if not self.needs_checkpoint():
+            return False
+        return self.start()
+
+    def start(self) -> bool:
+        """Start a background checkpoint unless one is already running"""
+        if self.is_running():
+            return False
+        self._thread = threading.Thread(
+            target=self._run_background,
+            name=f"checkpoint-{self.base_path.stem}",
+            daemon=True
+        )
+        self._thread.start()
+        return True
+
+    def wait(self, timeout: Optional[float] = None):
+        """Block until a running background checkpoint finishes"""
+        thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+
+    def _run_background(self):
+        try:
+            self.checkpoint()
+        except Exception:
+            pass  # already logged; the journal stays authoritative
+
+    def checkpoint(self):
+        """Write base file + journal prefix to a new base and drop that prefix.
+
+        Works from the files alone, so readers and writers of the in-memory
+        collection are never blocked; only the final journal swap takes the
+        journal lock.
+        """
+        with self._run_lock:
+            start = time.perf_counter()
+            try:
+                with self.journal.lock:
+                    offset = self.journal.size_bytes()
+                    pending = self.journal.record_count
+                if pending == 0:
+                    return
+                documents, _ = Serializer.load_file(self.base_path)
+                documents = self.journal.replay(documents, end_offset=offset)
+                Serializer.dump_file(self.base_path, documents, self.codec,
+                                     at_least_atomic(self.journal.durability))
+                with self.journal.lock:
+                    self.journal.discard_prefix(offset)
+                self.checkpoint_count += 1
+                self.last_duration_ms = (time.perf_counter() - start) * 1000
+                self.last_checkpoint_at = time.time()
+                self.last_error = None
+                logger.log_operation(
+                    "JOURNAL_CHECKPOINT",
+                    str(self.base_path),
+                    "SUCCESS",
+                    f"folded {offset} bytes into {len(documents)} documents in {self.last_duration_ms:.2f}ms"
+                )
+            except Exception as e:
+                self.last_error = str(e)
+                logger.log_operation(
+                    "JOURNAL_CHECKPOINT",
+                    str(self.base_path),
+                    "FAILED",
+                    str(e)
+                )
+                raise
+
+    def stats(self) -> Dict:
+        """Journal size and checkpoint timings for threshold tuning"""
+        return {
+            "journal_bytes": self.journal.size_bytes(),
+            "journal_records": self.journal.record_count,
+            "max_bytes": self.max_bytes,
+            "max_records": self.max_records,
+            "checkpoints": self.checkpoint_count,
+            "last_checkpoint_duration_ms": self.last_duration_ms,
+            "last_checkpoint_at": self.last_checkpoint_at,
+            "running": self.is_running(),
+            "last_error": self.last_error,
+        }
@@ -0,0 +1,123 @@
+# core/partition.py
+import json
+import shutil
+import zlib
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set
+from core.durability import DEFAULT_DURABILITY
+from core.serializer import DEFAULT_CODEC, Serializer
+from utils.logger import logger
+
+PARTITION_SUFFIX = ".parts"
+PARTITION_COUNT = 8
+MANIFEST_NAME = "manifest.json"
+
+def partition_of(doc_id: Any, partitions: int) -> int:
+    """Stable partition number for an ``_id`` (independent of PYTHONHASHSEED)"""
+    return zlib.crc32(json.dumps(doc_id, sort_keys=True).encode()) % partitions
+
+class PartitionedStore:
+    """A collection split into N files by hash of ``_id``, kept in ``<name>.parts/``.
+
+    The directory holds a manifest with the partition count and one
+    ``part-NNN.json`` file per partition. A save only rewrites the
+    partitions its changes touched.
+    """
+
+    def __init__(self, file_path: Path, partitions: int = PARTITION_COUNT,
+                 codec: str = DEFAULT_CODEC, durability: str = DEFAULT_DURABILITY):
+        self.dir_path = Path(file_path).with_suffix(PARTITION_SUFFIX)
+        self.manifest_path = self.dir_path / MANIFEST_NAME
+        self.partitions = partitions
+        self.codec = codec
+        self.durability = durability
+        self.members: List[Dict[Any, None]] = [{} for _ in range(partitions)]
+        self.partition_writes = 0
+
+    def exists(self) -> bool:
+        return self.manifest_path.exists()
+
+    def partition_path(self, number: int) -> Path:
+        return self.dir_path / f"part-{number:03d}.json"
+
+    def _read_manifest(self):
+        manifest, _ = Serializer.load_file(self.manifest_path)
+        self.partitions = manifest["partitions"]
+        self.codec = manifest.get("codec", self.codec)
+        self.members = [{} for _ in range(self.partitions)]
+
+    def write(self, documents: Iterable[Dict]):
+        """Create (or replace) every partition from the given documents"""
+        if self.partitions < 1:
+            raise ValueError("A partitioned collection needs at least one partition")
+        self.dir_path.mkdir(parents=True, exist_ok=True)
+        buckets: List[List[Dict]] = [[] for _ in range(self.partitions)]
+        self.members = [{} for _ in range(self.partitions)]
+        for doc in documents:
+            number = partition_of(doc['_id'], self.partitions)
+            buckets[number].append(doc)
+            self.members[number][doc['_id']] = None
+        for number, bucket in enumerate(buckets):
+            Serializer.dump_file(self.partition_path(number), bucket, self.codec, self.durability)
+        for stale in self.dir_path.glob("part-*.json"):
+            if int(stale.stem[5:]) >= self.partitions:
+                stale.unlink()
+        Serializer.dump_file(self.manifest_path, {"partitions": self.partitions, "codec": self.codec},
+                             "json-pretty", self.durability)
+        self.partition_writes += self.partitions
+
+    def load(self, progress: Optional[Callable[[int, int], None]] = None) -> List[Dict]:
+        """Load all partitions one after another; returns documents in partition order.
+
+        Decoding holds the GIL, so threads would not overlap it, and a
+        process pool pays for pickling every document back.
+        """
+        self._read_manifest()
+        paths = [self.partition_path(number) for number in range(self.partitions)]
+        sizes = [path.stat().st_size for path in paths]
+        total = sum(sizes)
+        documents: List[Dict] = []
+        loaded = 0
+        for number, path in enumerate(paths):
+            part, _ = Serializer.load_file(path)
+            members = self.members[number]
+            for doc in part:
+                members[doc['_id']] = None
+            documents.extend(part)
+            loaded += sizes[number]
+            if progress:
+                progress(loaded, total)
+        return documents
+
+    def append(self, changes: List[Dict], doc_id_map: Dict[Any, Dict]) -> Set[int]:
+        """Rewrite only the partitions touched by journal-style change records.
+
+        A partition is written from the documents in ``doc_id_map``: a member
+        missing there was deleted in memory by a transaction whose delete
+        record has not been saved yet (and may still be undone).
+        """
+        touched: Set[int] = set()
+        for change in changes:
+            doc_id = change['_id'] if change['op'] == 'delete' else change['doc']['_id']
+            number = partition_of(doc_id, self.partitions)
+            if change['op'] == 'delete':
+                self.members[number].pop(doc_id, None)
+            else:
+                self.members[number][doc_id] = None
+            touched.add(number)
+        for number in sorted(touched):
+            documents = [doc_id_map[doc_id] for doc_id in self.members[number] if doc_id in doc_id_map]
+            Serializer.dump_file(self.partition_path(number), documents, self.codec, self.durability)
+        self.partition_writes += len(touched)
+        return touched
+
+    def remove(self):
+        if self.dir_path.exists():
+            shutil.rmtree(self.dir_path)
+
+    def stats(self) -> Dict:
+        return {
+            "partitions": self.partitions,
+            "documents_per_partition": [len(members) for members in self.members],
+            "partition_writes": self.partition_writes,
+        }
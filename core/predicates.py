@@ -0,0 +1,194 @@
+# core/predicates.py
+import itertools
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterator, List, Tuple
+from utils.helpers import field_candidates
+
+MAX_COMPILED = 256  # query shapes whose generated matchers are kept, least recently used dropped
+
+_MISSING = object()
+_HASHABLE = frozenset((str, int, float, bool, type(None)))
+_NUMBERS = frozenset((int, float))
+_COMPARISONS = {"$gt": ">", "$gte": ">=", "$lt": "<", "$lte": "<="}
+_BOUND_KINDS = {int: "number", float: "number", str: "str", bool: "bool", type(None): "none"}
+_TYPE_TESTS = {"number": "type({x}) in _NUMBERS", "str": "type({x}) is str", "bool": "type({x}) is bool"}
+_HELPERS = ("_candidates", "_contains", "_MISSING", "_HASHABLE", "_NUMBERS")
+
+_compiled: "OrderedDict[Tuple, Callable]" = OrderedDict()
+_compiled_lock = threading.Lock()
+
+def _contains(value: Any, pattern: Dict) -> bool:
+    """Whether ``value`` is a sub-document holding every field of ``pattern``
+    with an equal value (nested objects in the pattern matched the same way)"""
+    if not isinstance(value, dict):
+        return False
+    for key, wanted in pattern.items():
+        if key not in value:
+            return False
+        if isinstance(wanted, dict):
+            if not _contains(value[key], wanted):
+                return False
+        elif value[key] != wanted:
+            return False
+    return True
+
+def _condition_shape(condition: Any, params: List[Any]) -> Tuple:
+    """Shape of one field's condition; its values are appended to ``params``"""
+    if not isinstance(condition, dict):
+        params.append(condition)
+        return ("eq",)
+    if not all(isinstance(op, str) and op.startswith("$") for op in condition):
+        params.append(condition)
+        return ("doc",)
+    start = len(params)
+    ops = []
+    for op, operand in condition.items():
+        if op in _COMPARISONS:
+            kind = _BOUND_KINDS.get(type(operand), "other")
+            if kind in _TYPE_TESTS:
+                params.append(operand)
+            ops.append((op, kind))
+        elif op in ("$eq", "$ne"):
+            params.append(operand)
+            ops.append((op,))
+        elif op == "$in":
+            if not isinstance(operand, (list, tuple)):
+                raise ValueError(f"$in needs an array, got {operand!r}")
+            params.append(frozenset(value for value in operand if type(value) in _HASHABLE))
+            params.append(tuple(value for value in operand if type(value) not in _HASHABLE))
+            ops.append((op,))
+        else:
+            del params[start:]
+            return ("never",)  # unknown operators match nothing
+    return ("ops", tuple(ops))
+
+def query_shape(query: Dict, params: List[Any]) -> Tuple:
+    """Structure of a query without its values, which are appended to
+    ``params`` in the order the generated matcher takes them"""
+    if not isinstance(query, dict):
+        raise ValueError(f"A query must be an object, got {query!r}")
+    parts = []
+    for field, condition in query.items():
+        if field == "$or":
+            if not isinstance(condition, list) or not all(isinstance(branch, dict) for branch in condition):
+                raise ValueError("$or needs a list of queries")
+            parts.append(("$or", tuple(query_shape(branch, params) for branch in condition)))
+        else:
+            parts.append((field, _condition_shape(condition, params)))
+    return tuple(parts)
+
+def _operator_tests(ops: Tuple, names: Iterator[str]) -> Tuple[List[str], List[str]]:
+    """Tests of a candidate ``{x}`` for every operator but ``$ne``, as
+    templates, and the ``$ne`` operands"""
+    tests, excluded = [], []
+    for op in ops:
+        if op[0] == "$ne":
+            excluded.append(next(names))
+        elif op[0] == "$eq":
+            tests.append(f"{{x}} == {next(names)}")
+        elif op[0] == "$in":
+            members, others = next(names), next(names)
+            tests.append(f"({{x}} in {members} if type({{x}}) in _HASHABLE else {{x}} in {others})")
+        elif op[1] in _TYPE_TESTS:
+            tests.append(f"{_TYPE_TESTS[op[1]]} and {{x}} {_COMPARISONS[op[0]]} {next(names)}")
+        elif op[1] == "none":
+            tests.append("{x} is None" if op[0] in ("$gte", "$lte") else "False")
+        else:
+            tests.append("False")  # a range bound by an array or object matches nothing
+    return tests, excluded
+
+def _condition_tests(shape: Tuple, names: Iterator[str]) -> Tuple[str, str]:
+    """Tests for one field's condition: of a single value ``v``, and of the
+    non-empty candidate list ``cs`` (an array and its elements)"""
+    if shape[0] == "eq":
+        name = next(names)
+        return f"v == {name}", f"{name} in cs"
+    if shape[0] == "doc":
+        name = next(names)
+        return f"_contains(v, {name})", f"any(_contains(x, {name}) for x in cs)"
+    tests, excluded = _operator_tests(shape[1], names)
+    single = [f"not v == {name}" for name in excluded]
+    many = [f"{name} not in cs" for name in excluded]
+    if tests:
+        single.append("(" + " and ".join(test.format(x="v") for test in tests) + ")")
+        many.append("any(" + " and ".join(test.format(x="x") for test in tests) + " for x in cs)")
+    return " and ".join(single) or "True", " and ".join(many) or "True"
+
+def _function_source(name: str, shape: Tuple, names: Iterator[str], functions: Iterator[int],
+                     definitions: List[str]):
+    """Append the source of a matcher for ``shape`` (after those of its
+    ``$or`` branches) to ``definitions``"""
+    body = []
+    for field, condition in shape:
+        if field == "$or":
+            branches = []
+            for branch in condition:
+                branches.append(f"_or{next(functions)}")
+                _function_source(branches[-1], branch, names, functions, definitions)
+            calls = " or ".join(f"{branch}(doc)" for branch in branches) or "False"
+            body.append(f"if not ({calls}): return False")
+            continue
+        if condition[0] == "never":
+            body.append("return False")
+            continue
+        single, many = _condition_tests(condition, names)
+        if "." in field:
+            body += [f"cs = _candidates(doc, {field!r})",
+                     "if not cs: return False",
+                     f"if not ({many}): return False"]
+        else:
+            body += [f"v = doc.get({field!r}, _MISSING)",
+                     "if v is _MISSING: return False",
+                     "if type(v) is list:",
+                     "    cs = [v, *v]",
+                     f"    if not ({many}): return False",
+                     f"elif not ({single}): return False"]
+    body.append("return True")
+    definitions.append(f"    def {name}(doc):\n" + "".join(f"        {line}\n" for line in body))
+
+def _build(shape: Tuple, param_count: int) -> Callable:
+    """Generate and compile the matcher factory of a query shape"""
+    params = [f"p{number}" for number in range(param_count)]
+    definitions: List[str] = []
+    _function_source("match", shape, iter(params), itertools.count(), definitions)
+    source = (f"def _factory({', '.join(_HELPERS + tuple(params))}):\n"
+              + "".join(definitions) + "    return match\n")
+    namespace: Dict[str, Any] = {}
+    exec(compile(source, f"<query {shape!r:.200}>", "exec"), namespace)
+    factory = namespace["_factory"]
+    factory.source = source
+    return factory
+
+def compile_query(query: Dict) -> Callable[[Dict], bool]:
+    """A function telling whether a document matches ``query``.
+
+    The query is turned into Python source once per shape (its fields and
+    operators, not its values), compiled, and kept; queries of a seen shape
+    only bind their values to the cached code. Semantics: fields may be
+    dotted paths; an array matches when the array itself or any element
+    does, and all the operators of a condition must hold for the same one,
+    while ``$ne`` requires that none equals its operand; a field that is
+    missing never matches. ``$gt``/``$gte``/``$lt``/``$lte`` only compare
+    values of the bound's own type (numbers, strings or booleans), as
+    ordered indexes do. A condition object without operators matches
+    sub-documents holding its fields. Unknown operators match nothing.
+    Raises ValueError for a malformed ``$or`` or ``$in``.
+    """
+    params: List[Any] = []
+    shape = query_shape(query, params)
+    with _compiled_lock:
+        factory = _compiled.get(shape)
+        if factory is not None:
+            _compiled.move_to_end(shape)
+    if factory is None:
+        factory = _build(shape, len(params))
+        with _compiled_lock:
+            _compiled[shape] = factory
+            if len(_compiled) > MAX_COMPILED:
+                _compiled.popitem(last=False)
+    return factory(field_candidates, _contains, _MISSING, _HASHABLE, _NUMBERS, *params)
+
+def compiled_shapes() -> int:
+    """Number of query shapes with a cached matcher"""
+    return len(_compiled)
@@ -2,6 +2,7 @@
 from typing import Optional, Dict, List
 import json
 import time
+from core.predicates import compile_query
 from utils.logger import logger
 
 class Query:
@@ -66,13 +67,19 @@ class Query:
                 )
                 return {"operation": "use_db", "name": query[15:].strip()}
             elif operation.startswith("nava collection banao"):
+                parts = query[21:].strip().split()
+                storage = parts[1].lower() if len(parts) >= 2 else "json"
+                if (not parts or len(parts) > 3 or (len(parts) == 3 and storage != "partitioned")
+                        or (len(parts) == 3 and not parts[2].isdigit())):
+                    raise ValueError("Invalid create collection syntax. Use: nava collection banao <name> [json|journal|segment|partitioned [N]]")
+                partitions = int(parts[2]) if len(parts) == 3 else None
                 logger.log_operation(
                     "QUERY_PARSE",
                     "COLLECTION",
                     "SUCCESS",
-                    f"operation:create_collection, name:{query[21:].strip()}"
+                    f"operation:create_collection, name:{parts[0]}, storage:{storage}, partitions:{partitions}"
                 )
-                return {"operation": "create_collection", "name": query[21:].strip()}
+                return {"operation": "create_collection", "name": parts[0], "storage": storage, "partitions": partitions}
             elif operation.startswith("collection nu mitao"):
                 logger.log_operation(
                     "QUERY_PARSE",
@@ -81,17 +88,56 @@ class Query:
                     f"operation:drop_collection, name:{query[19:].strip()}"
                 )
                 return {"operation": "drop_collection", "name": query[19:].strip()}
+            elif operation.startswith("storage badlo"):
+                parts = query[13:].strip().split()
+                if len(parts) not in (2, 3):
+                    raise ValueError("Invalid storage syntax. Use: storage badlo <collection> <json|journal|segment|partitioned> [codec]")
+                codec = parts[2].lower() if len(parts) == 3 else None
+                logger.log_operation(
+                    "QUERY_PARSE",
+                    "COLLECTION",
+                    "SUCCESS",
+                    f"operation:convert_collection, collection:{parts[0]}, storage:{parts[1].lower()}, codec:{codec}"
+                )
+                return {"operation": "convert_collection", "collection": parts[0], "storage": parts[1].lower(), "codec": codec}
             elif operation.startswith("index banao"):
-                parts = query[11:].strip().split()
-                if len(parts) >= 2:
+                spec, brace, filter_part = query[11:].partition("{")
+                parts = spec.strip().split()
+                options = [part.lower() for part in parts[2:]]
+                expire_after = None
+                if "ttl" in options:
+                    position = options.index("ttl")
+                    try:
+                        expire_after = float(options[position + 1])
+                    except (IndexError, ValueError):
+                        expire_after = False
+                    else:
+                        expire_after = int(expire_after) if expire_after.is_integer() else expire_after
+                        del options[position:position + 2]
+                types = [option for option in options if option in ("hash", "ordered", "bitmap", "text")]
+                flags = [option for option in options if option in ("unique", "stem", "sparse")]
+                try:
+                    index_filter = json.loads(brace + filter_part) if brace else None
+                except json.JSONDecodeError:
+                    index_filter = False
+                if (len(parts) >= 2 and len(types) <= 1 and len(set(flags)) == len(flags)
+                        and len(types) + len(flags) == len(options) and index_filter is not False
+                        and expire_after is not False):
+                    index_type = types[0] if types else "ordered" if expire_after else "hash"
+                    unique = "unique" in flags
+                    stem = "stem" in flags
+                    sparse = "sparse" in flags
                     logger.log_operation(
                         "QUERY_PARSE",
                         "INDEX",
                         "SUCCESS",
-                        f"operation:create_index, field:{parts[0]}, collection:{parts[1]}"
+                        f"operation:create_index, field:{parts[0]}, collection:{parts[1]}, type:{index_type}, unique:{unique}, "
+                        f"stem:{stem}, sparse:{sparse}, filter:{index_filter}, expire_after:{expire_after}"
                     )
-                    return {"operation": "create_index", "field": parts[0], "collection": parts[1]}
-                raise ValueError("Invalid create index syntax. Use: create index field collection")
+                    return {"operation": "create_index", "field": parts[0], "collection": parts[1],
+                            "index_type": index_type, "unique": unique, "stem": stem,
+                            "sparse": sparse, "filter": index_filter, "expire_after": expire_after}
+                raise ValueError("Invalid create index syntax. Use: index banao <field[,field...]> <collection> [hash|ordered|bitmap|text] [unique] [stem] [sparse] [ttl <seconds>] [{filter}]")
             
             # Document operations
             elif operation.startswith("dakhil karo"):
@@ -251,6 +297,7 @@ class Query:
             elif operation.startswith("labbo"):
                 try:
                     collection, query_part = query[5:].strip().split("{", 1)
+                    query_json, projection = Query._query_and_projection("{" + query_part)
                     logger.log_operation(
                         "QUERY_PARSE",
                         "QUERY",
@@ -260,7 +307,8 @@ class Query:
                     return {
                         "operation": "find",
                         "collection": collection.strip(),
-                        "query": json.loads("{" + query_part)
+                        "query": query_json,
+                        "projection": projection
                     }
                 except (ValueError, json.JSONDecodeError):
                     logger.log_operation(
@@ -272,8 +320,43 @@ class Query:
                     return {
                         "operation": "find",
                         "collection": query[7:].strip(),
-                        "query": {}
+                        "query": {},
+                        "projection": None
                     }
+            elif operation.startswith("gino") or operation.startswith("samjhao"):
+                command = "count" if operation.startswith("gino") else "explain"
+                parts = query.split(None, 2)
+                if len(parts) < 2:
+                    usage = "gino <collection> [{query}]" if command == "count" else "samjhao <collection> {query} [{projection}]"
+                    raise ValueError(f"Collection name required. Use: {usage}")
+                try:
+                    query_json, projection = Query._query_and_projection(parts[2]) if len(parts) > 2 else ({}, None)
+                except json.JSONDecodeError as e:
+                    raise ValueError(f"Invalid JSON in query: {e}")
+                if command == "count" and projection is not None:
+                    raise ValueError("gino takes a single {query}")
+                logger.log_operation(
+                    "QUERY_PARSE",
+                    "QUERY",
+                    "SUCCESS",
+                    f"operation:{command}, collection:{parts[1]}"
+                )
+                return {"operation": command, "collection": parts[1], "query": query_json, "projection": projection}
+            elif operation.startswith("alag"):
+                parts = query.split(None, 3)
+                if len(parts) < 3:
+                    raise ValueError("Collection and field required. Use: alag <collection> <field> [{query}]")
+                try:
+                    query_json = json.loads(parts[3]) if len(parts) > 3 else {}
+                except json.JSONDecodeError as e:
+                    raise ValueError(f"Invalid JSON in query: {e}")
+                logger.log_operation(
+                    "QUERY_PARSE",
+                    "QUERY",
+                    "SUCCESS",
+                    f"operation:distinct, collection:{parts[1]}, field:{parts[2]}"
+                )
+                return {"operation": "distinct", "collection": parts[1], "field": parts[2], "query": query_json}
             
             # Aggregation
             elif operation.startswith("aggregate in"):
@@ -295,16 +378,18 @@ class Query:
             
             # Backup operations
             elif operation.startswith("backup banao"):
-                name = query[12:].strip()
-                if not name:
-                    ValueError("Database name required for backup. Use: backup banao <database_name>")
+                parts = query[12:].strip().split()
+                if not parts:
+                    raise ValueError("Database name required for backup. Use: backup banao <database_name> [codec]")
+                name = parts[0]
+                codec = parts[1].lower() if len(parts) > 1 else None
                 logger.log_operation(
                     "QUERY_PARSE",
                     "BACKUP",
                     "SUCCESS",
-                    f"operation:backup, name:{name}"
+                    f"operation:backup, name:{name}, codec:{codec}"
                 )
-                return {"operation": "backup", "name": name}
+                return {"operation": "backup", "name": name, "codec": codec}
             elif operation.startswith("restore karo"):
                 logger.log_operation(
                     "QUERY_PARSE",
@@ -322,6 +407,25 @@ class Query:
                     f"operation:list_indexes, collection:{query[12:].strip()}"
                 )
                 return {"operation": "list_indexes", "collection": query[12:].strip()}
+            elif operation.startswith("index sujhao"):
+                parts = query[12:].strip().split()
+                if not parts or (len(parts) > 1 and (parts[1].lower() != "auto" or len(parts) != 3)):
+                    raise ValueError("Invalid index sujhao syntax. Use: index sujhao <collection> [auto <scans>|auto off]")
+                auto = None
+                if len(parts) == 3:
+                    if parts[2].lower() == "off":
+                        auto = 0
+                    elif parts[2].isdigit() and int(parts[2]) > 0:
+                        auto = int(parts[2])
+                    else:
+                        raise ValueError("Auto index threshold must be a positive number of scans, or 'off'")
+                logger.log_operation(
+                    "QUERY_PARSE",
+                    "INDEX",
+                    "SUCCESS",
+                    f"operation:recommend_indexes, collection:{parts[0]}, auto:{auto}"
+                )
+                return {"operation": "recommend_indexes", "collection": parts[0], "auto": auto}
             
             # Toggle indexing
             elif operation == "index chalo karo":
@@ -353,40 +457,23 @@ class Query:
             )
             raise
         
+    @staticmethod
+    def _query_and_projection(text: str) -> tuple:
+        """Parse ``{query}`` optionally followed by ``{projection}``"""
+        decoder = json.JSONDecoder()
+        text = text.strip()
+        query, end = decoder.raw_decode(text)
+        rest = text[end:].strip()
+        projection = decoder.decode(rest) if rest else None
+        if not isinstance(query, dict) or (projection is not None and not isinstance(projection, dict)):
+            raise ValueError("Query and projection must be JSON objects")
+        return query, projection
+
     @staticmethod
     def evaluate(doc: Dict, query: Dict) -> bool:
-        """Evaluate if a document matches the query"""
+        """Evaluate if a document matches the query (see ``compile_query``)"""
         try:
-            for field, condition in query.items():
-                if field not in doc:
-                    return False
-                    
-                if isinstance(condition, dict):
-                    # Handle operators
-                    for op, value in condition.items():
-                        if op == "$gt":
-                            if not doc[field] > value:
-                                return False
-                        elif op == "$lt":
-                            if not doc[field] < value:
-                                return False
-                        elif op == "$eq":
-                            if not doc[field] == value:
-                                return False
-                        elif op == "$ne":
-                            if not doc[field] != value:
-                                return False
-                        elif op == "$in":
-                            if doc[field] not in value:
-                                return False
-                        else:
-                            return False
-                else:
-                    # Direct equality match
-                    if doc[field] != condition:
-                        return False
-                        
-            return True
+            return compile_query(query)(doc)
         except Exception as e:
             logger.log_operation(
                 "QUERY_EVALUATE",
@@ -0,0 +1,335 @@
+# core/segment.py
+import json
+import mmap
+import os
+import struct
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+from core.durability import DEFAULT_DURABILITY, append_file, replace_file, sync_file
+from core.serializer import Serializer
+from core.slots import DocumentSlots
+from utils.logger import logger
+
+SEGMENT_MAGIC = b"A2ZSEG"
+SEGMENT_VERSION = 1
+RECORD_HEADER = struct.Struct("<IBH")  # body length, flags, id length
+FLAG_DOCUMENT = 0
+FLAG_TOMBSTONE = 1
+INDEX_FLUSH_RECORDS = 1000
+COMPACT_MIN_BYTES = 1024 * 1024
+SEGMENT_CODEC = "msgpack"
+DECODED_CACHE_SIZE = 10000  # decoded documents kept in memory, least recently used dropped
+
+class SegmentStore:
+    """Length-prefixed document records in a ``.seg`` file with an ``_id -> offset`` index.
+
+    Records are only ever appended: an update writes a new version of the
+    document and a delete writes a tombstone. Documents are decoded from an
+    mmap of the segment when requested; the ``cache_size`` most recently
+    used stay decoded. Documents registered with ``put`` are held until
+    ``append`` has written them, as the segment does not have them yet.
+    """
+
+    def __init__(self, file_path: Path, codec: str = SEGMENT_CODEC,
+                 durability: str = DEFAULT_DURABILITY, cache_size: int = DECODED_CACHE_SIZE):
+        self.seg_path = Path(file_path).with_suffix(".seg")
+        self.index_path = self.seg_path.with_suffix(".idx")
+        self.codec = codec
+        self.durability = durability
+        self._codec = Serializer.get(codec)
+        self.offsets: Dict[Any, int] = {}
+        self.dead_bytes = 0
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[Any, Dict]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self._pending: Dict[Any, Dict] = {}
+        self._data_start = 0
+        self._size = 0
+        self._indexed_size = 0
+        self._unindexed_records = 0
+        self._file = None
+        self._mmap: Optional[mmap.mmap] = None
+
+    # -- encoding -------------------------------------------------------
+
+    def _header(self) -> bytes:
+        codec = self.codec.encode()
+        return SEGMENT_MAGIC + bytes([SEGMENT_VERSION, len(codec)]) + codec
+
+    def _encode_document(self, document: Dict) -> bytes:
+        return self._codec.encode(document)
+
+    def _decode_document(self, payload) -> Dict:
+        return self._codec.decode(payload)
+
+    def _record(self, doc_id: Any, payload: bytes = b"", flags: int = FLAG_DOCUMENT) -> bytes:
+        id_bytes = json.dumps(doc_id).encode()
+        body_len = 1 + 2 + len(id_bytes) + len(payload)
+        return RECORD_HEADER.pack(body_len, flags, len(id_bytes)) + id_bytes + payload
+
+    # -- file handling --------------------------------------------------
+
+    def exists(self) -> bool:
+        return self.seg_path.exists()
+
+    def write(self, documents: Iterable[Dict]):
+        """Write a fresh segment and index containing only the given documents"""
+        self.close()
+        tmp_path = self.seg_path.with_name(self.seg_path.name + ".tmp")
+        offsets = {}
+        with open(tmp_path, 'wb') as f:
+            f.write(self._header())
+            position = f.tell()
+            for doc in documents:
+                record = self._record(doc['_id'], self._encode_document(doc))
+                f.write(record)
+                offsets[doc['_id']] = position
+                position += len(record)
+            sync_file(f, self.durability)
+        replace_file(tmp_path, self.seg_path, self.durability)
+        self.offsets = offsets
+        self.dead_bytes = 0
+        self._size = position
+        self._write_index()
+
+    def open(self):
+        """Validate the segment header and load (or rebuild) the offset index"""
+        if not self.seg_path.exists():
+            self.write([])
+        self._cache = OrderedDict()
+        self._pending = {}
+        self._file = open(self.seg_path, 'rb')
+        self._size = os.fstat(self._file.fileno()).st_size
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mmap[:len(SEGMENT_MAGIC)] != SEGMENT_MAGIC:
+            raise ValueError(f"Not a segment file: {self.seg_path}")
+        version, codec_len = self._mmap[len(SEGMENT_MAGIC)], self._mmap[len(SEGMENT_MAGIC) + 1]
+        if version != SEGMENT_VERSION:
+            raise ValueError(f"Unsupported segment version {version}: {self.seg_path}")
+        codec_start = len(SEGMENT_MAGIC) + 2
+        self.codec = self._mmap[codec_start:codec_start + codec_len].decode()
+        self._codec = Serializer.get(self.codec)
+        self._data_start = codec_start + codec_len
+
+        scan_from = self._data_start
+        self.offsets = {}
+        self.dead_bytes = 0
+        if self.index_path.exists():
+            try:
+                index, _ = Serializer.load_file(self.index_path)
+                if index["segment_size"] <= self._size:
+                    self.offsets = {doc_id: offset for doc_id, offset in index["offsets"]}
+                    self.dead_bytes = index["dead_bytes"]
+                    scan_from = index["segment_size"]
+            except (OSError, ValueError, KeyError) as e:
+                logger.log_operation("SEGMENT_INDEX", str(self.index_path), "REBUILD", str(e))
+                self.offsets = {}
+                self.dead_bytes = 0
+        end = self._scan(scan_from)
+        if end != self._size:
+            logger.log_operation("SEGMENT_SCAN", str(self.seg_path), "TRUNCATED",
+                                 f"dropping {self._size - end} bytes of a torn trailing record")
+            self._mmap.close()
+            os.truncate(self.seg_path, end)
+            self._size = end
+            self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._indexed_size = scan_from
+        logger.log_operation(
+            "SEGMENT_OPEN",
+            str(self.seg_path),
+            "SUCCESS",
+            f"documents:{len(self.offsets)}, size:{self._size}, scanned:{self._size - scan_from} bytes"
+        )
+
+    def _scan(self, position: int) -> int:
+        """Index records from ``position``; returns where the last complete record ends"""
+        view = self._mmap
+        while position + RECORD_HEADER.size <= self._size:
+            body_len, flags, id_len = RECORD_HEADER.unpack_from(view, position)
+            end = position + 4 + body_len
+            if end > self._size:
+                break
+            id_start = position + RECORD_HEADER.size
+            doc_id = json.loads(bytes(view[id_start:id_start + id_len]))
+            previous = self.offsets.pop(doc_id, None) if flags == FLAG_TOMBSTONE else self.offsets.get(doc_id)
+            if previous is not None:
+                self.dead_bytes += self._record_length(previous)
+            if flags == FLAG_TOMBSTONE:
+                self.dead_bytes += end - position
+            else:
+                self.offsets[doc_id] = position
+            position = end
+        return position
+
+    def _view(self, end: int) -> mmap.mmap:
+        """Return an mmap that covers the file up to ``end``, remapping after appends"""
+        if self._mmap is None or len(self._mmap) < end:
+            if self._mmap is not None:
+                self._mmap.close()
+            self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        return self._mmap
+
+    def _record_length(self, offset: int) -> int:
+        view = self._view(offset + RECORD_HEADER.size)
+        return 4 + RECORD_HEADER.unpack_from(view, offset)[0]
+
+    def _write_index(self):
+        # the index can always be rebuilt by scanning, so it is never fsynced
+        Serializer.dump_file(self.index_path, {
+            "segment_size": self._size,
+            "dead_bytes": self.dead_bytes,
+            "offsets": list(self.offsets.items())
+        }, "json", "atomic")
+        self._indexed_size = self._size
+        self._unindexed_records = 0
+
+    def close(self):
+        """Persist the offset index and release the mmap"""
+        if self._file is None:
+            return
+        if self._indexed_size != self._size:
+            self._write_index()
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+        self._file.close()
+        self._file = None
+
+    # -- documents ------------------------------------------------------
+
+    def ids(self) -> List[Any]:
+        return list(self.offsets)
+
+    def get(self, doc_id: Any) -> Dict:
+        """Return a document, decoding it from the segment unless it is cached"""
+        doc = self._pending.get(doc_id)
+        if doc is not None:
+            return doc
+        with self._cache_lock:
+            doc = self._cache.get(doc_id)
+            if doc is not None:
+                self._cache.move_to_end(doc_id)
+                return doc
+        offset = self.offsets[doc_id]
+        view = self._view(offset + RECORD_HEADER.size)
+        body_len, _, id_len = RECORD_HEADER.unpack_from(view, offset)
+        view = self._view(offset + 4 + body_len)
+        doc = self._decode_document(view[offset + RECORD_HEADER.size + id_len:offset + 4 + body_len])
+        self._remember(doc_id, doc)
+        return doc
+
+    def _remember(self, doc_id: Any, doc: Dict):
+        """Cache a decoded document, dropping the least recently used past ``cache_size``"""
+        with self._cache_lock:
+            self._cache[doc_id] = doc
+            self._cache.move_to_end(doc_id)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def put(self, doc: Dict):
+        """Register an in-memory document that will be persisted by ``append``"""
+        self._pending[doc['_id']] = doc
+        with self._cache_lock:
+            self._cache.pop(doc['_id'], None)
+
+    def decoded_count(self) -> int:
+        return len(self._pending) + len(self._cache)
+
+    def decoded_documents(self) -> List[Dict]:
+        """Documents currently held decoded in memory"""
+        with self._cache_lock:
+            return list(self._pending.values()) + list(self._cache.values())
+
+    def append(self, changes: List[Dict]):
+        """Append journal-style change records (insert/update/delete) to the segment"""
+        if not changes:
+            return
+        chunks = []
+        position = self._size
+        new_offsets = []
+        written = []
+        for change in changes:
+            if change['op'] == 'delete':
+                record = self._record(change['_id'], flags=FLAG_TOMBSTONE)
+                new_offsets.append((change['_id'], None, len(record)))
+            else:
+                doc = change['doc']
+                record = self._record(doc['_id'], self._encode_document(doc))
+                new_offsets.append((doc['_id'], position, 0))
+                written.append(doc)
+            chunks.append(record)
+            position += len(record)
+        append_file(self.seg_path, b"".join(chunks), self.durability)
+        for doc_id, offset, tombstone_len in new_offsets:
+            previous = self.offsets.get(doc_id)
+            if previous is not None:
+                self.dead_bytes += self._record_length(previous)
+            if offset is None:
+                self.offsets.pop(doc_id, None)
+                self._pending.pop(doc_id, None)
+                with self._cache_lock:
+                    self._cache.pop(doc_id, None)
+                self.dead_bytes += tombstone_len
+            else:
+                self.offsets[doc_id] = offset
+        for doc in written:
+            # the segment has it now; a later put of another version stays held
+            if self._pending.get(doc['_id']) is doc:
+                del self._pending[doc['_id']]
+                self._remember(doc['_id'], doc)
+        self._size = position
+        self._unindexed_records += len(changes)
+        if self.dead_bytes >= COMPACT_MIN_BYTES and self.dead_bytes * 2 > self._size:
+            self.compact()
+        elif self._unindexed_records >= INDEX_FLUSH_RECORDS:
+            self._write_index()
+
+    def compact(self):
+        """Rewrite the segment with live records only, copying them without decoding"""
+        view = self._view(self._size)
+        tmp_path = self.seg_path.with_name(self.seg_path.name + ".tmp")
+        offsets = {}
+        with open(tmp_path, 'wb') as f:
+            f.write(self._header())
+            position = f.tell()
+            for doc_id, offset in self.offsets.items():
+                length = self._record_length(offset)
+                f.write(view[offset:offset + length])
+                offsets[doc_id] = position
+                position += length
+            sync_file(f, self.durability)
+        reclaimed = self.dead_bytes
+        cache, pending = self._cache, self._pending
+        self._mmap.close()
+        self._mmap = None
+        self._file.close()
+        replace_file(tmp_path, self.seg_path, self.durability)
+        self.offsets = offsets
+        self.dead_bytes = 0
+        self._size = position
+        self._write_index()
+        self.open()
+        self._cache, self._pending = cache, pending
+        logger.log_operation("SEGMENT_COMPACT", str(self.seg_path), "SUCCESS", f"reclaimed {reclaimed} bytes")
+
+
+class LazyDocumentList(DocumentSlots):
+    """Document slots holding ``_id``s; documents are decoded from the segment on access"""
+
+    def __init__(self, store: SegmentStore, ids: Optional[List[Any]] = None):
+        self._store = store
+        super().__init__()
+        self._slots = list(store.ids() if ids is None else ids)
+        self._reindex()
+
+    def _entry(self, doc: Dict) -> Any:
+        self._store.put(doc)
+        return doc['_id']
+
+    def _document(self, entry: Any) -> Dict:
+        return self._store.get(entry)
+
+    def _entry_id(self, entry: Any) -> Any:
+        return entry
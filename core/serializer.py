@@ -1,8 +1,343 @@
+import codecs
 import json
-from typing import Any, Dict, List
+import re
+import struct
+import zlib
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
 from datetime import datetime
+from core.durability import DEFAULT_DURABILITY, write_file
+
+FILE_MAGIC = b"A2Z\x01"
+FRAME_HEADER = struct.Struct("<I")
+DEFAULT_CODEC = "json"
+STREAM_CHUNK_SIZE = 1024 * 1024
+_JSON_WHITESPACE = re.compile(r"[ \t\r\n]*")
+
+class Codec:
+    """Encodes Python data to bytes and back"""
+    name = ""
+
+    def encode(self, data: Any) -> bytes:
+        raise NotImplementedError
+
+    def decode(self, payload: bytes) -> Any:
+        raise NotImplementedError
+
+    def iter_array(self, chunks: Iterable[bytes]) -> Iterator[Any]:
+        """Yield the elements of an encoded top-level array as the bytes arrive"""
+        raise NotImplementedError
+
+
+class JsonCodec(Codec):
+    def __init__(self, name: str = "json", indent: int = None):
+        self.name = name
+        self.indent = indent
+        self.separators = None if indent else (",", ":")
+
+    def encode(self, data: Any) -> bytes:
+        return json.dumps(data, indent=self.indent, separators=self.separators,
+                          default=Serializer._default_serializer).encode()
+
+    def decode(self, payload: bytes) -> Any:
+        return json.loads(bytes(payload))
+
+    def iter_array(self, chunks: Iterable[bytes]) -> Iterator[Any]:
+        decoder = json.JSONDecoder()
+        text_decoder = codecs.getincrementaldecoder("utf-8")()
+        chunks = iter(chunks)
+        buffer = ""
+        pos = 0
+        eof = False
+
+        def fill() -> bool:
+            nonlocal buffer, pos, eof
+            if eof:
+                return False
+            chunk = next(chunks, None)
+            if chunk is None:
+                eof = True
+                buffer = buffer[pos:] + text_decoder.decode(b"", final=True)
+            else:
+                buffer = buffer[pos:] + text_decoder.decode(chunk)
+            pos = 0
+            return True
+
+        def skip_whitespace():
+            nonlocal pos
+            while True:
+                pos = _JSON_WHITESPACE.match(buffer, pos).end()
+                if pos < len(buffer) or not fill():
+                    return
+
+        skip_whitespace()
+        if pos >= len(buffer):
+            return  # only whitespace: no elements
+        if buffer[pos] != "[":
+            raise ValueError("Expected a JSON array")
+        pos += 1
+        first = True
+        while True:
+            skip_whitespace()
+            if pos >= len(buffer):
+                raise ValueError("Unterminated JSON array")
+            if buffer[pos] == "]":
+                return
+            if not first:
+                if buffer[pos] != ",":
+                    raise ValueError(f"Expected ',' in JSON array, found {buffer[pos]!r}")
+                pos += 1
+                skip_whitespace()
+            while True:
+                try:
+                    item, end = decoder.raw_decode(buffer, pos)
+                except json.JSONDecodeError:
+                    if fill():
+                        continue
+                    raise
+                # a number cut off by the chunk boundary still parses, so make
+                # sure it is followed by a delimiter before accepting it
+                if (isinstance(item, (int, float)) and not eof
+                        and (end == len(buffer) or buffer[end] not in ",] \t\r\n")
+                        and fill()):
+                    continue
+                break
+            pos = end
+            first = False
+            yield item
+
+
+class MsgPackCodec(Codec):
+    """Pure Python encoder/decoder for the JSON-compatible subset of MessagePack"""
+    name = "msgpack"
+
+    def encode(self, data: Any) -> bytes:
+        out = bytearray()
+        self._pack(data, out)
+        return bytes(out)
+
+    def _pack(self, obj: Any, out: bytearray):
+        if obj is None:
+            out.append(0xc0)
+        elif obj is True:
+            out.append(0xc3)
+        elif obj is False:
+            out.append(0xc2)
+        elif isinstance(obj, int):
+            if 0 <= obj < 0x80:
+                out.append(obj)
+            elif -32 <= obj < 0:
+                out.append(obj & 0xff)
+            elif 0 <= obj <= 0xffffffffffffffff:
+                if obj <= 0xff:
+                    out += b"\xcc" + struct.pack(">B", obj)
+                elif obj <= 0xffff:
+                    out += b"\xcd" + struct.pack(">H", obj)
+                elif obj <= 0xffffffff:
+                    out += b"\xce" + struct.pack(">I", obj)
+                else:
+                    out += b"\xcf" + struct.pack(">Q", obj)
+            elif -0x8000000000000000 <= obj < 0:
+                if obj >= -0x80:
+                    out += b"\xd0" + struct.pack(">b", obj)
+                elif obj >= -0x8000:
+                    out += b"\xd1" + struct.pack(">h", obj)
+                elif obj >= -0x80000000:
+                    out += b"\xd2" + struct.pack(">i", obj)
+                else:
+                    out += b"\xd3" + struct.pack(">q", obj)
+            else:
+                raise TypeError(f"Integer out of range for msgpack: {obj}")
+        elif isinstance(obj, float):
+            out += b"\xcb" + struct.pack(">d", obj)
+        elif isinstance(obj, str):
+            raw = obj.encode()
+            n = len(raw)
+            if n < 32:
+                out.append(0xa0 | n)
+            elif n <= 0xff:
+                out += b"\xd9" + struct.pack(">B", n)
+            elif n <= 0xffff:
+                out += b"\xda" + struct.pack(">H", n)
+            else:
+                out += b"\xdb" + struct.pack(">I", n)
+            out += raw
+        elif isinstance(obj, (bytes, bytearray)):
+            n = len(obj)
+            if n <= 0xff:
+                out += b"\xc4" + struct.pack(">B", n)
+            elif n <= 0xffff:
+                out += b"\xc5" + struct.pack(">H", n)
+            else:
+                out += b"\xc6" + struct.pack(">I", n)
+            out += obj
+        elif isinstance(obj, (list, tuple)):
+            n = len(obj)
+            if n < 16:
+                out.append(0x90 | n)
+            elif n <= 0xffff:
+                out += b"\xdc" + struct.pack(">H", n)
+            else:
+                out += b"\xdd" + struct.pack(">I", n)
+            for item in obj:
+                self._pack(item, out)
+        elif isinstance(obj, dict):
+            n = len(obj)
+            if n < 16:
+                out.append(0x80 | n)
+            elif n <= 0xffff:
+                out += b"\xde" + struct.pack(">H", n)
+            else:
+                out += b"\xdf" + struct.pack(">I", n)
+            for key, value in obj.items():
+                self._pack(key, out)
+                self._pack(value, out)
+        else:
+            self._pack(Serializer._default_serializer(obj), out)
+
+    def decode(self, payload: bytes) -> Any:
+        data = bytes(payload)
+        obj, pos = self._unpack(data, 0)
+        if pos != len(data):
+            raise ValueError(f"Trailing data after msgpack object at byte {pos}")
+        return obj
+
+    def _unpack(self, data: bytes, pos: int) -> Tuple[Any, int]:
+        b = data[pos]
+        pos += 1
+        if b < 0x80:
+            return b, pos
+        if b >= 0xe0:
+            return b - 0x100, pos
+        if 0xa0 <= b <= 0xbf:
+            n = b & 0x1f
+            return data[pos:pos + n].decode(), pos + n
+        if 0x90 <= b <= 0x9f:
+            return self._unpack_array(data, pos, b & 0x0f)
+        if 0x80 <= b <= 0x8f:
+            return self._unpack_map(data, pos, b & 0x0f)
+        if b == 0xc0:
+            return None, pos
+        if b == 0xc2:
+            return False, pos
+        if b == 0xc3:
+            return True, pos
+        if b in _MSGPACK_FIXED:
+            fmt = _MSGPACK_FIXED[b]
+            return fmt.unpack_from(data, pos)[0], pos + fmt.size
+        if b in _MSGPACK_STR:
+            fmt = _MSGPACK_STR[b]
+            n = fmt.unpack_from(data, pos)[0]
+            pos += fmt.size
+            return data[pos:pos + n].decode(), pos + n
+        if b in _MSGPACK_BIN:
+            fmt = _MSGPACK_BIN[b]
+            n = fmt.unpack_from(data, pos)[0]
+            pos += fmt.size
+            return data[pos:pos + n], pos + n
+        if b in (0xdc, 0xdd):
+            fmt = _MSGPACK_LEN[b]
+            return self._unpack_array(data, pos + fmt.size, fmt.unpack_from(data, pos)[0])
+        if b in (0xde, 0xdf):
+            fmt = _MSGPACK_LEN[b]
+            return self._unpack_map(data, pos + fmt.size, fmt.unpack_from(data, pos)[0])
+        raise ValueError(f"Unsupported msgpack type byte 0x{b:02x}")
+
+    def iter_array(self, chunks: Iterable[bytes]) -> Iterator[Any]:
+        chunks = iter(chunks)
+        buffer = b""
+        pos = 0
+
+        def fill() -> bool:
+            nonlocal buffer, pos
+            chunk = next(chunks, None)
+            if chunk is None:
+                return False
+            buffer = buffer[pos:] + chunk
+            pos = 0
+            return True
+
+        while len(buffer) < 5 and fill():
+            pass
+        if not buffer:
+            raise ValueError("Expected a msgpack array")
+        b = buffer[0]
+        if 0x90 <= b <= 0x9f:
+            count, pos = b & 0x0f, 1
+        elif b in (0xdc, 0xdd):
+            fmt = _MSGPACK_LEN[b]
+            count, pos = fmt.unpack_from(buffer, 1)[0], 1 + fmt.size
+        else:
+            raise ValueError("Expected a msgpack array")
+        for _ in range(count):
+            while True:
+                try:
+                    item, end = self._unpack(buffer, pos)
+                    if end <= len(buffer):
+                        break
+                except (IndexError, struct.error, UnicodeDecodeError):
+                    pass
+                if not fill():
+                    raise ValueError("Truncated msgpack array")
+            pos = end
+            yield item
+
+    def _unpack_array(self, data: bytes, pos: int, n: int) -> Tuple[List, int]:
+        items = []
+        for _ in range(n):
+            item, pos = self._unpack(data, pos)
+            items.append(item)
+        return items, pos
+
+    def _unpack_map(self, data: bytes, pos: int, n: int) -> Tuple[Dict, int]:
+        result = {}
+        for _ in range(n):
+            key, pos = self._unpack(data, pos)
+            value, pos = self._unpack(data, pos)
+            result[key] = value
+        return result, pos
+
+
+_MSGPACK_FIXED = {
+    0xcc: struct.Struct(">B"), 0xcd: struct.Struct(">H"), 0xce: struct.Struct(">I"), 0xcf: struct.Struct(">Q"),
+    0xd0: struct.Struct(">b"), 0xd1: struct.Struct(">h"), 0xd2: struct.Struct(">i"), 0xd3: struct.Struct(">q"),
+    0xca: struct.Struct(">f"), 0xcb: struct.Struct(">d"),
+}
+_MSGPACK_STR = {0xd9: struct.Struct(">B"), 0xda: struct.Struct(">H"), 0xdb: struct.Struct(">I")}
+_MSGPACK_BIN = {0xc4: struct.Struct(">B"), 0xc5: struct.Struct(">H"), 0xc6: struct.Struct(">I")}
+_MSGPACK_LEN = {0xdc: struct.Struct(">H"), 0xdd: struct.Struct(">I"), 0xde: struct.Struct(">H"), 0xdf: struct.Struct(">I")}
+
+
+class ZlibCodec(Codec):
+    """Compresses the output of another codec with zlib"""
+
+    def __init__(self, inner: Codec, level: int = 6):
+        self.inner = inner
+        self.level = level
+        self.name = f"{inner.name}+zlib"
+
+    def encode(self, data: Any) -> bytes:
+        return zlib.compress(self.inner.encode(data), self.level)
+
+    def decode(self, payload: bytes) -> Any:
+        return self.inner.decode(zlib.decompress(payload))
+
+    def iter_array(self, chunks: Iterable[bytes]) -> Iterator[Any]:
+        def decompressed():
+            decompressor = zlib.decompressobj()
+            for chunk in chunks:
+                data = decompressor.decompress(chunk)
+                if data:
+                    yield data
+            data = decompressor.flush()
+            if data:
+                yield data
+        return self.inner.iter_array(decompressed())
+
 
 class Serializer:
+    _codecs: Dict[str, Codec] = {}
+
     @staticmethod
     def serialize(data: Any) -> str:
         """Serialize data to JSON string"""
@@ -18,4 +353,135 @@ class Serializer:
         """Handle serialization of non-JSON-serializable objects"""
         if isinstance(obj, datetime):
             return obj.isoformat()
-        raise TypeError(f"Object of type {type(obj)} is not JSON serializable")
\ No newline at end of file
+        raise TypeError(f"Object of type {type(obj)} is not JSON serializable")
+
+    # -- codec registry -------------------------------------------------
+
+    @classmethod
+    def register(cls, codec: Codec):
+        """Make a codec available by name"""
+        if not codec.name or len(codec.name.encode()) > 255:
+            raise ValueError("Codec name must be 1-255 bytes")
+        cls._codecs[codec.name] = codec
+
+    @classmethod
+    def get(cls, name: str) -> Codec:
+        try:
+            return cls._codecs[name]
+        except KeyError:
+            raise ValueError(f"Unknown codec: {name}. Available: {', '.join(cls.available())}")
+
+    @classmethod
+    def available(cls) -> List[str]:
+        return sorted(cls._codecs)
+
+    @classmethod
+    def encode(cls, data: Any, codec: str = DEFAULT_CODEC) -> bytes:
+        return cls.get(codec).encode(data)
+
+    @classmethod
+    def decode(cls, payload: bytes, codec: str = DEFAULT_CODEC) -> Any:
+        return cls.get(codec).decode(payload)
+
+    # -- self-describing files ------------------------------------------
+
+    @staticmethod
+    def header(codec: str) -> bytes:
+        """File header naming the codec used for the rest of the file"""
+        name = codec.encode()
+        return FILE_MAGIC + bytes([len(name)]) + name
+
+    @classmethod
+    def read_header(cls, raw: bytes) -> Tuple[str, int]:
+        """Return ``(codec, payload_start)``; files without a header are legacy JSON"""
+        if not raw.startswith(FILE_MAGIC):
+            return DEFAULT_CODEC, 0
+        start = len(FILE_MAGIC) + 1
+        if len(raw) < start or len(raw) < start + raw[len(FILE_MAGIC)]:
+            raise ValueError("Truncated codec header")
+        end = start + raw[len(FILE_MAGIC)]
+        return raw[start:end].decode(), end
+
+    @classmethod
+    def dumps(cls, data: Any, codec: str = DEFAULT_CODEC) -> bytes:
+        return cls.header(codec) + cls.encode(data, codec)
+
+    @classmethod
+    def loads(cls, raw: bytes) -> Tuple[Any, str]:
+        """Decode a header-prefixed blob, returning the data and its codec"""
+        codec, start = cls.read_header(raw)
+        return cls.decode(raw[start:], codec), codec
+
+    @classmethod
+    def dump_file(cls, path: Path, data: Any, codec: str = DEFAULT_CODEC,
+                  durability: str = DEFAULT_DURABILITY):
+        write_file(path, cls.dumps(data, codec), durability)
+
+    @classmethod
+    def load_file(cls, path: Path) -> Tuple[Any, str]:
+        with open(path, 'rb') as f:
+            return cls.loads(f.read())
+
+    @classmethod
+    def iter_file(cls, path: Path, progress: Optional[Callable[[int, int], None]] = None,
+                  chunk_size: int = STREAM_CHUNK_SIZE) -> Tuple[str, Iterator[Any]]:
+        """Stream the elements of an array file without reading it whole.
+
+        Returns the file's codec and an iterator over its elements.
+        ``progress(bytes_read, total_bytes)`` is called after every chunk.
+        A file with nothing after its header (an empty file) holds no
+        elements.
+        """
+        f = open(path, 'rb')
+        try:
+            total = f.seek(0, 2)
+            f.seek(0)
+            head = f.read(len(FILE_MAGIC) + 256)
+            codec, start = cls.read_header(head)
+            f.seek(start)
+            codec_obj = cls.get(codec)
+        except Exception:
+            f.close()
+            raise
+        if total <= start:
+            f.close()
+            return codec, iter(())
+
+        def chunks() -> Iterator[bytes]:
+            with f:
+                while True:
+                    chunk = f.read(chunk_size)
+                    if not chunk:
+                        break
+                    if progress:
+                        progress(f.tell(), total)
+                    yield chunk
+
+        return codec, codec_obj.iter_array(chunks())
+
+    # -- append-only record streams -------------------------------------
+
+    @classmethod
+    def frame(cls, data: Any, codec: str = DEFAULT_CODEC) -> bytes:
+        """Length-prefixed record for append-only logs"""
+        payload = cls.encode(data, codec)
+        return FRAME_HEADER.pack(len(payload)) + payload
+
+    @classmethod
+    def iter_frames(cls, raw: bytes, codec: str, start: int = 0) -> Iterator[Tuple[Any, int]]:
+        """Yield ``(record, end_offset)`` for every complete frame after ``start``"""
+        pos = start
+        while pos + FRAME_HEADER.size <= len(raw):
+            length = FRAME_HEADER.unpack_from(raw, pos)[0]
+            end = pos + FRAME_HEADER.size + length
+            if end > len(raw):
+                return
+            yield cls.decode(raw[pos + FRAME_HEADER.size:end], codec), end
+            pos = end
+
+
+Serializer.register(JsonCodec())
+Serializer.register(JsonCodec("json-pretty", indent=2))
+Serializer.register(MsgPackCodec())
+Serializer.register(ZlibCodec(Serializer.get("json")))
+Serializer.register(ZlibCodec(Serializer.get("msgpack")))
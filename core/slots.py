@@ -0,0 +1,208 @@
+# core/slots.py
+import threading
+from collections.abc import MutableMapping, MutableSequence
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+from utils.logger import logger
+
+VACUUM_DEAD_RATIO = 0.25
+VACUUM_MIN_DEAD = 1000
+
+_TOMBSTONE = object()
+
+class DocumentSlots(MutableSequence):
+    """Documents kept in insertion-ordered slots with an ``_id -> slot`` map.
+
+    Deleting a document only puts a tombstone in its slot, so it costs O(1)
+    however large the collection is; iteration skips tombstones. Once the
+    dead slots pass ``VACUUM_DEAD_RATIO`` a background vacuum compacts them.
+    Positional access (``documents[i]``) compacts first, since positions are
+    only meaningful without tombstones.
+    """
+
+    def __init__(self, documents: Iterable[Dict] = ()):
+        self._slots: List[Any] = []
+        self._slot_of: Dict[Any, int] = {}
+        self._dead = 0
+        self.lock = threading.RLock()
+        self.vacuum_count = 0
+        self._vacuum_thread: Optional[threading.Thread] = None
+        self.by_id = SlotMap(self)
+        self.extend(documents)
+
+    # -- slot entries (overridden by lazily decoded subclasses) -----------
+
+    def _entry(self, doc: Dict) -> Any:
+        return doc
+
+    def _document(self, entry: Any) -> Dict:
+        return entry
+
+    def _entry_id(self, entry: Any) -> Any:
+        return entry['_id']
+
+    # -- sequence protocol ------------------------------------------------
+
+    def __len__(self) -> int:
+        return len(self._slot_of)
+
+    def __iter__(self) -> Iterator[Dict]:
+        document = self._document
+        for entry in self._slots:
+            if entry is not _TOMBSTONE:
+                yield document(entry)
+
+    def __getitem__(self, i):
+        if self._dead:
+            self.vacuum()
+        if isinstance(i, slice):
+            return [self._document(entry) for entry in self._slots[i]]
+        return self._document(self._slots[i])
+
+    def __setitem__(self, i, doc: Dict):
+        with self.lock:
+            if self._dead:
+                self.vacuum()
+            del self._slot_of[self._entry_id(self._slots[i])]
+            slot = i if i >= 0 else len(self._slots) + i
+            self._slots[slot] = self._entry(doc)
+            self._slot_of[doc['_id']] = slot
+
+    def __delitem__(self, i):
+        with self.lock:
+            if self._dead:
+                self.vacuum()
+            self.remove_id(self._entry_id(self._slots[i]))
+
+    def insert(self, i: int, doc: Dict):
+        with self.lock:
+            if i >= len(self):
+                self.append(doc)
+                return
+            if self._dead:
+                self.vacuum()
+            self._slots.insert(i, self._entry(doc))
+            self._reindex()
+
+    def append(self, doc: Dict):
+        """Add a document, or replace the one with the same ``_id`` in place"""
+        with self.lock:
+            slot = self._slot_of.get(doc['_id'])
+            if slot is not None:
+                self._slots[slot] = self._entry(doc)
+                return
+            self._slot_of[doc['_id']] = len(self._slots)
+            self._slots.append(self._entry(doc))
+
+    def extend(self, documents: Iterable[Dict]):
+        for doc in documents:
+            self.append(doc)
+
+    def copy(self) -> List[Dict]:
+        return list(self)
+
+    # -- lookups by _id ---------------------------------------------------
+
+    def get(self, doc_id: Any, default: Optional[Dict] = None) -> Optional[Dict]:
+        with self.lock:  # a vacuum may be renumbering the slots
+            slot = self._slot_of.get(doc_id)
+            if slot is None:
+                return default
+            return self._document(self._slots[slot])
+
+    def contains_id(self, doc_id: Any) -> bool:
+        return doc_id in self._slot_of
+
+    def ids(self) -> List[Any]:
+        return list(self._slot_of)
+
+    def replace(self, doc: Dict) -> bool:
+        """Swap in a new version of a stored document; False if its ``_id`` is unknown"""
+        with self.lock:
+            slot = self._slot_of.get(doc['_id'])
+            if slot is None:
+                return False
+            self._slots[slot] = self._entry(doc)
+            return True
+
+    def remove_id(self, doc_id: Any) -> bool:
+        """Tombstone a document's slot in O(1); False if it is not stored"""
+        with self.lock:
+            slot = self._slot_of.pop(doc_id, None)
+            if slot is None:
+                return False
+            self._slots[slot] = _TOMBSTONE
+            self._dead += 1
+            self._maybe_vacuum()
+            return True
+
+    # -- vacuum -----------------------------------------------------------
+
+    def dead_ratio(self) -> float:
+        return self._dead / len(self._slots) if self._slots else 0.0
+
+    def _reindex(self):
+        self._slot_of = {self._entry_id(entry): slot for slot, entry in enumerate(self._slots)}
+
+    def _maybe_vacuum(self):
+        if self._dead < VACUUM_MIN_DEAD or self.dead_ratio() < VACUUM_DEAD_RATIO:
+            return
+        if self._vacuum_thread is not None and self._vacuum_thread.is_alive():
+            return
+        self._vacuum_thread = threading.Thread(target=self.vacuum, name="slots-vacuum", daemon=True)
+        self._vacuum_thread.start()
+
+    def vacuum(self) -> int:
+        """Compact away tombstoned slots; returns how many were reclaimed.
+
+        Builds a new slot list and swaps it in, so iterators that are already
+        running keep walking the old one undisturbed.
+        """
+        with self.lock:
+            reclaimed = self._dead
+            if not reclaimed:
+                return 0
+            self._slots = [entry for entry in self._slots if entry is not _TOMBSTONE]
+            self._reindex()
+            self._dead = 0
+            self.vacuum_count += 1
+        logger.log_operation("SLOTS_VACUUM", "documents", "SUCCESS",
+                             f"reclaimed {reclaimed} slots, {len(self._slots)} live")
+        return reclaimed
+
+    def stats(self) -> Dict:
+        return {
+            "documents": len(self),
+            "slots": len(self._slots),
+            "tombstones": self._dead,
+            "dead_ratio": round(self.dead_ratio(), 4),
+            "vacuums": self.vacuum_count,
+        }
+
+
+class SlotMap(MutableMapping):
+    """``_id -> document`` view over ``DocumentSlots`` (the collection's ``doc_id_map``)"""
+
+    def __init__(self, slots: DocumentSlots):
+        self._slots = slots
+
+    def __getitem__(self, doc_id) -> Dict:
+        doc = self._slots.get(doc_id, _TOMBSTONE)
+        if doc is _TOMBSTONE:
+            raise KeyError(doc_id)
+        return doc
+
+    def __setitem__(self, doc_id, doc: Dict):
+        self._slots.append(doc)
+
+    def __delitem__(self, doc_id):
+        if not self._slots.remove_id(doc_id):
+            raise KeyError(doc_id)
+
+    def __contains__(self, doc_id) -> bool:
+        return doc_id in self._slots._slot_of
+
+    def __iter__(self):
+        return iter(list(self._slots._slot_of))
+
+    def __len__(self) -> int:
+        return len(self._slots._slot_of)
@@ -0,0 +1,80 @@
+# core/sorting.py
+import heapq
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from core.indexes import order_key
+
+_RANKS = {type(None): 0, int: 1, float: 1, str: 2, bool: 3}  # order_key's ranks, by exact type
+
+def total_order_key(value: Any) -> Tuple:
+    """Sort key for any JSON value, extending the ordered index order:
+    None (and missing) < numbers < strings < booleans < arrays < objects.
+    Values of different types are never compared with each other."""
+    rank = _RANKS.get(type(value))
+    if rank is not None:
+        return (rank, value) if rank else (0, 0)
+    key = order_key(value)
+    if key is not None:
+        return key
+    if isinstance(value, list):
+        return (4, [total_order_key(item) for item in value])
+    if isinstance(value, dict):
+        return (5, [(name, total_order_key(item)) for name, item in value.items()])
+    return (6, repr(value))
+
+
+class Descending:
+    """Wraps a sort key so it orders in reverse, for mixed-direction sorts"""
+    __slots__ = ("key",)
+
+    def __init__(self, key: Tuple):
+        self.key = key
+
+    def __lt__(self, other: "Descending") -> bool:
+        return other.key < self.key
+
+    def __eq__(self, other: "Descending") -> bool:
+        return self.key == other.key
+
+
+def check_sort_spec(spec: Dict) -> Dict:
+    """Validate a ``{field: 1 | -1}`` sort specification"""
+    if not isinstance(spec, dict) or not spec:
+        raise ValueError("$sort needs at least one field: {\"field\": 1 | -1}")
+    for field, direction in spec.items():
+        if direction not in (1, -1) or isinstance(direction, bool):
+            raise ValueError(f"$sort direction for {field} must be 1 or -1, got {direction!r}")
+    return spec
+
+def _getter(field: str, field_value: Callable[[Dict, str], Any]) -> Callable[[Dict], Any]:
+    """Value of ``field`` in a document; top-level fields skip the path walk"""
+    if "." in field or field.startswith("$"):
+        return lambda doc: field_value(doc, field)
+    return lambda doc: doc.get(field)
+
+def sort_documents(documents: List[Dict], spec: Dict, field_value: Callable[[Dict, str], Any],
+                   limit: Optional[int] = None) -> List[Dict]:
+    """Documents ordered by ``spec``; only the first ``limit`` when given.
+
+    A limit smaller than the input keeps a bounded heap instead of sorting
+    everything (O(n log k)). Ties keep their input order either way.
+    """
+    check_sort_spec(spec)
+    getters = [_getter(field, field_value) for field in spec]
+    reverse = False
+    if len(set(spec.values())) == 1:
+        reverse = next(iter(spec.values())) == -1
+        if len(getters) == 1:
+            get = getters[0]
+            def key(doc):
+                return total_order_key(get(doc))
+        else:
+            def key(doc):
+                return tuple(total_order_key(get(doc)) for get in getters)
+    else:
+        directions = list(spec.values())
+        def key(doc):
+            return tuple(total_order_key(get(doc)) if direction == 1 else Descending(total_order_key(get(doc)))
+                         for get, direction in zip(getters, directions))
+    if limit is not None and limit < len(documents):
+        return (heapq.nlargest if reverse else heapq.nsmallest)(limit, documents, key=key)
+    return sorted(documents, key=key, reverse=reverse)
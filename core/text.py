@@ -0,0 +1,114 @@
+# core/text.py
+import math
+import re
+from collections import Counter
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+TOKEN_PATTERN = re.compile(r"[^\W_]+")
+BM25_K1 = 1.2  # term frequency saturation
+BM25_B = 0.75  # document length normalization
+_VOWEL = re.compile(r"[aeiouy]")
+
+def stem(word: str) -> str:
+    """Light suffix stripping (plurals, -ing, -ed, trailing e), in the spirit of
+    Porter's first steps: ``courses``/``course`` -> ``cours``, ``programming`` -> ``program``"""
+    if len(word) <= 3:
+        return word
+    if word.endswith("sses"):
+        word = word[:-2]
+    elif word.endswith("ies"):
+        word = word[:-3] + "y"
+    elif word.endswith("s") and not word.endswith(("ss", "us", "is")):
+        word = word[:-1]
+    for suffix in ("ing", "ed"):
+        base = word[:-len(suffix)]
+        if word.endswith(suffix) and len(base) >= 3 and _VOWEL.search(base):
+            word = base
+            if word[-1] == word[-2] and word[-1] not in "lsz":
+                word = word[:-1]  # running -> run
+            break
+    if word.endswith("e") and len(word) > 4:
+        word = word[:-1]
+    return word
+
+def tokenize(text: str, stemming: bool = False) -> List[str]:
+    """Lowercased word tokens of ``text``, optionally stemmed"""
+    tokens = TOKEN_PATTERN.findall(text.lower())
+    if stemming:
+        return [stem(token) for token in tokens]
+    return tokens
+
+
+class TextIndex(dict):
+    """``term -> {id: term frequency}`` inverted index, ranked with BM25.
+
+    Each document is indexed under the text of its indexed fields. The
+    terms of every document are kept too, so ``add`` replaces a document's
+    earlier postings and ``remove`` clears them whatever the text was.
+    ``items`` yields ``(term, [[id, frequency], ...])`` pairs, which is also
+    what the constructor accepts back from a snapshot.
+    """
+
+    def __init__(self, postings: Optional[Dict[str, List]] = None, stemming: bool = False):
+        super().__init__()
+        self.stemming = stemming
+        self.terms: Dict[Any, List[str]] = {}
+        self.lengths: Dict[Any, int] = {}
+        for term, frequencies in (postings or {}).items():
+            dict.__setitem__(self, term, {doc_id: frequency for doc_id, frequency in frequencies})
+            for doc_id, frequency in frequencies:
+                self.terms.setdefault(doc_id, []).append(term)
+                self.lengths[doc_id] = self.lengths.get(doc_id, 0) + frequency
+        self.total_length = sum(self.lengths.values())
+
+    def add(self, text: str, doc_id: Any):
+        self.remove(text, doc_id)
+        counts = Counter(tokenize(text, self.stemming))
+        if not counts:
+            return
+        for term, frequency in counts.items():
+            frequencies = dict.get(self, term)
+            if frequencies is None:
+                dict.__setitem__(self, term, {doc_id: frequency})
+            else:
+                frequencies[doc_id] = frequency
+        self.terms[doc_id] = list(counts)
+        self.lengths[doc_id] = length = sum(counts.values())
+        self.total_length += length
+
+    append = add
+
+    def remove(self, text: str, doc_id: Any):
+        terms = self.terms.pop(doc_id, None)
+        if terms is None:
+            return
+        for term in terms:
+            frequencies = dict.__getitem__(self, term)
+            del frequencies[doc_id]
+            if not frequencies:
+                dict.__delitem__(self, term)
+        self.total_length -= self.lengths.pop(doc_id)
+
+    def items(self) -> Iterator[Tuple[str, List[List[Any]]]]:
+        for term, frequencies in dict.items(self):
+            yield term, [[doc_id, frequency] for doc_id, frequency in frequencies.items()]
+
+    def copy(self) -> "TextIndex":
+        return TextIndex(dict(self.items()), self.stemming)
+
+    def search(self, text: str) -> List[Tuple[Any, float]]:
+        """``(id, score)`` of documents containing any term of ``text``, best BM25 score first"""
+        count = len(self.lengths)
+        if not count:
+            return []
+        average = self.total_length / count
+        scores: Dict[Any, float] = {}
+        for term in dict.fromkeys(tokenize(text, self.stemming)):
+            frequencies = dict.get(self, term)
+            if not frequencies:
+                continue
+            idf = math.log(1 + (count - len(frequencies) + 0.5) / (len(frequencies) + 0.5))
+            for doc_id, frequency in frequencies.items():
+                norm = frequency + BM25_K1 * (1 - BM25_B + BM25_B * self.lengths[doc_id] / average)
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * frequency * (BM25_K1 + 1) / norm
+        return sorted(scores.items(), key=lambda item: item[1], reverse=True)
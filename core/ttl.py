@@ -0,0 +1,133 @@
+# core/ttl.py
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Optional
+from utils.logger import logger
+
+TTL_INTERVAL = 60.0  # seconds between expiry sweeps
+TTL_BATCH = 500  # documents deleted per hold of the collection's write lock
+
+def timestamp_seconds(value: Any) -> Optional[float]:
+    """Epoch seconds of a value a TTL index expires by: a number as it is,
+    an ISO 8601 string parsed (without an offset it is local time, a
+    trailing ``Z`` is UTC); None for anything else"""
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return value
+    if not isinstance(value, str):
+        return None
+    try:
+        parsed = datetime.fromisoformat(value[:-1] + "+00:00" if value.endswith("Z") else value)
+    except ValueError:
+        return None
+    return parsed.timestamp()
+
+def iso_bound(cutoff: float) -> str:
+    """A string sorting after every ISO 8601 timestamp (``YYYY-MM-DD...``)
+    older than ``cutoff`` whatever its separator or UTC offset: the local
+    date two days on. Strings before it still have to be parsed."""
+    return (datetime.fromtimestamp(cutoff) + timedelta(days=2)).date().isoformat()
+
+
+class ExpirySweeper:
+    """Deletes the documents of a collection whose TTL index timestamp is
+    older than that index's ``expire_after`` seconds.
+
+    Started, a background thread sweeps every ``interval`` seconds; ``run``
+    sweeps once right away. A sweep walks each TTL index from its oldest key
+    up to the cutoff (see ``iso_bound`` for strings), and deletes
+    ``batch_size`` documents per call of ``expire_batch``, which holds the
+    collection's write lock for that batch only. Writes therefore wait for
+    at most one batch. Expired counts are kept per index.
+    """
+
+    def __init__(self, name: str, indexes: Callable[[], Dict[str, float]],
+                 expire_batch: Callable[[str, float, int], int],
+                 interval: float = TTL_INTERVAL, batch_size: int = TTL_BATCH):
+        self.name = name
+        self.interval = interval
+        self.batch_size = batch_size
+        self.passes = 0
+        self.expired: Dict[str, int] = {}
+        self.last_expired = 0
+        self.last_run: Optional[float] = None
+        self.last_ms: Optional[float] = None
+        self.error: Optional[str] = None
+        self._indexes = indexes
+        self._expire_batch = expire_batch
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        """Sweep on a background thread every ``interval`` seconds"""
+        if self.is_running():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run_background, name=f"ttl-sweep-{self.name}", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the background thread after its current batch"""
+        self._stop.set()
+        thread = self._thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join()
+        self._thread = None
+
+    def _run_background(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.run()
+            except Exception:
+                pass  # already logged; the next interval tries again
+
+    def run(self, now: Optional[float] = None) -> Dict[str, int]:
+        """Sweep every TTL index once; returns the documents expired per index"""
+        start = time.perf_counter()
+        counts: Dict[str, int] = {}
+        try:
+            for index, expire_after in self._indexes().items():
+                cutoff = (time.time() if now is None else now) - expire_after
+                while not self._stop.is_set():
+                    deleted = self._expire_batch(index, cutoff, self.batch_size)
+                    if deleted:
+                        counts[index] = counts.get(index, 0) + deleted
+                        self.expired[index] = self.expired.get(index, 0) + deleted
+                    if deleted < self.batch_size:
+                        break
+                    time.sleep(0)  # let a waiting write take the lock before the next batch
+        except Exception as e:
+            self.error = str(e)
+            logger.log_operation("TTL_EXPIRE", f"collection:{self.name}", "FAILED", str(e))
+            raise
+        self.passes += 1
+        self.last_expired = sum(counts.values())
+        self.last_run = time.time()
+        self.last_ms = (time.perf_counter() - start) * 1000
+        self.error = None
+        if counts:
+            logger.log_operation(
+                "TTL_EXPIRE",
+                f"collection:{self.name}",
+                "SUCCESS",
+                f"expired:{counts}, duration_ms:{self.last_ms:.2f}"
+            )
+        return counts
+
+    def stats(self) -> Dict:
+        """Sweep counters, for index listings"""
+        return {
+            "running": self.is_running(),
+            "interval": self.interval,
+            "passes": self.passes,
+            "expired": dict(self.expired),
+            "last_expired": self.last_expired,
+            "last_run": self.last_run,
+            "last_ms": self.last_ms,
+            "error": self.error,
+        }
@@ -1,5 +1,6 @@
 
 # main_window.py
+import contextlib
 from datetime import datetime, timedelta
 import tkinter as tk
 from tkinter import ttk, messagebox, scrolledtext, filedialog, Toplevel
@@ -11,6 +12,7 @@ import json
 from core.auth import AuthManager
 import time
 import os
+import threading
 from core.decorators import requires_auth
 from core.permissions import Permission
 from core.query import Query
@@ -29,6 +31,7 @@ class MainWindow(tk.Tk):
         self.script_tabs = {}
         self.current_db: Optional[Database] = None
         self.current_collection: Optional[Collection] = None
+        self._pinned_db: Optional[Database] = None  # the database current_collection is pinned in
         self.current_script_tab = None
         self.auth_manager = AuthManager()
         self.current_user = None
@@ -199,6 +202,11 @@ class MainWindow(tk.Tk):
         """Update the transaction status in the Database Info tab."""
         self.info_text.delete(1.0, tk.END)
         status = f"Query Status: {self.query_time.get()}\nTransaction Status: {self.transaction_status.get()}"
+        if self.current_db:
+            cache = self.current_db.cache_stats()
+            status += (f"\nCollection Cache: {cache['collections']} open, "
+                       f"{cache['resident_bytes'] / 1048576:.1f}/{cache['budget_bytes'] / 1048576:.0f} MB, "
+                       f"hits {cache['hits']}, misses {cache['misses']}, evictions {cache['evictions']}")
         self.info_text.insert(tk.END, status)
         self.results_notebook.select(self.info_tab)
         logger.log_operation(
@@ -348,6 +356,11 @@ class MainWindow(tk.Tk):
         self.db_tree.heading("#0", text="Databases", anchor=tk.W)
         self.db_tree.bind("<<TreeviewSelect>>", self._on_db_tree_select)
 
+        # Shown while a collection streams in from disk
+        self.load_status = tk.StringVar()
+        self.load_label = ttk.Label(self.sidebar, textvariable=self.load_status)
+        self.load_progress = ttk.Progressbar(self.sidebar, mode='determinate', maximum=100)
+
         self.right_pane = ttk.PanedWindow(self.main_container, orient=tk.VERTICAL)
         self.main_container.add(self.right_pane)
 
@@ -570,7 +583,8 @@ class MainWindow(tk.Tk):
             if operation_method:
                 # Remove operation from parsed dict to pass remaining as kwargs
                 operation_args = {k: v for k, v in parsed.items() if k != "operation"}
-                operation_method(**operation_args)
+                with self._command_collection(parsed):
+                    operation_method(**operation_args)
             else:
                 raise ValueError(f"Unsupported operation: {operation}")
             
@@ -693,30 +707,35 @@ class MainWindow(tk.Tk):
             "DATABASE CHALAO <name>": "Switch to the specified database.",
             
             # Collection operations
-            "NAVA COLLECTION BANAO <name>": "Create a new collection in the current database.",
+            "NAVA COLLECTION BANAO <name> [json|journal|segment|partitioned [N]]": "Create a new collection in the current database. 'journal' appends each change to a journal file instead of rewriting the collection; 'segment' stores binary records that are decoded only when queried; 'partitioned' splits the collection into N files by _id hash (default 8) that are rewritten individually.",
             "COLLECTION NU MITAO <name>": "Delete the specified collection from the current database.",
+            "STORAGE BADLO <collection> <json|journal|segment|partitioned> [codec]": "Convert a collection to another storage format and optionally another codec (json, json-pretty, msgpack, json+zlib, msgpack+zlib).",
             
             # Index operations
-            "INDEX BANAO <field> <collection>": "Create an index on the specified field in the given collection.",
-            "INDEX DIKHAO <collection>": "List all indexes in the specified collection.",
+            "INDEX BANAO <field[,field...]> <collection> [hash|ordered|bitmap|text] [unique] [stem] [sparse] [ttl <seconds>] [{filter}]": "Create an index on the specified field in the given collection. 'hash' (default) answers equality and $in lookups; 'ordered' keeps the values sorted so $gt, $gte, $lt and $lte ranges scan only the matching values; 'bitmap' suits fields with few distinct values (status, role, active) and combines equality, $in and $ne across several bitmap-indexed fields. Several comma-separated fields (no spaces) make a compound index: a hash one matches all fields at once, an ordered one also matches the leading fields followed by a range on the next. 'unique' rejects inserts and updates that would repeat an indexed value. Fields may be dotted paths (address.city); an array field is indexed under each of its elements. 'text' builds a full-text index over the string fields (one per collection) for {\"$text\": {\"$search\": \"words\"}} queries, ranked by relevance; add 'stem' to match word variants (course/courses). 'sparse' leaves out documents missing any of the fields. A trailing {filter} query makes a partial index holding only the matching documents; it is used only for queries that include the filter's conditions. 'ttl 3600' makes an ordered TTL index on a timestamp field (epoch seconds or ISO 8601 strings, local time unless they end in Z or an offset): a background sweep deletes documents once the timestamp is older than that many seconds, oldest first and in small batches; INDEX DIKHAO shows how many have expired. Non-unique indexes are built in the background, so the window stays responsive; queries use the index once it is ready.",
+            "INDEX DIKHAO <collection>": "List all indexes in the specified collection, with the progress of any index still being built.",
+            "INDEX SUJHAO <collection> [auto <scans>|auto off]": "Suggest indexes for the queries that had to scan the whole collection, grouped by query shape (fields and operators, not values) and ranked by the time an index would have saved. 'auto <scans>' builds the top suggestion in the background once a query shape has scanned the collection that many times; 'auto off' stops it.",
             "INDEX CHALO KARO": "Enable indexing for the current collection.",
             "INDEX BAND KARO": "Disable indexing for the current collection.",
             
             # Document operations
             "DAKHIL KARO <collection> {document}": "Insert a single document into the specified collection.",
             "DAKHIL KARO <collection> [documents]": "Insert multiple documents into the specified collection.",
-            "BADLO <collection> {query} {update}": "Update documents in the specified collection matching the query with the update operation.",
-            "MITAO <collection> {query}": "Delete documents from the specified collection matching the query.",
+            "BADLO <collection> {query} {update}": "Update documents in the specified collection matching the query with the update operation. The query takes the same operators as LABBO ($gt, $in, $ne, $or, dotted fields).",
+            "MITAO <collection> {query}": "Delete documents from the specified collection matching the query; operators work as in LABBO.",
             
             # Query operations
-            "LABBO <collection> {query}": "Retrieve documents from the specified collection matching the query.",
+            "LABBO <collection> {query} [{projection}]": "Retrieve documents from the specified collection matching the query. Predicates on several indexed fields are answered by intersecting their indexes; {\"$or\": [{...}, {...}]} matches any branch. Dotted paths reach nested fields, and a value matches an array field that contains it. A {\"field\": 1, ...} projection keeps only those fields; when the query and the fields are all on one index, the rows are read from the index alone (covered).",
             "LABBO <collection>": "Retrieve all documents from the specified collection (empty query).",
+            "GINO <collection> [{query}]": "Count the documents matching the query. When indexes answer every predicate exactly, the count comes from the index without reading any document.",
+            "ALAG <collection> <field> [{query}]": "List the distinct values of a field (array elements count separately); read from the field's index when it has one.",
+            "SAMJHAO <collection> {query} [{projection}]": "Explain how LABBO and GINO would run the query: COVERED (index only), INDEX_USED (indexes narrow the documents read) or FULL_SCAN, with the indexes used.",
             
             # Aggregation
-            "AGGREGATE IN <collection> [pipeline]": "Perform an aggregation operation on the specified collection with the given pipeline.",
+            "AGGREGATE IN <collection> [pipeline]": "Perform an aggregation operation on the specified collection with the given pipeline. {\"$sort\": {\"field\": 1 or -1, ...}} orders values of mixed types (null, numbers, strings, booleans, arrays, objects); followed by $limit it keeps only the top documents, and it reads an ordered index on the sort fields when there is one.",
             
             # Backup operations
-            "BACKUP BANAO": "Create a backup of the current database.",
+            "BACKUP BANAO <name> [codec]": "Create a backup of the database, optionally re-encoding collection files with a codec.",
             "RESTORE KARO <name>": "Restore a database from a backup with the given name."
         }
 
@@ -775,10 +794,10 @@ class MainWindow(tk.Tk):
         categories = {
             "Transaction Operations": ["BEGIN TX", "COMMIT", "ROLLBACK"],
             "Database Operations": ["NAVA DATABASE BANAO", "DATABASE NU MITAO", "DATABASE CHALAO"],
-            "Collection Operations": ["NAVA COLLECTION BANAO", "COLLECTION NU MITAO"],
-            "Index Operations": ["INDEX BANAO", "INDEX DIKHAO", "INDEX CHALO KARO", "INDEX BAND KARO"],
+            "Collection Operations": ["NAVA COLLECTION BANAO", "COLLECTION NU MITAO", "STORAGE BADLO"],
+            "Index Operations": ["INDEX BANAO", "INDEX DIKHAO", "INDEX SUJHAO", "INDEX CHALO KARO", "INDEX BAND KARO"],
             "Document Operations": ["DAKHIL KARO", "BADLO", "MITAO"],
-            "Query Operations": ["LABBO"],
+            "Query Operations": ["LABBO", "GINO", "ALAG", "SAMJHAO"],
             "Aggregation": ["AGGREGATE IN"],
             "Backup/Restore": ["BACKUP BANAO", "RESTORE KARO"]
         }
@@ -864,8 +883,14 @@ class MainWindow(tk.Tk):
         )
     @requires_auth(Permission.USE_DATABASE)
     def _handle_use_db(self, name):
+        if self.current_db and self.current_db.name == name:
+            # keep the open Database (and any transaction in progress)
+            self._refresh_databases()
+            self.query_time.set(f"Using database '{name}'")
+            self._update_transaction_status_in_info()
+            return
+        self._set_current_collection(None)
         self.current_db = Database(name)
-        self.current_collection = None
         self._refresh_databases()
         self.transaction_status.set(f"Transaction {self.current_db._active_transaction} active" if self.current_db._active_transaction else "No active transaction")
         self.query_time.set(f"Using database '{name}'")
@@ -880,14 +905,28 @@ class MainWindow(tk.Tk):
         self._update_transaction_status_in_info()
 
     @requires_auth(Permission.CREATE_COLLECTION)
-    def _handle_create_collection(self, name):
+    def _handle_create_collection(self, name, storage="json", partitions=None):
         if not self.current_db:
             raise ValueError("No database selected. Use: USE DATABASE dbname")
-        self.current_db.create_collection(name)
+        if partitions:
+            self.current_db.create_collection(name, storage_mode=storage, partitions=partitions)
+        else:
+            self.current_db.create_collection(name, storage_mode=storage)
         self._refresh_collections()
         self.query_time.set(f"Collection '{name}' created")
         self._update_transaction_status_in_info()
 
+    @requires_auth(Permission.CREATE_COLLECTION)
+    def _handle_convert_collection(self, collection, storage, codec=None):
+        if not self.current_db:
+            raise ValueError("No database selected. Use: USE DATABASE dbname")
+        converted = self.current_db.convert_collection(collection, storage, codec)
+        if self.current_collection and self.current_collection.name == collection:
+            self._set_current_collection(converted)
+        self._refresh_collections()
+        self.query_time.set(f"Collection '{collection}' now uses {storage} storage")
+        self._update_transaction_status_in_info()
+
     @requires_auth(Permission.DROP_COLLECTION)
     def _handle_drop_collection(self, name):
         if not self.current_db:
@@ -895,7 +934,7 @@ class MainWindow(tk.Tk):
         if messagebox.askyesno("Confirm", f"Delete collection '{name}'?"):
             self.current_db.drop_collection(name)
             if self.current_collection and self.current_collection.name == name:
-                self.current_collection = None
+                self._set_current_collection(None)
             self._refresh_collections()
             self.query_time.set(f"Collection '{name}' deleted")
             self._update_transaction_status_in_info()
@@ -912,7 +951,73 @@ class MainWindow(tk.Tk):
             parent = self.db_tree.parent(selected)
             db_name = self.db_tree.item(parent)['text']
             self._handle_use_db(db_name)
-            self._handle_find(text, {})
+            self._load_collection_async(text)
+
+    def _load_collection_async(self, name):
+        """Open a collection on a worker thread, showing load progress, then list its documents."""
+        db = self.current_db
+        if not db or name in db.collections:
+            self._handle_find(name, {})
+            return
+        state = {"read": 0, "total": 0, "done": False, "error": None}
+
+        def progress(read, total):
+            state["read"], state["total"] = read, total
+
+        def worker():
+            try:
+                db.get_collection(name, progress=progress)
+            except Exception as e:
+                state["error"] = e
+            finally:
+                state["done"] = True
+
+        def poll():
+            if state["total"]:
+                self.load_progress['value'] = state["read"] * 100 / state["total"]
+                self.load_status.set(f"Loading '{name}': {state['read'] * 100 // state['total']}%")
+            if not state["done"]:
+                self.after(50, poll)
+                return
+            self.load_progress.pack_forget()
+            self.load_label.pack_forget()
+            if state["error"]:
+                self.query_time.set(f"Error: {state['error']}")
+                messagebox.showerror("Load Error", str(state["error"]))
+            elif self.current_db is db:
+                self._handle_find(name, {})
+
+        self.load_status.set(f"Loading '{name}'...")
+        self.load_progress['value'] = 0
+        self.load_label.pack(fill=tk.X, padx=5)
+        self.load_progress.pack(fill=tk.X, padx=5, pady=(0, 5))
+        threading.Thread(target=worker, name=f"load-{name}", daemon=True).start()
+        poll()
+
+    @contextlib.contextmanager
+    def _command_collection(self, parsed: Dict):
+        """Pin the collection a command works on for as long as it runs, so
+        the collection cache does not close it under the command"""
+        db, name = self.current_db, parsed.get("collection")
+        if db is None or not isinstance(name, str):
+            yield
+            return
+        db.pin_collection(name)
+        try:
+            yield
+        finally:
+            db.unpin_collection(name)
+
+    def _set_current_collection(self, collection: Optional[Collection]):
+        """Select the collection INDEX CHALO/BAND KARO act on; it stays pinned
+        in the collection cache while selected"""
+        previous, previous_db = self.current_collection, self._pinned_db
+        if collection is not None:
+            self.current_db.pin_collection(collection.name)  # before the unpin, which may evict
+        self.current_collection = collection
+        self._pinned_db = self.current_db if collection is not None else None
+        if previous is not None and previous_db is not None:
+            previous_db.unpin_collection(previous.name)
 
     def _refresh_databases(self):
         self.db_tree.delete(*self.db_tree.get_children())
@@ -986,11 +1091,14 @@ class MainWindow(tk.Tk):
             elif operation == "use_db":
                 self._handle_use_db(parsed["name"])
             elif operation == "create_collection":
-                self._handle_create_collection(parsed["name"])
+                self._handle_create_collection(parsed["name"], parsed["storage"], parsed["partitions"])
             elif operation == "drop_collection":
                 self._handle_drop_collection(parsed["name"])
+            elif operation == "convert_collection":
+                self._handle_convert_collection(parsed["collection"], parsed["storage"], parsed["codec"])
             elif operation == "create_index":
-                self._handle_create_index(parsed["field"], parsed["collection"])
+                self._handle_create_index(parsed["field"], parsed["collection"], parsed["index_type"], parsed["unique"], parsed["stem"],
+                                          parsed["sparse"], parsed["filter"], parsed["expire_after"])
             elif operation == "insert":
                 self._handle_insert(parsed["collection"], parsed["document"])
             elif operation == "insert_many":
@@ -1000,15 +1108,23 @@ class MainWindow(tk.Tk):
             elif operation == "delete":
                 self._handle_delete(parsed["collection"], parsed["query"])
             elif operation == "find":
-                self._handle_find(parsed["collection"], parsed["query"])
+                self._handle_find(parsed["collection"], parsed["query"], parsed["projection"])
+            elif operation == "count":
+                self._handle_count(parsed["collection"], parsed["query"])
+            elif operation == "distinct":
+                self._handle_distinct(parsed["collection"], parsed["field"], parsed["query"])
+            elif operation == "explain":
+                self._handle_explain(parsed["collection"], parsed["query"], parsed["projection"])
             elif operation == "aggregate":
                 self._handle_aggregate(parsed["collection"], parsed["pipeline"])
             elif operation == "backup":
-                self._handle_backup(parsed["name"])
+                self._handle_backup(parsed["name"], parsed["codec"])
             elif operation == "restore":
                 self._handle_restore(parsed["name"])
             elif operation == "list_indexes":
                 self._handle_list_indexes(parsed["collection"])
+            elif operation == "recommend_indexes":
+                self._handle_recommend_indexes(parsed["collection"], parsed["auto"])
             elif operation == "enable_indexing":
                 self._handle_enable_indexing(parsed["enable"])
             elapsed_ms = (time.perf_counter() - start_time) * 1000
@@ -1026,21 +1142,29 @@ class MainWindow(tk.Tk):
             db = Database(name)
             db.drop_database()
             if self.current_db and self.current_db.name == name:
+                self._set_current_collection(None)
                 self.current_db = None
-                self.current_collection = None
                 self.transaction_status.set("No active transaction")
             self._refresh_databases()
             self.query_time.set(f"Database '{name}' deleted")
             self._update_transaction_status_in_info()
 
-    def _handle_create_index(self, field, collection):
+    def _handle_create_index(self, field, collection, index_type="hash", unique=False, stem=False,
+                             sparse=False, filter=None, expire_after=None):
         if not self.current_db:
             raise ValueError("No database selected. Use: USE DATABASE dbname")
         collection = self.current_db.get_collection(collection)
         if not collection:
             raise ValueError(f"Collection '{collection}' not found")
-        collection.create_index(field)
-        self.query_time.set(f"Index created on field '{field}' in collection '{collection}'")
+        # unique indexes must see every document before they can enforce anything
+        build = collection.create_index(field, index_type, unique, stem, sparse, filter, expire_after,
+                                        background=not unique)
+        kind = f"{'Unique ' if unique else ''}{'Partial ' if filter else ''}{'TTL ' if expire_after else ''}{index_type.capitalize()} index"
+        if build.state == "building":
+            self.query_time.set(f"{kind} build started on field '{field}' in collection '{collection.name}' "
+                                f"({build.total} documents); INDEX DIKHAO shows its progress")
+        else:
+            self.query_time.set(f"{kind} created on field '{field}' in collection '{collection.name}'")
         self._update_transaction_status_in_info()
 
     @requires_auth(Permission.INSERT_DOCUMENT)
@@ -1080,7 +1204,7 @@ class MainWindow(tk.Tk):
             self.query_time.set(f"Deleted {count} documents")
             self._update_transaction_status_in_info()
 
-    def _handle_find(self, collection, query):
+    def _handle_find(self, collection, query, projection=None):
         if not self.current_db:
             raise ValueError("No database selected. Use: USE DATABASE dbname")
         
@@ -1088,33 +1212,62 @@ class MainWindow(tk.Tk):
         if not collection:
             raise ValueError(f"Collection '{collection}' not found")
         
-        self.current_collection = collection
+        self._set_current_collection(collection)
         
         # Time the query execution
         start_time = time.perf_counter()
-        documents = collection.find(query)
+        documents = collection.find(query, projection)
         elapsed_ms = (time.perf_counter() - start_time) * 1000
         
-        # Determine if index was used
-        used_index = False
-        if collection.indexing_enabled and len(query) == 1:
-            field = next(iter(query))
-            if field in collection.indexes:
-                used_index = True
-        
         # Display results
         self._display_documents(documents)
         
         # Build performance message
+        plan = collection.last_plan
         perf_msg = f"Found {len(documents)} documents in {elapsed_ms:.2f}ms"
-        if used_index:
-            perf_msg += " (used index)"
-        else:
-            perf_msg += " (full scan)"
+        perf_msg += {"COVERED": " (covered by index)", "INDEX_USED": " (used index)"}.get(plan, " (full scan)")
         
         self.query_time.set(perf_msg)
         self._update_transaction_status_in_info()
         
+    def _handle_count(self, collection, query):
+        if not self.current_db:
+            raise ValueError("No database selected. Use: USE DATABASE dbname")
+        collection = self.current_db.get_collection(collection)
+        if not collection:
+            raise ValueError(f"Collection '{collection}' not found")
+        start_time = time.perf_counter()
+        count = collection.count_documents(query)
+        elapsed_ms = (time.perf_counter() - start_time) * 1000
+        covered = " (counted from index)" if collection.last_plan == "COVERED" else ""
+        self._display_info(f"{count} documents")
+        self.query_time.set(f"Counted {count} documents in {elapsed_ms:.2f}ms{covered}")
+        self._update_transaction_status_in_info()
+
+    def _handle_distinct(self, collection, field, query):
+        if not self.current_db:
+            raise ValueError("No database selected. Use: USE DATABASE dbname")
+        collection = self.current_db.get_collection(collection)
+        if not collection:
+            raise ValueError(f"Collection '{collection}' not found")
+        start_time = time.perf_counter()
+        values = collection.distinct(field, query)
+        elapsed_ms = (time.perf_counter() - start_time) * 1000
+        self._display_info("\n".join(json.dumps(value) for value in values))
+        self.query_time.set(f"Found {len(values)} distinct values of '{field}' in {elapsed_ms:.2f}ms")
+        self._update_transaction_status_in_info()
+
+    def _handle_explain(self, collection, query, projection=None):
+        if not self.current_db:
+            raise ValueError("No database selected. Use: USE DATABASE dbname")
+        collection = self.current_db.get_collection(collection)
+        if not collection:
+            raise ValueError(f"Collection '{collection}' not found")
+        explanation = collection.explain(query, projection)
+        self._display_info(json.dumps(explanation, indent=2))
+        self.query_time.set(f"Plan: {explanation['plan']}")
+        self._update_transaction_status_in_info()
+
     def _handle_aggregate(self, collection, pipeline):
         if not self.current_db:
             raise ValueError("No database selected. Use: USE DATABASE dbname")
@@ -1126,11 +1279,11 @@ class MainWindow(tk.Tk):
         self.query_time.set(f"Aggregation completed with {len(results)} results")
         self._update_transaction_status_in_info()
 
-    def _handle_backup(self, name):
+    def _handle_backup(self, name, codec=None):
         print("Backup handler called with name:", name)  # Debug line
         from core.backup_manager import BackupManager
         backup_manager = BackupManager()
-        backup_path = backup_manager.create_backup(name)
+        backup_path = backup_manager.create_backup(name, codec)
         self.query_time.set(f"Backup created at: {backup_path}")
         self._update_transaction_status_in_info()
 
@@ -1149,12 +1302,44 @@ class MainWindow(tk.Tk):
         if not collection:
             raise ValueError(f"Collection '{collection}' not found")
         indexes = collection.list_indexes()
-        self._display_info("\n".join(
-            f"{idx['name']}: {idx['key']}" for idx in indexes
-        ))
+        lines = []
+        for idx in indexes:
+            details = [idx['type']] + [option for option in ("unique", "sparse") if idx[option]]
+            if idx['stem']:
+                details.append("stemmed")
+            if idx['filter']:
+                details.append(f"filter {json.dumps(idx['filter'])}")
+            if idx['expire_after']:
+                details.append(f"expires after {idx['expire_after']}s, {idx['expired']} expired so far")
+            if idx['state'] == "building":
+                details.append(f"building {idx['progress']:.0f}% ({idx['indexed']}/{idx['total']} documents)")
+            elif idx['state'] == "failed":
+                details.append(f"build failed: {idx['error']}")
+            lines.append(f"{idx['name']}: {idx['key']} ({', '.join(details)})")
+        self._display_info("\n".join(lines))
         self.query_time.set(f"Found {len(indexes)} indexes")
         self._update_transaction_status_in_info()
 
+    def _handle_recommend_indexes(self, collection, auto=None):
+        if not self.current_db:
+            raise ValueError("No database selected. Use: USE DATABASE dbname")
+        collection = self.current_db.get_collection(collection)
+        if not collection:
+            raise ValueError(f"Collection '{collection}' not found")
+        if auto is not None:
+            collection.set_auto_index(auto or None)
+        recommendations = collection.recommend_indexes()
+        lines = []
+        for rec in recommendations:
+            lines.append(f"INDEX BANAO {rec['index']} {collection.name} {rec['type']}: saves ~{rec['savings_ms']:.2f}ms "
+                         f"over {rec['scans']} full scans ({rec['examined']} documents examined)")
+            lines.extend(f"    {shape}" for shape in rec['shapes'])
+        if collection.auto_index_threshold:
+            lines.append(f"Auto indexing after {collection.auto_index_threshold} full scans of a query shape")
+        self._display_info("\n".join(lines) or "No full scans an index would help with yet")
+        self.query_time.set(f"Found {len(recommendations)} index suggestions")
+        self._update_transaction_status_in_info()
+
     def _handle_enable_indexing(self, enable):
         if not self.current_collection:
             raise ValueError("No collection selected")
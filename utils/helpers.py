@@ -1,5 +1,6 @@
 import re
-from typing import Dict, Any
+import sys
+from typing import Dict, Any, List
 
 def validate_db_name(name: str):
     """Validate a database name"""
@@ -16,22 +17,44 @@ def deep_update(target: Dict, update: Dict):
         else:
             target[key] = value
 
-def match_document(doc: Dict, query: Dict) -> bool:
-    """Check if a document matches a query"""
-    for key, query_value in query.items():
-        if key not in doc:
-            return False
-        
-        doc_value = doc[key]
-        
-        # Handle nested queries
-        if isinstance(query_value, dict):
-            if not isinstance(doc_value, dict):
-                return False
-            if not match_document(doc_value, query_value):
-                return False
-        # Handle exact match
-        elif doc_value != query_value:
-            return False
-    
-    return True
\ No newline at end of file
+def path_values(doc: Dict, path: str) -> List[Any]:
+    """Values at a dotted path such as ``address.city``; empty if the path is missing.
+
+    Arrays of sub-documents on the way are descended into, so
+    ``grades.score`` yields the score of every grade.
+    """
+    if path in doc:
+        return [doc[path]]
+    values = [doc]
+    for part in path.split("."):
+        found = []
+        for value in values:
+            if isinstance(value, dict):
+                if part in value:
+                    found.append(value[part])
+            elif isinstance(value, list):
+                found.extend(item[part] for item in value if isinstance(item, dict) and part in item)
+        if not found:
+            return []
+        values = found
+    return values
+
+def field_candidates(doc: Dict, path: str) -> List[Any]:
+    """What a query on ``path`` is compared with: the values at the path plus
+    the elements of array values (a query on ``tags`` matches any tag)"""
+    if path in doc and not isinstance(doc[path], list):
+        return [doc[path]]
+    values = path_values(doc, path)
+    return values + [item for value in values if isinstance(value, list) for item in value]
+
+
+def deep_sizeof(value: Any) -> int:
+    """Approximate memory used by a JSON-like value, including its contents"""
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        for key, item in value.items():
+            size += sys.getsizeof(key) + deep_sizeof(item)
+    elif isinstance(value, (list, tuple)):
+        for item in value:
+            size += deep_sizeof(item)
+    return size